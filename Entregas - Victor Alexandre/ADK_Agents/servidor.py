@@ -0,0 +1,480 @@
+"""Camada de atendimento assíncrona para os agentes (AgenteTurismo, Professor), para muitos usuários ao mesmo tempo.
+
+- um `Runner` do ADK por agente, compartilhado por todas as conversas;
+- sessões reaproveitadas por (agente, usuário, conversa), com limite de quantidade e expiração
+  por inatividade (`PoolSessoes`); mensagens da mesma conversa são atendidas em ordem;
+- no máximo N chamadas simultâneas ao modelo por agente; as demais esperam na fila;
+- respostas memorizadas para a mesma pergunta com o mesmo histórico (`CacheRespostas`):
+  perguntas repetidas no início da conversa não chamam o modelo de novo, nem quando chegam
+  juntas (as iguais esperam a primeira chamada em andamento);
+- métricas por agente: latência (p50/p95/p99), espera na fila, profundidade da fila,
+  tokens e acertos de cache (`MetricasServidor`).
+
+Teste de carga sem rede, com um modelo simulado local no lugar do Gemini:
+    python servidor.py carga --conversas 500 --turnos 3 --concorrencia 8 --latencia 0.2
+Conversa no terminal com o modelo real (GOOGLE_API_KEY no .env da pasta do agente):
+    python servidor.py chat Professor
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+
+import numpy as np
+from google.adk.events import Event
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.runners import Runner
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+AGENTES = ('AgenteTurismo', 'Professor')
+NOME_APP = 'agentes_lia'
+CONCORRENCIA_PADRAO = 8          # chamadas simultâneas ao modelo por agente
+MAX_SESSOES = 5000               # por agente; as menos usadas são descartadas
+SESSAO_OCIOSA_S = 30 * 60
+MAX_RESPOSTAS_CACHE = 2000
+VALIDADE_CACHE_S = 60 * 60
+MAX_LATENCIAS = 10_000           # últimas requisições guardadas por agente para os percentis
+PASTA = os.path.dirname(os.path.abspath(__file__))  # as pastas dos agentes são importadas como pacotes daqui
+
+
+def _texto(conteudo):
+    if conteudo is None or not conteudo.parts:
+        return ''
+    return ''.join(parte.text or '' for parte in conteudo.parts)
+
+
+def _mensagem(papel, texto):
+    return types.Content(role=papel, parts=[types.Part(text=texto)])
+
+
+# --- MODELO SIMULADO ---
+class ModeloSimulado(BaseLlm):
+    """Modelo local para testes de carga: responde sem rede, com latência proporcional aos tokens."""
+
+    model: str = 'simulado'
+    latencia_s: float = 0.2        # tempo até o primeiro token
+    s_por_token: float = 0.002
+    variacao: float = 0.3          # fração aleatória para mais ou para menos na latência
+
+    async def generate_content_async(self, llm_request, stream=False):
+        pergunta = _texto(llm_request.contents[-1]) if llm_request.contents else ''
+        tokens_entrada = sum(len(_texto(c).split()) for c in llm_request.contents)
+        tokens_entrada += len(str(llm_request.config.system_instruction or '').split()) if llm_request.config else 0
+        # A mesma pergunta gera sempre a mesma resposta (o tamanho depende só do texto)
+        semente = random.Random(hashlib.md5(pergunta.encode()).digest())
+        tokens_saida = semente.randint(20, 120)
+        resposta = f"Resposta simulada para: {pergunta} " + ' '.join(['bla'] * tokens_saida)
+        atraso = (self.latencia_s + self.s_por_token * tokens_saida) * random.uniform(1 - self.variacao, 1 + self.variacao)
+        await asyncio.sleep(atraso)
+        yield LlmResponse(
+            content=_mensagem('model', resposta),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=tokens_entrada, candidates_token_count=tokens_saida,
+                total_token_count=tokens_entrada + tokens_saida,
+            ),
+        )
+
+
+# --- SESSÕES E CACHE ---
+class _EntradaSessao:
+    __slots__ = ('id', 'trava', 'ultimo_uso', 'em_uso')
+
+    def __init__(self):
+        self.id = None               # preenchido pela primeira mensagem, com a trava segura
+        self.trava = asyncio.Lock()
+        self.ultimo_uso = time.monotonic()
+        self.em_uso = 0              # mensagens atendendo ou esperando a trava
+
+
+class PoolSessoes:
+    """Sessões de um agente por (usuário, conversa), reaproveitadas entre as mensagens.
+
+    Cada conversa tem sua trava: duas mensagens da mesma conversa não rodam ao mesmo tempo
+    (o histórico ficaria embaralhado). Conversas ociosas ou em excesso são apagadas, nunca
+    uma com mensagem em andamento.
+    """
+
+    def __init__(self, servico, nome_app, max_sessoes=MAX_SESSOES, ociosa_s=SESSAO_OCIOSA_S):
+        self.servico = servico
+        self.nome_app = nome_app
+        self.max_sessoes = max_sessoes
+        self.ociosa_s = ociosa_s
+        self._sessoes = OrderedDict()  # (usuário, conversa) -> _EntradaSessao
+
+    def __len__(self):
+        return len(self._sessoes)
+
+    @asynccontextmanager
+    async def usar(self, usuario, conversa):
+        """Segura a conversa (uma mensagem por vez) e devolve o id da sessão, criada na primeira mensagem."""
+        chave = (usuario, conversa)
+        entrada = self._sessoes.get(chave)
+        if entrada is None:
+            # Registrada antes do `await`: outra mensagem da conversa espera esta trava em vez de criar outra sessão
+            entrada = self._sessoes[chave] = _EntradaSessao()
+        else:
+            self._sessoes.move_to_end(chave)
+        entrada.em_uso += 1
+        try:
+            async with entrada.trava:
+                if entrada.id is None:  # primeira mensagem (ou a criação anterior falhou)
+                    sessao = await self.servico.create_session(app_name=self.nome_app, user_id=usuario)
+                    entrada.id = sessao.id
+                yield entrada.id
+        finally:
+            entrada.em_uso -= 1
+            entrada.ultimo_uso = time.monotonic()
+        await self._descartar()
+
+    async def _descartar(self):
+        limite = time.monotonic() - self.ociosa_s
+        while self._sessoes:
+            (usuario, conversa), entrada = next(iter(self._sessoes.items()))
+            if len(self._sessoes) <= self.max_sessoes and entrada.ultimo_uso >= limite:
+                break
+            if entrada.em_uso:  # conversa em andamento: volta para o fim da fila
+                self._sessoes.move_to_end((usuario, conversa))
+                break
+            del self._sessoes[(usuario, conversa)]
+            if entrada.id is not None:
+                await self.servico.delete_session(app_name=self.nome_app, user_id=usuario, session_id=entrada.id)
+
+
+class CacheRespostas:
+    """Respostas por (agente, histórico da conversa, pergunta), com limite de itens e validade.
+
+    Chamada única por chave: quem chega enquanto a mesma pergunta está no modelo espera essa
+    chamada (`pendente`) em vez de fazer outra; quem chama o modelo reserva a chave
+    (`reservar`) e entrega a resposta (`concluir`), ou None se a chamada falhou.
+    """
+
+    def __init__(self, max_itens=MAX_RESPOSTAS_CACHE, validade_s=VALIDADE_CACHE_S):
+        self.max_itens = max_itens
+        self.validade_s = validade_s
+        self._itens = OrderedDict()
+        self._pendentes = {}  # chave -> asyncio.Future com a resposta da chamada em andamento
+
+    @staticmethod
+    def chave(agente, historico, pergunta):
+        texto = json.dumps([agente, historico, ' '.join(pergunta.split()).lower()], ensure_ascii=False)
+        return hashlib.sha256(texto.encode()).hexdigest()
+
+    def obter(self, chave):
+        item = self._itens.get(chave)
+        if item is None or time.monotonic() - item[0] > self.validade_s:
+            return None
+        self._itens.move_to_end(chave)
+        return item[1]
+
+    def guardar(self, chave, resposta):
+        self._itens[chave] = (time.monotonic(), resposta)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def pendente(self, chave):
+        return self._pendentes.get(chave)
+
+    def reservar(self, chave):
+        futuro = self._pendentes[chave] = asyncio.get_running_loop().create_future()
+        return futuro
+
+    def concluir(self, chave, futuro, resposta):
+        """Entrega a resposta a quem espera (None: falhou, cada um chama o modelo) e a guarda."""
+        if self._pendentes.get(chave) is futuro:
+            del self._pendentes[chave]
+        if resposta is not None:
+            self.guardar(chave, resposta)
+        if not futuro.done():
+            futuro.set_result(resposta)
+
+
+# --- MÉTRICAS ---
+def _percentis(valores):
+    if not valores:
+        return {'p50': None, 'p95': None, 'p99': None}
+    p50, p95, p99 = np.percentile(np.asarray(valores, dtype=np.float64), [50, 95, 99])
+    return {'p50': round(float(p50), 1), 'p95': round(float(p95), 1), 'p99': round(float(p99), 1)}
+
+
+class MetricasServidor:
+    """Latências, espera e profundidade da fila, tokens e contadores, por agente."""
+
+    def __init__(self, max_latencias=MAX_LATENCIAS):
+        self.latencias_ms = {}
+        self.esperas_ms = {}
+        self.filas_na_chegada = {}
+        self.fila = Counter()       # requisições esperando vaga no modelo, agora
+        self.fila_max = Counter()
+        self.contadores = Counter()
+        self._max = max_latencias
+
+    def _serie(self, series, agente):
+        return series.setdefault(agente, deque(maxlen=self._max))
+
+    def entrar_fila(self, agente):
+        self._serie(self.filas_na_chegada, agente).append(self.fila[agente])
+        self.fila[agente] += 1
+        self.fila_max[agente] = max(self.fila_max[agente], self.fila[agente])
+
+    def sair_fila(self, agente, espera_ms):
+        self.fila[agente] -= 1
+        self._serie(self.esperas_ms, agente).append(espera_ms)
+
+    def registrar(self, agente, latencia_ms, tokens_entrada=0, tokens_saida=0, cache=False):
+        self._serie(self.latencias_ms, agente).append(latencia_ms)
+        self.contadores[(agente, 'requisicoes')] += 1
+        self.contadores[(agente, 'cache_acerto' if cache else 'cache_falha')] += 1
+        self.contadores[(agente, 'tokens_economizados' if cache else 'tokens_entrada')] += tokens_entrada
+        self.contadores[(agente, 'tokens_saida_cache' if cache else 'tokens_saida')] += tokens_saida
+
+    def contar(self, agente, nome, valor=1):
+        self.contadores[(agente, nome)] += valor
+
+    def resumo(self):
+        """Dicionário por agente: requisições, percentis (ms), fila e tokens."""
+        resumo = {}
+        for agente in sorted(set(self.latencias_ms) | {a for a, _ in self.contadores}):
+            contadores = {nome: valor for (a, nome), valor in self.contadores.items() if a == agente}
+            acertos, falhas = contadores.get('cache_acerto', 0), contadores.get('cache_falha', 0)
+            resumo[agente] = {
+                'requisicoes': contadores.get('requisicoes', 0),
+                'latencia_ms': _percentis(self.latencias_ms.get(agente, [])),
+                'espera_fila_ms': _percentis(self.esperas_ms.get(agente, [])),
+                'fila_na_chegada': _percentis(self.filas_na_chegada.get(agente, [])),
+                'fila_atual': self.fila[agente], 'fila_max': self.fila_max[agente],
+                'taxa_acerto_cache': round(acertos / (acertos + falhas), 3) if acertos + falhas else None,
+                **{nome: valor for nome, valor in contadores.items() if nome not in ('requisicoes', 'cache_acerto', 'cache_falha')},
+            }
+        return resumo
+
+
+# --- SERVIDOR ---
+class ServidorAgentes:
+    """Atende mensagens para vários agentes, com sessões, fila por agente, cache e métricas.
+
+    Use `await servidor.responder(agente, usuario, texto, conversa)` de qualquer número de
+    tarefas ao mesmo tempo; `await servidor.fechar()` no fim.
+    """
+
+    def __init__(self, agentes, concorrencia=CONCORRENCIA_PADRAO, cache=True, max_sessoes=MAX_SESSOES,
+                 sessao_ociosa_s=SESSAO_OCIOSA_S):
+        self.servico_sessoes = InMemorySessionService()
+        self.runners, self.sessoes, self.vagas = {}, {}, {}
+        for nome, agente in agentes.items():
+            nome_app = f'{NOME_APP}_{nome}'
+            self.runners[nome] = Runner(app_name=nome_app, agent=agente, session_service=self.servico_sessoes)
+            self.sessoes[nome] = PoolSessoes(self.servico_sessoes, nome_app, max_sessoes, sessao_ociosa_s)
+            self.vagas[nome] = asyncio.Semaphore(concorrencia)
+        self.cache = CacheRespostas() if cache else None
+        self.metricas = MetricasServidor()
+
+    @classmethod
+    def carregar(cls, nomes=AGENTES, modelo=None, **opcoes):
+        """Servidor com os `root_agent` das pastas `nomes`; `modelo` (ex.: `ModeloSimulado()`) substitui o Gemini."""
+        agentes = {}
+        for nome in nomes:
+            agente = importlib.import_module(f'{nome}.agent').root_agent
+            agentes[nome] = agente.clone(update={'model': modelo}) if modelo is not None else agente
+        return cls(agentes, **opcoes)
+
+    async def responder(self, agente, usuario, texto, conversa='padrao'):
+        """Resposta do agente (dicionário com `texto`, `latencia_ms`, `espera_ms`, tokens e `cache`)."""
+        inicio = time.perf_counter()
+        pool = self.sessoes[agente]
+        async with pool.usar(usuario, conversa) as id_sessao:
+            if self.cache is None:
+                resultado = await self._chamar_modelo(agente, usuario, id_sessao, texto)
+            else:
+                resultado = await self._responder_com_cache(agente, pool, usuario, id_sessao, texto)
+        resultado['latencia_ms'] = (time.perf_counter() - inicio) * 1000
+        self.metricas.registrar(agente, resultado['latencia_ms'], resultado['tokens_entrada'], resultado['tokens_saida'], resultado['cache'])
+        return resultado
+
+    async def _responder_com_cache(self, agente, pool, usuario, id_sessao, texto):
+        sessao = await self.servico_sessoes.get_session(app_name=pool.nome_app, user_id=usuario, session_id=id_sessao)
+        historico = [[e.author, _texto(e.content)] for e in sessao.events if e.content]
+        chave = self.cache.chave(agente, historico, texto)
+        resposta = self.cache.obter(chave)
+        espera_ms = 0.0
+        while resposta is None and self.cache.pendente(chave) is not None:
+            # A mesma pergunta já está no modelo: espera aquela chamada (None se ela falhar; aí
+            # outra que já tenha começado pode ser esperada, ou esta mensagem chama o modelo)
+            chegada = time.perf_counter()
+            resposta = await asyncio.shield(self.cache.pendente(chave))
+            espera_ms += (time.perf_counter() - chegada) * 1000
+            self.metricas.contar(agente, 'cache_aguardou_chamada')
+        if resposta is not None:
+            await self._registrar_turno(sessao, agente, texto, resposta['texto'])
+            return dict(resposta, espera_ms=espera_ms, cache=True)
+        futuro = self.cache.reservar(chave)
+        resultado = None
+        try:
+            resultado = await self._chamar_modelo(agente, usuario, id_sessao, texto)
+        finally:
+            guardar = resultado is not None and resultado['texto']
+            self.cache.concluir(chave, futuro, {c: resultado[c] for c in ('texto', 'tokens_entrada', 'tokens_saida')} if guardar else None)
+        return resultado
+
+    async def _chamar_modelo(self, agente, usuario, id_sessao, texto):
+        self.metricas.entrar_fila(agente)
+        chegada = time.perf_counter()
+        async with self.vagas[agente]:
+            espera_ms = (time.perf_counter() - chegada) * 1000
+            self.metricas.sair_fila(agente, espera_ms)
+            partes, tokens_entrada, tokens_saida = [], 0, 0
+            try:
+                async for evento in self.runners[agente].run_async(user_id=usuario, session_id=id_sessao,
+                                                                   new_message=_mensagem('user', texto)):
+                    if evento.usage_metadata is not None:
+                        tokens_entrada += evento.usage_metadata.prompt_token_count or 0
+                        tokens_saida += evento.usage_metadata.candidates_token_count or 0
+                    if evento.is_final_response() and evento.content:
+                        partes.append(_texto(evento.content))
+            except Exception:
+                self.metricas.contar(agente, 'erros')
+                raise
+        return {'texto': ''.join(partes), 'espera_ms': espera_ms, 'tokens_entrada': tokens_entrada,
+                'tokens_saida': tokens_saida, 'cache': False}
+
+    async def _registrar_turno(self, sessao, agente, pergunta, resposta):
+        """Resposta do cache entra no histórico da sessão como se o modelo tivesse respondido."""
+        invocacao = f'cache-{uuid.uuid4().hex[:12]}'
+        await self.servico_sessoes.append_event(sessao, Event(invocation_id=invocacao, author='user', content=_mensagem('user', pergunta)))
+        nome = self.runners[agente].agent.name
+        await self.servico_sessoes.append_event(sessao, Event(invocation_id=invocacao, author=nome, content=_mensagem('model', resposta)))
+
+    def sessoes_ativas(self):
+        return {nome: len(pool) for nome, pool in self.sessoes.items()}
+
+    async def fechar(self):
+        for runner in self.runners.values():
+            await runner.close()
+
+
+# --- TESTE DE CARGA ---
+PERGUNTAS = {
+    'AgenteTurismo': [
+        "Quais praias você recomenda em Maceió?", "Quanto custa um pacote para Porto de Galinhas?",
+        "Qual a melhor época para ir a Jericoacoara?", "Tem pacote para família com crianças?",
+        "O que comer em Salvador?", "Me conta uma história de Fernando de Noronha.",
+    ],
+    'Professor': [
+        "O que é uma tautologia?", "Pode explicar modus ponens?", "Como faço a tabela verdade de p -> q?",
+        "Quando é a prova?", "Qual a diferença entre validade e verdade?", "Vou passar na disciplina?",
+    ],
+}
+
+
+async def _conversa_simulada(servidor, numero, turnos, usuarios, pausa_s, sorteio, erros):
+    agente = sorteio.choice(sorted(servidor.runners))
+    usuario = f'usuario{sorteio.randrange(usuarios)}'
+    for _ in range(turnos):
+        try:
+            await servidor.responder(agente, usuario, sorteio.choice(PERGUNTAS.get(agente, ["Olá!"])), conversa=f'c{numero}')
+        except Exception as erro:  # registra e segue: um erro não derruba o teste inteiro
+            erros[type(erro).__name__] += 1
+        if pausa_s:
+            await asyncio.sleep(sorteio.expovariate(1 / pausa_s))
+
+
+async def teste_carga(servidor, conversas=200, turnos=3, simultaneas=100, usuarios=50, pausa_s=0.0, semente=0):
+    """Roda `conversas` conversas simuladas, até `simultaneas` ao mesmo tempo. Retorna o resumo."""
+    sorteio = random.Random(semente)
+    vagas = asyncio.Semaphore(simultaneas)
+    erros = Counter()
+
+    async def limitada(numero):
+        async with vagas:
+            await _conversa_simulada(servidor, numero, turnos, usuarios, pausa_s, sorteio, erros)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(limitada(numero) for numero in range(conversas)))
+    duracao = time.perf_counter() - inicio
+    por_agente = servidor.metricas.resumo()
+    requisicoes = sum(r['requisicoes'] for r in por_agente.values())
+    tokens = sum(r.get('tokens_entrada', 0) + r.get('tokens_saida', 0) for r in por_agente.values())
+    return {
+        'conversas': conversas, 'turnos': turnos, 'simultaneas': simultaneas, 'requisicoes': requisicoes,
+        'duracao_s': round(duracao, 2), 'vazao_req_s': round(requisicoes / duracao, 1),
+        'tokens_modelo_s': round(tokens / duracao, 1), 'erros': dict(erros),
+        'sessoes_ativas': servidor.sessoes_ativas(), 'agentes': por_agente,
+    }
+
+
+def _imprimir_carga(resumo):
+    print(f"{resumo['requisicoes']} requisições ({resumo['conversas']} conversas x {resumo['turnos']} turnos, "
+          f"{resumo['simultaneas']} simultâneas) em {resumo['duracao_s']}s: {resumo['vazao_req_s']} req/s, "
+          f"{resumo['tokens_modelo_s']} tokens do modelo/s")
+    if resumo['erros']:
+        print("Erros:", resumo['erros'])
+    for agente, r in resumo['agentes'].items():
+        lat, esp = r['latencia_ms'], r['espera_fila_ms']
+        print(f"  {agente}: {r['requisicoes']} req | latência p50 {lat['p50']} p95 {lat['p95']} p99 {lat['p99']} ms"
+              f" | espera na fila p95 {esp['p95']} ms | fila máx {r['fila_max']} | cache {r['taxa_acerto_cache']}")
+
+
+async def _carga(args):
+    modelo = ModeloSimulado(latencia_s=args.latencia, s_por_token=args.s_por_token)
+    servidor = ServidorAgentes.carregar(args.agentes, modelo=modelo, concorrencia=args.concorrencia, cache=not args.sem_cache)
+    try:
+        resumo = await teste_carga(servidor, args.conversas, args.turnos, args.simultaneas, args.usuarios, args.pausa, args.semente)
+    finally:
+        await servidor.fechar()
+    _imprimir_carga(resumo)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+
+
+async def _chat(args):
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(PASTA, args.agente, '.env'))
+    servidor = ServidorAgentes.carregar([args.agente])
+    try:
+        while True:
+            texto = await asyncio.to_thread(input, 'você> ')
+            if texto.strip().lower() in ('', 'sair'):
+                break
+            resposta = await servidor.responder(args.agente, 'terminal', texto)
+            print(f"{args.agente}> {resposta['texto']}\n  ({resposta['latencia_ms']:.0f} ms, "
+                  f"{resposta['tokens_entrada']}+{resposta['tokens_saida']} tokens{', cache' if resposta['cache'] else ''})")
+    except EOFError:
+        pass
+    finally:
+        await servidor.fechar()
+    print(json.dumps(servidor.metricas.resumo(), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Atendimento assíncrono dos agentes ADK.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    carga = comandos.add_parser('carga', help="teste de carga com modelo simulado (sem rede)")
+    carga.add_argument('--agentes', nargs='+', choices=AGENTES, default=list(AGENTES))
+    carga.add_argument('--conversas', type=int, default=200)
+    carga.add_argument('--turnos', type=int, default=3, help="mensagens por conversa")
+    carga.add_argument('--simultaneas', type=int, default=100, help="conversas abertas ao mesmo tempo")
+    carga.add_argument('--usuarios', type=int, default=50)
+    carga.add_argument('--pausa', type=float, default=0.0, help="tempo médio (s) entre as mensagens de uma conversa")
+    carga.add_argument('--concorrencia', type=int, default=CONCORRENCIA_PADRAO, help="chamadas simultâneas ao modelo por agente")
+    carga.add_argument('--latencia', type=float, default=0.2, help="latência base do modelo simulado (s)")
+    carga.add_argument('--s-por-token', type=float, default=0.002)
+    carga.add_argument('--sem-cache', action='store_true')
+    carga.add_argument('--semente', type=int, default=0)
+    carga.add_argument('--json', default=None, help="grava o resumo neste arquivo")
+
+    chat = comandos.add_parser('chat', help="conversa no terminal com o modelo real")
+    chat.add_argument('agente', choices=AGENTES)
+
+    args = parser.parse_args()
+    asyncio.run(_carga(args) if args.comando == 'carga' else _chat(args))
@@ -0,0 +1,45 @@
+"""Abas sob demanda: só a aba aberta é calculada, e o que ela calcula fica memorizado.
+
+`st.tabs` executa o corpo de todas as abas a cada interação, mesmo as que ninguém está
+vendo. Com `abas_sob_demanda`, trocar de aba reexecuta o script e cada aba informa se
+está aberta (`aba.open`); o app só entra na aba aberta. Os widgets dessas abas usam
+`persist_state="page"` para não perderem o valor enquanto a aba está fechada.
+
+`memorizar_secao(nome, chave, calcular)` guarda, na sessão, os dados de uma seção
+(rankings, agregados, pontos do mapa) pela chave — filtros, versão dos dados e opções da
+própria seção. Ao voltar para uma aba sem mudar os filtros, os dados saem prontos e só
+as figuras são remontadas. Figuras Plotly não são guardadas: cada uma carrega uma cópia
+dos dados e ocuparia vários MB por sessão.
+"""
+from collections import OrderedDict
+
+from instrumentacao import contar
+
+MAX_POR_SECAO = 2  # resultados guardados por nome de seção, em cada sessão
+
+
+def abas_sob_demanda(rotulos, chave):
+    """`st.tabs` que reexecuta o script ao trocar de aba; use `if aba.open:` antes de calcular cada uma."""
+    import streamlit as st
+    return st.tabs(rotulos, key=chave, on_change="rerun")
+
+
+def memorizar_secao(nome, chave, calcular):
+    """Resultado de `calcular()` para (nome, chave) nesta sessão; cada seção guarda só os `MAX_POR_SECAO` mais recentes.
+
+    `chave` deve incluir tudo de que o cálculo depende (ex.: `(filtros, versao_visitas, opcoes)`);
+    é comparada pela representação (`repr`), então dicionários e listas servem. `calcular`
+    deve devolver dados (DataFrames, dicionários), não figuras.
+    """
+    import streamlit as st
+    memoria = st.session_state.setdefault('_secoes_memorizadas', {}).setdefault(nome, OrderedDict())
+    chave = repr(chave)
+    if chave in memoria:
+        memoria.move_to_end(chave)
+        contar('secoes_memorizadas_acerto')
+        return memoria[chave]
+    contar('secoes_memorizadas_falha')
+    resultado = memoria[chave] = calcular()
+    while len(memoria) > MAX_POR_SECAO:
+        memoria.popitem(last=False)
+    return resultado
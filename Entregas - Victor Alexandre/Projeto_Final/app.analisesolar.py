@@ -4,7 +4,18 @@ import plotly.express as px
 import os
 from datetime import datetime
 import google.generativeai as genai
-import numpy as np
+from camada_dados import versao_arquivo
+from cubo import agregar_por, serie_mensal, totais
+from foco import MODELO_CLIENTE, MODELO_CLIENTE_DISTANCIA, mensagem_foco, mensagens_por_segmento
+from servico_dados import conectar
+from perfis import PERFIS_CLIENTE
+from orientador_ia import CacheRespostas, GeradorAnalises, ModeloFalso, montar_resumo_dados
+from lote_ia import NOME_ARQUIVO_LOTE_IA, SEGMENTOS, ArmazemAnalises
+from plano_acao import ArmazemPlanos, COLUNAS_ACOES, STATUS_ACAO
+from paginacao import paginar_frame, tabela_paginada
+from exportacao import FORMATOS_EXPORTACAO, caminho_exportacao, exportacao_em_cache, ler_exportacao
+from instrumentacao import REGISTRO, etapa, finalizar_execucao, iniciar_execucao
+from abas import abas_sob_demanda, memorizar_secao
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -12,34 +23,56 @@ st.set_page_config(
     page_icon="🧠",
     layout="wide"
 )
+# Cada interação reexecuta o script: mede as etapas desta execução (painel no fim da barra lateral)
+iniciar_execucao('analisesolar')
 
 # --- CONSTANTES E CONFIGURAÇÕES ---
-NOME_ARQUIVO_DADOS = 'dados_visitas.csv'
-NOME_ARQUIVO_ACOES = 'planos_de_acao.csv'
 NOME_ARQUIVO_METAS = 'metas_equipe.csv'
 
 LISTA_FUNCIONARIOS = [
     "Ana Julia", "Bruno Carvalho", "Carla Dias", "Daniel Martins", "Fernanda Souza", "Victor Alexandre", "Vinicius Alexandre"
 ]
-PERFIS_CLIENTE = ["Residencial", "Comercial", "Industrial", "Agronegócio", "Condomínio"]
+
+# Colunas lidas para filtros, rankings e gráficos. Endereço e observações (texto livre,
+# as colunas mais pesadas) só são lidas quando a exportação pede.
+COLUNAS_PAINEL = (
+    'data_visita', 'nome_funcionario', 'nome_consumidor', 'cidade', 'estado',
+    'telefone', 'valor_fatura_r$', 'latitude', 'longitude', 'perfil_cliente', 'perfil_flags'
+)
+COLUNAS_TEXTO_LIVRE = ('endereco', 'observacoes')
+# Colunas da tabela detalhada (aba de gráficos); a coluna derivada `mes_ano` vai só na exportação
+COLUNAS_TABELA = COLUNAS_PAINEL[:-1] + COLUNAS_TEXTO_LIVRE
+COLUNAS_EXPORTACAO = list(COLUNAS_PAINEL) + ['mes_ano'] + list(COLUNAS_TEXTO_LIVRE)
+# Até este nº de linhas o arquivo de exportação é gerado sem precisar clicar em "Preparar arquivo"
+LINHAS_EXPORTACAO_DIRETA = 200_000
 
 # --- CONFIGURAÇÃO DO MODELO DE IA (GEMINI) ---
 modelo_ia = None
 try:
-    if 'GOOGLE_API_KEY' in st.secrets:
+    if os.environ.get('ORIENTADOR_IA_FALSO'):
+        modelo_ia = ModeloFalso()  # respostas simuladas, para testar sem chave nem rede
+    elif 'GOOGLE_API_KEY' in st.secrets:
         genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
         modelo_ia = genai.GenerativeModel('gemini-2.5-flash')
 except Exception as e:
     st.sidebar.error(f"Erro ao configurar a API do Google: {e}. A funcionalidade de IA está desabilitada.")
 
 # --- FUNÇÕES DE CARREGAMENTO E PREPARAÇÃO DE DADOS ---
-@st.cache_data(ttl=300)
-def carregar_dados(caminho_arquivo, colunas_data=[]):
-    """Função genérica para carregar dados de arquivos CSV."""
+@st.cache_data(max_entries=16)
+def carregar_dados(caminho_arquivo, colunas_data=[], versao=None):
+    """Função genérica para carregar dados de arquivos CSV.
+
+    `versao` (ver `versao_arquivo`) faz parte da chave do cache: quando o arquivo muda,
+    só a entrada dele é recarregada, sem invalidar os outros conjuntos de dados.
+    """
     if not os.path.exists(caminho_arquivo):
         return pd.DataFrame()
     try:
-        df = pd.read_csv(caminho_arquivo, encoding='latin1')
+        try:
+            # Os apps gravam em UTF-8 (padrão do to_csv); latin1 fica para arquivos antigos
+            df = pd.read_csv(caminho_arquivo, encoding='utf-8')
+        except UnicodeDecodeError:
+            df = pd.read_csv(caminho_arquivo, encoding='latin1')
         for col in colunas_data:
             if col in df.columns:
                 df[col] = pd.to_datetime(df[col], errors='coerce')
@@ -47,71 +80,99 @@ def carregar_dados(caminho_arquivo, colunas_data=[]):
     except pd.errors.EmptyDataError:
         return pd.DataFrame()
 
-def preparar_dados_visitas(df):
-    """Prepara o DataFrame de visitas, garantindo que as colunas existam."""
-    if df.empty:
-        return df
-    df['valor_fatura_r$'] = pd.to_numeric(df['valor_fatura_r$'], errors='coerce').fillna(0)
-    for col in ['cidade', 'estado', 'nome_funcionario', 'perfil_cliente', 'telefone']:
-        if col not in df.columns:
-            df[col] = ''
-        df[col] = df[col].fillna('')
-    if 'data_visita' in df.columns and pd.api.types.is_datetime64_any_dtype(df['data_visita']):
-      df['mes_ano'] = df['data_visita'].dt.to_period('M').astype(str)
-    for col in ['latitude', 'longitude']:
-        if col not in df.columns:
-            df[col] = np.nan
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    return df
+@st.cache_data(max_entries=4)
+def listar_analises_lote(versao):
+    """Índice das análises em lote (tipo, segmento, data); `versao` é a de `versao_arquivo` do SQLite, renovada a cada gravação."""
+    if versao is None:
+        return pd.DataFrame()
+    return ArmazemAnalises().listar()
+
+@st.cache_resource
+def obter_fonte_dados():
+    """Tabela, índices e cubo das visitas, compartilhados por todas as sessões.
+
+    Ficam no próprio processo, ou no serviço de dados quando `SERVICO_DADOS` está definida (ver servico_dados.py).
+    """
+    return conectar(COLUNAS_PAINEL)
+
+@st.cache_resource
+def obter_gerador_analises():
+    """Executor e cache de respostas do Orientador IA, compartilhados por todas as sessões."""
+    return GeradorAnalises(CacheRespostas())
+
+@st.cache_resource
+def obter_armazem_planos():
+    """Plano de ação (análises + ações), importando o CSV antigo na primeira vez."""
+    return ArmazemPlanos()
 
 # --- FUNÇÃO HELPER PARA DOWNLOAD ---
-@st.cache_data
 def convert_df_to_csv(df):
-    """Converte um DataFrame para CSV em bytes, pronto para download."""
+    """Converte um DataFrame pequeno (ex.: mensagens do foco) para CSV em bytes, pronto para download.
+
+    As visitas filtradas não passam por aqui: são exportadas em blocos (ver exportacao.py).
+    """
     return df.to_csv(index=False).encode('utf-8')
 
 # --- CARREGANDO TODOS OS DADOS ---
-df_visitas = preparar_dados_visitas(carregar_dados(NOME_ARQUIVO_DADOS, colunas_data=['data_visita']))
+with etapa("carregar dados") as medida:
+    fonte_dados = obter_fonte_dados()
+    versao_visitas = fonte_dados.atualizar()
+    opcoes_filtros = fonte_dados.opcoes()
+    medida.linhas = opcoes_filtros['linhas']
 
 # --- TÍTULO E FILTROS LATERAIS ---
 st.title("🧠 Dashboard de Análise Estratégica de Vendas")
 st.sidebar.title("Opções")
 st.sidebar.header("Filtros de Análise")
 
-if df_visitas.empty:
+if opcoes_filtros['linhas'] == 0:
     st.warning("Nenhum dado de visita encontrado. Comece registrando visitas no app de coleta.")
     st.stop()
 # --- FILTROS ---
-estado_selecionado = st.sidebar.multiselect('Estado', options=sorted(df_visitas['estado'].unique()), default=sorted(df_visitas['estado'].unique()))
-cidades_disponiveis = sorted(df_visitas[df_visitas['estado'].isin(estado_selecionado)]['cidade'].unique())
+estado_selecionado = st.sidebar.multiselect('Estado', options=opcoes_filtros['estados'], default=opcoes_filtros['estados'])
+cidades_disponiveis = sorted({c for e in estado_selecionado for c in opcoes_filtros['cidades_por_estado'].get(e, [])})
 cidade_selecionada = st.sidebar.multiselect('Cidade', options=cidades_disponiveis, default=cidades_disponiveis)
 funcionario_selecionado = st.sidebar.multiselect('Funcionário', options=LISTA_FUNCIONARIOS, default=LISTA_FUNCIONARIOS)
 
 # NOVO FILTRO: Perfil de Cliente
-perfis_disponiveis = sorted(list(set(p for sublist in df_visitas['perfil_cliente'].str.split(',') for p in sublist if p)))
+perfis_disponiveis = opcoes_filtros['perfis']
 perfil_selecionado = st.sidebar.multiselect('Perfil do Cliente', options=perfis_disponiveis, default=perfis_disponiveis)
 
-min_date, max_date = df_visitas['data_visita'].min().date(), df_visitas['data_visita'].max().date()
+min_date, max_date = opcoes_filtros['data_min'], opcoes_filtros['data_max']
 if min_date <= max_date:
     data_selecionada = st.sidebar.date_input('Período da Visita', value=(min_date, max_date), min_value=min_date, max_value=max_date)
 else:
     data_selecionada = (min_date, max_date)
 
 # --- APLICANDO FILTROS ---
-df_filtrado = df_visitas.copy()
-if len(data_selecionada) == 2:
-    df_filtrado = df_filtrado[df_filtrado['data_visita'].dt.date.between(data_selecionada[0], data_selecionada[1])]
-if estado_selecionado:
-    df_filtrado = df_filtrado[df_filtrado['estado'].isin(estado_selecionado)]
-if cidade_selecionada:
-    df_filtrado = df_filtrado[df_filtrado['cidade'].isin(cidade_selecionada)]
-if funcionario_selecionado:
-    df_filtrado = df_filtrado[df_filtrado['nome_funcionario'].isin(funcionario_selecionado)]
-
-# Lógica do novo filtro de perfil
-if perfil_selecionado:
-    df_filtrado = df_filtrado[df_filtrado['perfil_cliente'].str.contains('|'.join(perfil_selecionado), na=False)]
-
+# O índice resolve período, estados, cidades, funcionários e perfis sem varrer a tabela inteira
+periodo = data_selecionada if len(data_selecionada) == 2 else (None, None)
+filtros = dict(
+    data_inicio=periodo[0], data_fim=periodo[1],
+    estados=estado_selecionado, cidades=cidade_selecionada,
+    funcionarios=funcionario_selecionado, perfis=perfil_selecionado,
+)
+# As tabelas pedem só a página visível à fonte de dados; aqui basta o total do recorte
+with etapa("filtrar") as medida:
+    total_filtrado = medida.linhas = fonte_dados.contar(filtros)
+
+# Rankings, gráficos e o resumo da IA saem do cubo: o custo depende do nº de células, não de visitas.
+# Só as abas que usam os agregados os pedem, e eles ficam memorizados por filtros e versão dos dados.
+def calcular_agregados():
+    celulas = fonte_dados.celulas(filtros)
+    return (
+        celulas,
+        agregar_por(celulas, 'nome_funcionario').set_index('nome_funcionario'),
+        agregar_por(celulas, 'cidade').set_index('cidade'),
+        totais(celulas),
+    )
+
+def obter_agregados():
+    """(células filtradas, resumo por funcionário, resumo por cidade, totais)."""
+    with etapa("preparar agregados") as medida:
+        agregados = memorizar_secao("agregados", (filtros, versao_visitas), calcular_agregados)
+        medida.linhas = len(agregados[0])
+    return agregados
 
 # --- ÁREA DO GESTOR PARA METAS ---
 st.sidebar.markdown("---")
@@ -131,7 +192,7 @@ if senha_gestor == "admin123":
                 id_meta = f"META-{meta_funcionario}-{meta_periodo.replace('/', '-')}"
                 nova_meta = pd.DataFrame([{'id_meta': id_meta, 'funcionario': meta_funcionario, 'metrica': meta_metrica, 'valor_meta': meta_valor, 'periodo': meta_periodo}])
                 
-                df_metas_existente = carregar_dados(NOME_ARQUIVO_METAS)
+                df_metas_existente = carregar_dados(NOME_ARQUIVO_METAS, versao=versao_arquivo(NOME_ARQUIVO_METAS))
                 
                 # CORREÇÃO: Apenas tenta filtrar se o DataFrame não estiver vazio.
                 if not df_metas_existente.empty:
@@ -140,246 +201,442 @@ if senha_gestor == "admin123":
                 df_metas_atualizado = pd.concat([df_metas_existente, nova_meta], ignore_index=True)
                 df_metas_atualizado.to_csv(NOME_ARQUIVO_METAS, index=False)
                 st.sidebar.success(f"Meta salva para {meta_funcionario}!")
-                st.cache_data.clear()
 
 # --- SEÇÃO PRINCIPAL - ABAS ---
-tab_rapida, tab_geo, tab_rank, tab_ia, tab_acao, tab_graficos = st.tabs([
+# Só a aba aberta é executada (ver abas.py); trocar de aba reexecuta o script
+tab_rapida, tab_geo, tab_rank, tab_ia, tab_acao, tab_graficos = abas_sob_demanda([
     "🚀 Ações Rápidas", 
     "🗺️ Análise Geográfica",
     "🏆 Ranking & Metas", 
     "🤖 Orientador IA", 
     "🎯 Plano de Ação", 
     "📊 Gráficos Detalhados"
-])
+], chave="aba_ativa")
 
-with tab_rapida:
-    st.header("🚀 Ações Rápidas e Comunicação")
-    st.markdown("Use estas ferramentas para agilizar a comunicação e exportar dados.")
+if tab_rapida.open:
+    with tab_rapida, etapa("aba Ações Rápidas"):
+        st.header("🚀 Ações Rápidas e Comunicação")
+        st.markdown("Use estas ferramentas para agilizar a comunicação e exportar dados.")
 
-    # --- FERRAMENTA 1: GERADOR DE FOCO SEMANAL ---
-    st.subheader("Gerador de Foco Semanal")
+        # --- FERRAMENTA 1: GERADOR DE FOCO SEMANAL ---
+        st.subheader("Gerador de Foco Semanal")
     
-    col_foco1, col_foco2 = st.columns(2)
-    top_n = col_foco1.number_input("Nº de clientes prioritários para focar", min_value=1, max_value=20, value=5)
-    fatura_minima = col_foco2.number_input("Apenas clientes com fatura acima de (R$)", min_value=0, value=500)
+        col_foco1, col_foco2 = st.columns(2)
+        top_n = col_foco1.number_input("Nº de clientes prioritários para focar", min_value=1, max_value=20, value=5, key="foco_top_n", persist_state="page")
+        fatura_minima = col_foco2.number_input("Apenas clientes com fatura acima de (R$)", min_value=0, value=500, key="foco_fatura_minima", persist_state="page")
+
+        criterio_foco = st.radio("Priorizar por", ["Maior fatura", "Proximidade de um ponto"], horizontal=True, key="foco_criterio", persist_state="page")
+        if criterio_foco == "Proximidade de um ponto":
+            # Ponto de partida padrão: centro das visitas filtradas com coordenadas
+            lat_padrao, lon_padrao = fonte_dados.centro(filtros) or (-16.686891, -49.264870)
+            col_prox1, col_prox2, col_prox3 = st.columns(3)
+            lat_partida = col_prox1.number_input("Latitude de partida", value=lat_padrao, format="%.6f")
+            lon_partida = col_prox2.number_input("Longitude de partida", value=lon_padrao, format="%.6f")
+            raio_km = col_prox3.number_input("Raio de deslocamento (km)", min_value=1, max_value=1000, value=50, key="foco_raio_km", persist_state="page")
+            perfis_prioritarios = st.multiselect("Perfis prioritários (peso dobrado)", options=PERFIS_CLIENTE, key="foco_perfis_prioritarios", persist_state="page")
+            st.caption("Os clientes dentro do raio são ordenados pela fatura, com peso maior para os perfis prioritários e desconto pela distância.")
+
+        if st.button("Gerar Mensagem de Foco"):
+            if criterio_foco == "Proximidade de um ponto":
+                # Busca por raio no índice espacial, sem varrer as visitas
+                clientes_foco = fonte_dados.oportunidades_proximas(
+                    filtros, lat_partida, lon_partida, raio_km,
+                    pesos_perfil={p: 2.0 for p in perfis_prioritarios}, valor_minimo=fatura_minima, n=top_n,
+                )
+                modelo_mensagem = MODELO_CLIENTE_DISTANCIA
+            else:
+                clientes_foco = fonte_dados.maiores(filtros, top_n, fatura_minima)
+                modelo_mensagem = MODELO_CLIENTE
+
+            if clientes_foco.empty:
+                st.warning("Nenhum cliente encontrado com os critérios de foco definidos.")
+            else:
+                mensagem = mensagem_foco(clientes_foco, modelo=modelo_mensagem)
+                st.text_area("Mensagem pronta para copiar e colar:", value=mensagem, height=300)
+
+        # Mensagens de toda a equipe (ou de todas as cidades/estados) numa passada só
+        with st.expander("Gerar mensagens para toda a equipe"):
+            segmentar_por = st.selectbox("Uma mensagem por", ["Funcionário", "Cidade", "Estado"], key="foco_segmentar_por", persist_state="page")
+            if st.button("Gerar Mensagens em Lote"):
+                coluna_segmento = {"Funcionário": 'nome_funcionario', "Cidade": 'cidade', "Estado": 'estado'}[segmentar_por]
+                mensagens_lote = mensagens_por_segmento(fonte_dados.maiores_por_segmento(filtros, top_n, coluna_segmento, fatura_minima))
+                if mensagens_lote.empty:
+                    st.warning("Nenhum cliente encontrado com os critérios de foco definidos.")
+                else:
+                    for _, linha in mensagens_lote.iterrows():
+                        st.text_area(f"{linha['segmento']} ({linha['clientes']} clientes)", value=linha['mensagem'], height=200)
+                    st.download_button(
+                        label="📥 Baixar Mensagens (CSV)",
+                        data=convert_df_to_csv(mensagens_lote),
+                        file_name=f"mensagens_foco_{datetime.now().strftime('%Y%m%d')}.csv",
+                        mime='text/csv',
+                    )
+
+        st.markdown("---")
+
+        # --- FERRAMENTA 2: EXPORTAR DADOS ---
+        st.subheader("Exportar Dados Filtrados")
+        st.markdown("Baixe a seleção de dados atual (considerando todos os filtros da barra lateral) em CSV, CSV compactado ou Parquet.")
     
-    if st.button("Gerar Mensagem de Foco"):
-        clientes_foco = df_filtrado[df_filtrado['valor_fatura_r$'] >= fatura_minima]
-        clientes_foco = clientes_foco.nlargest(top_n, 'valor_fatura_r$')
-
-        if clientes_foco.empty:
-            st.warning("Nenhum cliente encontrado com os critérios de foco definidos.")
+        if total_filtrado:
+            formato_exportacao = st.radio("Formato do arquivo", list(FORMATOS_EXPORTACAO), horizontal=True, key="formato_exportacao", persist_state="page")
+            # O arquivo é gravado em blocos e reaproveitado enquanto filtros, formato e versão dos dados não mudam
+            ja_exportado = os.path.exists(caminho_exportacao(filtros, COLUNAS_EXPORTACAO, formato_exportacao, versao_visitas))
+            linhas_texto = f"{total_filtrado:,}".replace(",", ".")
+            if ja_exportado or total_filtrado <= LINHAS_EXPORTACAO_DIRETA or st.button(f"Preparar arquivo ({linhas_texto} linhas)"):
+                barra_exportacao = st.progress(0.0, text="Preparando o arquivo...")
+                with etapa("exportação", linhas=total_filtrado):
+                    exportacao_em_cache(
+                        fonte_dados, filtros, COLUNAS_EXPORTACAO, formato_exportacao, versao_visitas,
+                        progresso=lambda feitas, total: barra_exportacao.progress(
+                            feitas / max(total, 1), text=f"Exportando: {feitas:,} de {total:,} linhas".replace(",", ".")
+                        ),
+                    )
+                barra_exportacao.empty()
+                extensao, tipo_mime = FORMATOS_EXPORTACAO[formato_exportacao]
+                # Download adiado: o arquivo só é lido quando o botão é clicado, não a cada interação
+                st.download_button(
+                   label=f"📥 Baixar Dados ({formato_exportacao})",
+                   data=lambda: ler_exportacao(fonte_dados, filtros, COLUNAS_EXPORTACAO, formato_exportacao, versao_visitas),
+                   file_name=f"dados_solares_{datetime.now().strftime('%Y%m%d')}{extensao}",
+                   mime=tipo_mime,
+                )
         else:
-            data_inicio_foco = datetime.now().strftime("%d/%m/%Y")
-            mensagem = f"🎯 FOCO DA SEMANA - {data_inicio_foco} 🎯\n\n"
-            mensagem += "Equipe, vamos priorizar o contato com os seguintes clientes de alto potencial identificados na plataforma:\n\n"
-            
-            for index, row in clientes_foco.iterrows():
-                mensagem += f"👤 Cliente: {row['nome_consumidor']}\n"
-                mensagem += f"📍 Cidade: {row['cidade']}\n"
-                mensagem += f"📞 Telefone: {row['telefone']}\n"
-                mensagem += f"💰 Potencial (Fatura): R$ {row['valor_fatura_r$']:.2f}\n"
-                mensagem += "--------------------------------------\n"
-            
-            st.text_area("Mensagem pronta para copiar e colar:", value=mensagem, height=300)
-
-    st.markdown("---")
+            st.info("Não há dados para exportar com os filtros atuais.")
 
-    # --- FERRAMENTA 2: EXPORTAR DADOS ---
-    st.subheader("Exportar Dados Filtrados")
-    st.markdown("Baixe a seleção de dados atual (considerando todos os filtros da barra lateral) em formato CSV.")
+if tab_geo.open:
+    with tab_geo, etapa("aba Análise Geográfica"):
+        # --- NOVA SEÇÃO: ANÁLISE GEOGRÁFICA ---
+        st.header("🗺️ Análise Geográfica das Visitas")
+        st.markdown("Visualize a distribuição e o potencial das visitas no mapa. Use os filtros na barra lateral para refinar.")
     
-    if not df_filtrado.empty:
-        csv_data = convert_df_to_csv(df_filtrado)
-        st.download_button(
-           label="📥 Baixar Dados para CSV",
-           data=csv_data,
-           file_name=f"dados_solares_{datetime.now().strftime('%Y%m%d')}.csv",
-           mime='text/csv',
-        )
-    else:
-        st.info("Não há dados para exportar com os filtros atuais.")
-
-with tab_geo:
-    # --- NOVA SEÇÃO: ANÁLISE GEOGRÁFICA ---
-    st.header("🗺️ Análise Geográfica das Visitas")
-    st.markdown("Visualize a distribuição e o potencial das visitas no mapa. Use os filtros na barra lateral para refinar.")
-    
-    df_mapa = df_filtrado.dropna(subset=['latitude', 'longitude']).copy()
-    df_mapa = df_mapa[(df_mapa['latitude'] != 0) & (df_mapa['longitude'] != 0)] # Remove pontos na coordenada 0,0
-
-    if df_mapa.empty:
-        st.info("Nenhuma visita com coordenadas geográficas no período ou filtros selecionados. Adicione coordenadas no app de coleta para visualizar o mapa.")
-    else:
         st.subheader("Mapa de Calor de Potencial")
-        fig_mapa = px.scatter_mapbox(
-            df_mapa, 
-            lat="latitude", 
-            lon="longitude", 
-            size="valor_fatura_r$",
-            color="valor_fatura_r$",
-            hover_name="nome_consumidor",
-            hover_data={"cidade": True, "valor_fatura_r$": True, "latitude": False, "longitude": False},
-            color_continuous_scale=px.colors.cyclical.IceFire,
-            size_max=50,
-            zoom=3,
-            mapbox_style="open-street-map"
-        )
-        fig_mapa.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
-        st.plotly_chart(fig_mapa, use_container_width=True)
+        col_mapa1, col_mapa2 = st.columns(2)
+        max_marcadores = col_mapa1.slider("Máximo de marcadores no mapa", min_value=100, max_value=5000, value=1000, step=100, key="mapa_max_marcadores", persist_state="page")
+        estilo_mapa = col_mapa2.radio("Visualização", ["Bolhas", "Densidade"], horizontal=True, key="mapa_estilo", persist_state="page")
+        colunas_mapa = ['nome_consumidor', 'cidade', 'valor_fatura_r$', 'perfil_cliente', 'latitude', 'longitude']
+        def montar_mapa(mapa):
+            if mapa['pontos'] is not None:
+                # Poucas visitas: cada visita é um marcador, como antes
+                fig_mapa = px.scatter_mapbox(
+                    mapa['pontos'], 
+                    lat="latitude", 
+                    lon="longitude", 
+                    size="valor_fatura_r$",
+                    color="valor_fatura_r$",
+                    hover_name="nome_consumidor",
+                    hover_data={"cidade": True, "valor_fatura_r$": True, "latitude": False, "longitude": False},
+                    color_continuous_scale=px.colors.cyclical.IceFire,
+                    size_max=50,
+                    zoom=3,
+                    mapbox_style="open-street-map"
+                ) if estilo_mapa == "Bolhas" else px.density_mapbox(
+                    mapa['pontos'], lat="latitude", lon="longitude", z="valor_fatura_r$", radius=20, zoom=3, mapbox_style="open-street-map"
+                )
+            else:
+                # Muitas visitas: agrega numa grade de geohash com no máximo `max_marcadores` células
+                fig_mapa = px.scatter_mapbox(
+                    mapa['celulas'],
+                    lat="latitude",
+                    lon="longitude",
+                    size="visitas",
+                    color="media",
+                    hover_name="geohash",
+                    hover_data={"visitas": True, "soma": ':.2f', "media": ':.2f', "latitude": False, "longitude": False},
+                    labels={"visitas": "Nº de Visitas", "soma": "Potencial Total (R$)", "media": "Fatura Média (R$)"},
+                    color_continuous_scale=px.colors.cyclical.IceFire,
+                    size_max=50,
+                    zoom=3,
+                    mapbox_style="open-street-map"
+                ) if estilo_mapa == "Bolhas" else px.density_mapbox(
+                    mapa['celulas'], lat="latitude", lon="longitude", z="soma", radius=20, zoom=3, mapbox_style="open-street-map"
+                )
+            fig_mapa.update_layout(margin={"r":0,"t":0,"l":0,"b":0})
+            return fig_mapa
+
+        # Pontos sem coordenada ou em 0,0 ficam de fora; acima do limite, vem a grade de geohash.
+        # Os dados do mapa só são refeitos quando os filtros, os dados ou o limite de marcadores mudam
+        mapa = memorizar_secao("mapa", (filtros, versao_visitas, max_marcadores), lambda: fonte_dados.mapa(filtros, max_marcadores, colunas_mapa))
+
+        if mapa['total'] == 0:
+            st.info("Nenhuma visita com coordenadas geográficas no período ou filtros selecionados. Adicione coordenadas no app de coleta para visualizar o mapa.")
+        else:
+            df_mapa, celulas_geo = mapa['pontos'], mapa['celulas']
+            if celulas_geo is not None:
+                st.caption(f"{mapa['total']} visitas agrupadas em {len(celulas_geo)} células (geohash de {mapa['precisao']} caracteres).")
+            st.plotly_chart(montar_mapa(mapa), use_container_width=True)
         
-        with st.expander("Ver dados geográficos detalhados"):
-            st.dataframe(df_mapa[['nome_consumidor', 'cidade', 'valor_fatura_r$', 'perfil_cliente', 'latitude', 'longitude']])
-
-with tab_rank:
-    # --- SEÇÃO: RANKING & METAS ---
-    st.header("🏆 Ranking & Metas da Equipe")
-    if not df_filtrado.empty:
-        st.subheader("Ranking de Performance (Período Selecionado)")
-        col_rank1, col_rank2, col_rank3 = st.columns(3)
+            with st.expander("Ver dados geográficos detalhados"):
+                if celulas_geo is None:
+                    tabela_paginada(
+                        lambda inicio, tamanho, ordenar_por, decrescente, busca: paginar_frame(
+                            df_mapa[colunas_mapa], inicio, tamanho, ordenar_por, decrescente, busca
+                        ),
+                        colunas_mapa, chave="tabela_mapa", contexto=filtros,
+                    )
+                else:
+                    # Detalhamento de uma célula: as visitas saem do índice espacial, sem varrer a tabela
+                    celula_escolhida = st.selectbox(
+                        "Célula (ordenadas pelo potencial total)", options=celulas_geo['geohash'].head(500),
+                        format_func=lambda g: f"{g} - {int(celulas_geo.loc[celulas_geo['geohash'] == g, 'visitas'].iloc[0])} visitas",
+                        key="mapa_celula", persist_state="page",
+                    )
+                    tabela_paginada(
+                        lambda inicio, tamanho, ordenar_por, decrescente, busca: fonte_dados.pagina(
+                            filtros, colunas_mapa, inicio, tamanho, ordenar_por, decrescente, busca, geohash=celula_escolhida
+                        ),
+                        colunas_mapa, chave="tabela_celula", contexto=(filtros, celula_escolhida),
+                    )
+
+if tab_rank.open:
+    with tab_rank, etapa("aba Ranking & Metas"):
+        # --- SEÇÃO: RANKING & METAS ---
+        st.header("🏆 Ranking & Metas da Equipe")
+        if total_filtrado:
+            celulas_filtradas, resumo_funcionarios, resumo_cidades, totais_filtrados = obter_agregados()
+            st.subheader("Ranking de Performance (Período Selecionado)")
+            col_rank1, col_rank2, col_rank3 = st.columns(3)
         
-        with col_rank1:
-            st.markdown("#### 🚀 Mais Visitas")
-            ranking_visitas = df_filtrado['nome_funcionario'].value_counts().reset_index()
-            ranking_visitas.columns = ['Funcionário', 'Nº de Visitas']
-            st.dataframe(ranking_visitas, use_container_width=True, hide_index=True)
-
-        with col_rank2:
-            st.markdown("#### 💰 Maior Ticket Médio")
-            ranking_ticket = df_filtrado.groupby('nome_funcionario')['valor_fatura_r$'].mean().round(2).sort_values(ascending=False).reset_index()
-            ranking_ticket.columns = ['Funcionário', 'Ticket Médio (R$)']
-            st.dataframe(ranking_ticket, use_container_width=True, hide_index=True)
-
-        with col_rank3:
-            st.markdown("#### 📈 Maior Potencial Gerado")
-            ranking_potencial = df_filtrado.groupby('nome_funcionario')['valor_fatura_r$'].sum().sort_values(ascending=False).reset_index()
-            ranking_potencial.columns = ['Funcionário', 'Potencial Total (R$)']
-            st.dataframe(ranking_potencial, use_container_width=True, hide_index=True)
-
-        st.subheader("Acompanhamento de Metas Individuais")
-        df_metas = carregar_dados(NOME_ARQUIVO_METAS)
-        if df_metas.empty:
-            st.info("Nenhuma meta foi definida. Use a 'Área do Gestor' na barra lateral para criar metas.")
+            with col_rank1:
+                st.markdown("#### 🚀 Mais Visitas")
+                ranking_visitas = resumo_funcionarios['visitas'].sort_values(ascending=False).reset_index()
+                ranking_visitas.columns = ['Funcionário', 'Nº de Visitas']
+                st.dataframe(ranking_visitas, use_container_width=True, hide_index=True)
+
+            with col_rank2:
+                st.markdown("#### 💰 Maior Ticket Médio")
+                ranking_ticket = resumo_funcionarios['media'].round(2).sort_values(ascending=False).reset_index()
+                ranking_ticket.columns = ['Funcionário', 'Ticket Médio (R$)']
+                st.dataframe(ranking_ticket, use_container_width=True, hide_index=True)
+
+            with col_rank3:
+                st.markdown("#### 📈 Maior Potencial Gerado")
+                ranking_potencial = resumo_funcionarios['soma'].sort_values(ascending=False).reset_index()
+                ranking_potencial.columns = ['Funcionário', 'Potencial Total (R$)']
+                st.dataframe(ranking_potencial, use_container_width=True, hide_index=True)
+
+            st.subheader("Acompanhamento de Metas Individuais")
+            versao_metas = versao_arquivo(NOME_ARQUIVO_METAS)
+            df_metas = carregar_dados(NOME_ARQUIVO_METAS, versao=versao_metas)
+            if df_metas.empty:
+                st.info("Nenhuma meta foi definida. Use a 'Área do Gestor' na barra lateral para criar metas.")
+            else:
+                # Cada meta usa o período dela (ex.: "Junho/2025"), não o período da barra lateral
+                progresso_metas = memorizar_secao("metas", (versao_visitas, versao_metas), lambda: fonte_dados.progresso_metas(df_metas))
+                st.caption("O progresso considera o período de cada meta, independentemente do período selecionado na barra lateral.")
+                periodos_invalidos = progresso_metas.loc[~progresso_metas['periodo_valido'], 'periodo'].unique()
+                if len(periodos_invalidos):
+                    st.warning(f"Períodos não reconhecidos (use, por exemplo, 'Julho/2025'): {', '.join(map(str, periodos_invalidos))}")
+                tabela_metas = progresso_metas.assign(progresso=progresso_metas['progresso'] * 100)[
+                    ['funcionario', 'periodo', 'metrica', 'valor_meta', 'valor_atual', 'diferenca', 'progresso']
+                ]
+                st.dataframe(
+                    tabela_metas, use_container_width=True, hide_index=True,
+                    column_config={
+                        'funcionario': 'Funcionário',
+                        'periodo': 'Meta para',
+                        'metrica': 'Métrica',
+                        'valor_meta': st.column_config.NumberColumn('Meta', format="%.2f"),
+                        'valor_atual': st.column_config.NumberColumn('Atual', format="%.2f"),
+                        'diferenca': st.column_config.NumberColumn('Diferença', format="%.2f"),
+                        'progresso': st.column_config.ProgressColumn('Progresso', format="%.0f%%", min_value=0, max_value=100),
+                    },
+                )
         else:
-            for index, meta in df_metas.iterrows():
-                with st.container(border=True):
-                    st.markdown(f"**Funcionário:** {meta['funcionario']} | **Meta para:** {meta['periodo']}")
-                    valor_atual = 0
-                    if meta['metrica'] == 'Nº de Visitas':
-                        valor_atual = ranking_visitas[ranking_visitas['Funcionário'] == meta['funcionario']]['Nº de Visitas'].sum()
-                    elif meta['metrica'] == 'Ticket Médio (R$)':
-                        if not ranking_ticket[ranking_ticket['Funcionário'] == meta['funcionario']].empty:
-                            valor_atual = ranking_ticket[ranking_ticket['Funcionário'] == meta['funcionario']]['Ticket Médio (R$)'].iloc[0]
-
-                    meta_valor = meta['valor_meta']
-                    progresso = min(valor_atual / meta_valor, 1.0) if meta_valor > 0 else 0.0
-                    col_meta1, col_meta2 = st.columns([1, 3])
-                    with col_meta1:
-                        st.metric(label=meta['metrica'], value=f"{valor_atual:.2f}", delta=f"{valor_atual - meta_valor:.2f}")
-                    with col_meta2:
-                        st.markdown(f"**Progresso para a meta de {meta_valor}**")
-                        st.progress(progresso, text=f"{progresso:.0%}")
-    else:
-        st.info("Sem dados no período selecionado para exibir o ranking.")
-
-with tab_ia:
-    # --- SEÇÃO DO ORIENTADOR IA (GEMINI) ---
-    st.header("🤖 Orientador de Investimentos (IA)")
-    if modelo_ia:
-        if not df_filtrado.empty:
-            if st.button("Gerar Análise e Recomendações"):
-                with st.spinner("A IA está analisando os dados..."):
-                    resumo_dados = f"Análise de dados de visitas para empresa de energia solar. Período: {data_selecionada[0]} a {data_selecionada[1]}. Filtros: Estados={estado_selecionado}, Cidades={cidade_selecionada}. Total de visitas: {len(df_filtrado)}. Fatura média: R$ {df_filtrado['valor_fatura_r$'].mean():.2f}. Top 3 cidades (fatura média): {df_filtrado.groupby('cidade')['valor_fatura_r$'].mean().nlargest(3).to_dict()}. Top 3 funcionários (nº visitas): {df_filtrado['nome_funcionario'].value_counts().nlargest(3).to_dict()}"
-                    prompt = f"Você é um consultor de estratégia para uma empresa de energia solar. Baseado no resumo: {resumo_dados}\n\nEscreva uma análise em português (Markdown) com: 1. **Resumo Executivo**. 2. **Pontos de Destaque** (3 a 5 pontos). 3. **Recomendações Estratégicas** (3 ações claras)."
-                    try:
-                        resposta = modelo_ia.generate_content(prompt)
-                        st.session_state['ultima_analise_ia'] = resposta.text
-                    except Exception as e:
-                        st.error(f"Não foi possível gerar a análise: {e}")
-                        st.session_state['ultima_analise_ia'] = f"Erro na geração da análise: {e}"
-        if 'ultima_analise_ia' in st.session_state:
-            st.markdown("### Análise Gerada")
-            st.markdown(st.session_state['ultima_analise_ia'])
-    else:
-        st.info("Funcionalidade de IA desabilitada. Configure a GOOGLE_API_KEY.")
-
-with tab_acao:
-    # --- SEÇÃO DO PLANO DE AÇÃO ---
-    st.header("🎯 Plano de Ação Estratégico")
-    if 'ultima_analise_ia' in st.session_state and "Erro" not in st.session_state['ultima_analise_ia']:
-        with st.expander("➕ Criar nova ação a partir da análise", expanded=False):
-            with st.form("form_nova_acao", clear_on_submit=True):
-                recomendacao_base = st.text_area("Recomendação Original (IA)", value=st.session_state.get('ultima_analise_ia', ''), height=150, disabled=True)
-                acao_especifica = st.text_input("Ação Específica", placeholder="Ex: Iniciar campanha de marketing digital em São Paulo.")
-                responsavel = st.selectbox("Responsável", options=LISTA_FUNCIONARIOS, index=None, placeholder="Selecione um funcionário")
-                prazo = st.date_input("Prazo", min_value=datetime.today())
-                status_inicial = st.selectbox("Status", options=["A Fazer", "Em Andamento", "Concluído"], index=0)
+            st.info("Sem dados no período selecionado para exibir o ranking.")
+
+def mostrar_analise_ia():
+    """Mostra a análise; enquanto ela é gerada, só este trecho é reexecutado (ver abaixo)."""
+    tarefa = st.session_state.get('tarefa_ia')
+    if tarefa is not None and not tarefa.concluida:
+        st.markdown("### Análise Gerada")
+        st.markdown(tarefa.texto + " ▌")
+        st.caption("A IA está analisando os dados... as outras abas continuam disponíveis.")
+        return
+    if tarefa is not None and st.session_state.get('tarefa_ia_exibida') is not tarefa:
+        st.session_state['tarefa_ia_exibida'] = tarefa
+        if tarefa.erro:
+            st.session_state['ultima_analise_ia'] = f"Erro na geração da análise: {tarefa.erro}"
+        else:
+            st.session_state['ultima_analise_ia'] = tarefa.texto
+        st.rerun()  # atualiza também a aba do Plano de Ação
+    if 'ultima_analise_ia' in st.session_state:
+        if tarefa is not None and tarefa.erro:
+            st.error(f"Não foi possível gerar a análise: {tarefa.erro}")
+        st.markdown("### Análise Gerada")
+        st.markdown(st.session_state['ultima_analise_ia'])
+
+if tab_ia.open:
+    with tab_ia, etapa("aba Orientador IA"):
+        # --- SEÇÃO DO ORIENTADOR IA (GEMINI) ---
+        st.header("🤖 Orientador de Investimentos (IA)")
+        if modelo_ia:
+            if total_filtrado:
+                if st.button("Gerar Análise e Recomendações"):
+                    # Resumos iguais (mesmos filtros) são respondidos pelo cache, sem nova chamada ao modelo
+                    celulas_filtradas, resumo_funcionarios, resumo_cidades, totais_filtrados = obter_agregados()
+                    resumo_dados = montar_resumo_dados(data_selecionada, estado_selecionado, cidade_selecionada, totais_filtrados, resumo_cidades, resumo_funcionarios)
+                    st.session_state['tarefa_ia'] = obter_gerador_analises().iniciar(modelo_ia, resumo_dados)
+            # Com uma geração em andamento, o trecho da análise se atualiza sozinho a cada meio segundo
+            tarefa_ia = st.session_state.get('tarefa_ia')
+            em_andamento = tarefa_ia is not None and not tarefa_ia.concluida
+            st.fragment(mostrar_analise_ia, run_every=0.5 if em_andamento else None)()
+        else:
+            st.info("Funcionalidade de IA desabilitada. Configure a GOOGLE_API_KEY.")
+
+        # --- ANÁLISES GERADAS EM LOTE (lote_ia.py) ---
+        analises_lote = listar_analises_lote(versao_arquivo(NOME_ARQUIVO_LOTE_IA))
+        if not analises_lote.empty:
+            with st.expander("📚 Análises por segmento (geradas em lote)"):
+                tipos_lote = [t for t in SEGMENTOS if t in set(analises_lote['tipo'])]
+                tipo_lote = st.selectbox("Segmento", options=tipos_lote, format_func=SEGMENTOS.get, key="lote_tipo", persist_state="page")
+                analises_tipo = analises_lote[analises_lote['tipo'] == tipo_lote]
+                segmento_lote = st.selectbox(SEGMENTOS[tipo_lote], options=sorted(analises_tipo['segmento'].unique()), key=f"lote_segmento_{tipo_lote}", persist_state="page")
+                # Só o texto do segmento escolhido é lido do SQLite
+                analise_lote = ArmazemAnalises().obter(tipo_lote, segmento_lote)
+                if analise_lote is not None:
+                    st.caption(f"Gerada em {datetime.fromtimestamp(analise_lote['gerado_em']).strftime('%d/%m/%Y %H:%M')} ({analise_lote['modelo']})")
+                    st.markdown(analise_lote['texto'])
+                    if st.button("Usar esta análise no Plano de Ação"):
+                        st.session_state['ultima_analise_ia'] = analise_lote['texto']
+
+if tab_acao.open:
+    with tab_acao, etapa("aba Plano de Ação"):
+        # --- SEÇÃO DO PLANO DE AÇÃO ---
+        st.header("🎯 Plano de Ação Estratégico")
+        if 'ultima_analise_ia' in st.session_state and "Erro" not in st.session_state['ultima_analise_ia']:
+            with st.expander("➕ Criar nova ação a partir da análise", expanded=False):
+                with st.form("form_nova_acao", clear_on_submit=True):
+                    recomendacao_base = st.text_area("Recomendação Original (IA)", value=st.session_state.get('ultima_analise_ia', ''), height=150, disabled=True)
+                    acao_especifica = st.text_input("Ação Específica", placeholder="Ex: Iniciar campanha de marketing digital em São Paulo.")
+                    responsavel = st.selectbox("Responsável", options=LISTA_FUNCIONARIOS, index=None, placeholder="Selecione um funcionário")
+                    prazo = st.date_input("Prazo", min_value=datetime.today())
+                    status_inicial = st.selectbox("Status", options=STATUS_ACAO, index=0)
                 
-                if st.form_submit_button("✅ Adicionar Ação"):
-                    if not acao_especifica or not responsavel:
-                        st.warning("Preencha 'Ação Específica' e 'Responsável'.")
-                    else:
-                        id_acao = f"ACAO-{int(datetime.now().timestamp())}"
-                        nova_acao = pd.DataFrame([{'id_acao': id_acao, 'recomendacao_ia': recomendacao_base, 'acao_especifica': acao_especifica, 'responsavel': responsavel, 'prazo': pd.to_datetime(prazo), 'status': status_inicial, 'data_criacao': pd.to_datetime(datetime.now())}])
-                        df_acoes_existente = carregar_dados(NOME_ARQUIVO_ACOES, colunas_data=['prazo', 'data_criacao'])
-                        df_acoes_atualizado = pd.concat([df_acoes_existente, nova_acao], ignore_index=True)
-                        df_acoes_atualizado.to_csv(NOME_ARQUIVO_ACOES, index=False)
-                        st.success(f"Ação registrada para {responsavel}!")
-                        st.cache_data.clear()
-
-    st.subheader("Acompanhamento de Ações")
-    df_acoes = carregar_dados(NOME_ARQUIVO_ACOES, colunas_data=['prazo', 'data_criacao'])
-    if df_acoes.empty:
-        st.info("Nenhum plano de ação foi criado. Gere uma análise de IA para começar.")
-    else:
-        col_f1, col_f2 = st.columns(2)
-        filtro_resp = col_f1.multiselect("Filtrar Ação por Responsável", options=sorted(df_acoes['responsavel'].unique()), default=[])
-        filtro_stat = col_f2.multiselect("Filtrar Ação por Status", options=sorted(df_acoes['status'].unique()), default=[])
-
-        df_acoes_filtrado = df_acoes.copy()
-        if filtro_resp:
-            df_acoes_filtrado = df_acoes_filtrado[df_acoes_filtrado['responsavel'].isin(filtro_resp)]
-        if filtro_stat:
-            df_acoes_filtrado = df_acoes_filtrado[df_acoes_filtrado['status'].isin(filtro_stat)]
-        st.dataframe(df_acoes_filtrado, use_container_width=True)
-
-with tab_graficos:
-    # --- SEÇÃO DE GRÁFICOS DETALHADOS ---
-    st.header("📊 Análise Gráfica Detalhada")
-    if not df_filtrado.empty:
-        st.subheader("Métricas Principais do Período")
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Total de Visitas Realizadas", len(df_filtrado))
-        col2.metric("Valor Médio da Fatura", f"R$ {df_filtrado['valor_fatura_r$'].mean():.2f}")
-        col3.metric("Potencial Total (Soma das Faturas)", f"R$ {df_filtrado['valor_fatura_r$'].sum():,.2f}".replace(",", "_").replace(".", ",").replace("_", "."))
-
-        col_graf1, col_graf2 = st.columns(2)
-        with col_graf1:
-            st.subheader("Top Cidades por Fatura Média")
-            top_cidades = df_filtrado.groupby('cidade')['valor_fatura_r$'].mean().nlargest(10).sort_values(ascending=True)
-            if not top_cidades.empty:
-                fig1 = px.bar(top_cidades, x='valor_fatura_r$', y=top_cidades.index, orientation='h', title='Top 10 Cidades com Maior Fatura Média', text='valor_fatura_r$')
-                fig1.update_traces(texttemplate='R$ %{text:.2f}', textposition='inside')
-                fig1.update_layout(xaxis_title="Valor Médio (R$)", yaxis_title="Cidade", uniformtext_minsize=8, uniformtext_mode='hide')
-                st.plotly_chart(fig1, use_container_width=True)
-        with col_graf2:
-            st.subheader("Visitas por Funcionário")
-            visitas_funcionario = df_filtrado['nome_funcionario'].value_counts().nlargest(10).sort_values(ascending=True)
-            if not visitas_funcionario.empty:
-                fig2 = px.bar(visitas_funcionario, x=visitas_funcionario.values, y=visitas_funcionario.index, orientation='h', title='Top 10 Funcionários por Nº de Visitas', text=visitas_funcionario.values)
-                fig2.update_traces(texttemplate='%{text}', textposition='inside')
-                fig2.update_layout(xaxis_title="Nº de Visitas", yaxis_title="Funcionário", uniformtext_minsize=8, uniformtext_mode='hide')
-                st.plotly_chart(fig2, use_container_width=True)
+                    if st.form_submit_button("✅ Adicionar Ação"):
+                        if not acao_especifica or not responsavel:
+                            st.warning("Preencha 'Ação Específica' e 'Responsável'.")
+                        else:
+                            # A análise é gravada uma vez só; a ação guarda apenas o id dela
+                            obter_armazem_planos().criar_acao(recomendacao_base, acao_especifica, responsavel, prazo, status_inicial)
+                            st.success(f"Ação registrada para {responsavel}!")
+
+        st.subheader("Acompanhamento de Ações")
+        responsaveis_acoes, status_acoes = obter_armazem_planos().opcoes_filtro()
+        if not responsaveis_acoes:
+            st.info("Nenhum plano de ação foi criado. Gere uma análise de IA para começar.")
+        else:
+            col_f1, col_f2 = st.columns(2)
+            filtro_resp = col_f1.multiselect("Filtrar Ação por Responsável", options=responsaveis_acoes, default=[], key="acoes_responsaveis", persist_state="page")
+            filtro_stat = col_f2.multiselect("Filtrar Ação por Status", options=status_acoes, default=[], key="acoes_status", persist_state="page")
+
+            def editar_acoes(df_acoes_filtrado):
+                # Só o status é editável; cada mudança vira um UPDATE na linha da ação. A chave muda com
+                # as ações da página, para uma edição não ser reaplicada em outra página.
+                df_acoes_editado = st.data_editor(
+                    df_acoes_filtrado, use_container_width=True, hide_index=True,
+                    key=f"editor_acoes_{hash(tuple(df_acoes_filtrado['id_acao']))}",
+                    disabled=[c for c in df_acoes_filtrado.columns if c != 'status'],
+                    column_config={'status': st.column_config.SelectboxColumn("status", options=STATUS_ACAO, required=True)},
+                )
+                alteracoes = df_acoes_editado.loc[df_acoes_editado['status'] != df_acoes_filtrado['status'], ['id_acao', 'status']]
+                if not alteracoes.empty:
+                    obter_armazem_planos().atualizar_status(dict(zip(alteracoes['id_acao'], alteracoes['status'])))
+                    st.success(f"Status atualizado em {len(alteracoes)} ação(ões).")
+                return df_acoes_filtrado
+
+            # Filtros, busca, ordenação e paginação rodam no SQLite; só a página visível é lida
+            df_acoes_filtrado = tabela_paginada(
+                lambda inicio, tamanho, ordenar_por, decrescente, busca: obter_armazem_planos().pagina_acoes(
+                    filtro_resp, filtro_stat, inicio, tamanho, ordenar_por, decrescente, busca
+                ),
+                COLUNAS_ACOES, chave="tabela_acoes", contexto=(filtro_resp, filtro_stat), exibir=editar_acoes,
+            )
+
+            analise_origem = st.selectbox("Ver a análise de origem da ação", options=df_acoes_filtrado['id_acao'], index=None, placeholder="Selecione uma ação")
+            if analise_origem:
+                id_analise = df_acoes_filtrado.loc[df_acoes_filtrado['id_acao'] == analise_origem, 'id_analise'].iloc[0]
+                st.markdown(obter_armazem_planos().obter_analise(id_analise) or "Análise não encontrada.")
+
+if tab_graficos.open:
+    with tab_graficos, etapa("aba Gráficos Detalhados"):
+        # --- SEÇÃO DE GRÁFICOS DETALHADOS ---
+        st.header("📊 Análise Gráfica Detalhada")
+        if total_filtrado:
+            celulas_filtradas, resumo_funcionarios, resumo_cidades, totais_filtrados = obter_agregados()
+
+            def calcular_graficos():
+                top_cidades = resumo_cidades['media'].rename('valor_fatura_r$').nlargest(10).sort_values(ascending=True)
+                visitas_funcionario = resumo_funcionarios['visitas'].nlargest(10).sort_values(ascending=True)
+                analise_temporal = serie_mensal(celulas_filtradas).rename(columns={'visitas': 'total_visitas', 'media': 'valor_medio_fatura'}).sort_values('mes_ano')
+                return top_cidades, visitas_funcionario, analise_temporal
+
+            # Os dados dos três gráficos só são refeitos quando os filtros ou os dados mudam
+            top_cidades, visitas_funcionario, analise_temporal = memorizar_secao("graficos", (filtros, versao_visitas), calcular_graficos)
+
+            def montar_graficos():
+                fig1 = fig2 = fig3 = None
+                if not top_cidades.empty:
+                    fig1 = px.bar(top_cidades, x='valor_fatura_r$', y=top_cidades.index, orientation='h', title='Top 10 Cidades com Maior Fatura Média', text='valor_fatura_r$')
+                    fig1.update_traces(texttemplate='R$ %{text:.2f}', textposition='inside')
+                    fig1.update_layout(xaxis_title="Valor Médio (R$)", yaxis_title="Cidade", uniformtext_minsize=8, uniformtext_mode='hide')
+                if not visitas_funcionario.empty:
+                    fig2 = px.bar(visitas_funcionario, x=visitas_funcionario.values, y=visitas_funcionario.index, orientation='h', title='Top 10 Funcionários por Nº de Visitas', text=visitas_funcionario.values)
+                    fig2.update_traces(texttemplate='%{text}', textposition='inside')
+                    fig2.update_layout(xaxis_title="Nº de Visitas", yaxis_title="Funcionário", uniformtext_minsize=8, uniformtext_mode='hide')
+                if not analise_temporal.empty:
+                    fig3 = px.line(analise_temporal, x='mes_ano', y='total_visitas', title='Evolução do Número de Visitas por Mês', markers=True, text='total_visitas')
+                    fig3.update_traces(textposition="top center")
+                    fig3.update_layout(xaxis_title="Mês", yaxis_title="Total de Visitas")
+                return fig1, fig2, fig3
+
+            fig1, fig2, fig3 = montar_graficos()
+
+            st.subheader("Métricas Principais do Período")
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Total de Visitas Realizadas", totais_filtrados['visitas'])
+            col2.metric("Valor Médio da Fatura", f"R$ {totais_filtrados['media']:.2f}")
+            col3.metric("Potencial Total (Soma das Faturas)", f"R$ {totais_filtrados['soma']:,.2f}".replace(",", "_").replace(".", ",").replace("_", "."))
+
+            col_graf1, col_graf2 = st.columns(2)
+            with col_graf1:
+                st.subheader("Top Cidades por Fatura Média")
+                if fig1 is not None:
+                    st.plotly_chart(fig1, use_container_width=True)
+            with col_graf2:
+                st.subheader("Visitas por Funcionário")
+                if fig2 is not None:
+                    st.plotly_chart(fig2, use_container_width=True)
         
-        st.subheader("Análise Temporal")
-        analise_temporal = df_filtrado.groupby('mes_ano').agg(total_visitas=('nome_consumidor', 'count'), valor_medio_fatura=('valor_fatura_r$', 'mean')).reset_index().sort_values('mes_ano')
-        if not analise_temporal.empty:
-            fig3 = px.line(analise_temporal, x='mes_ano', y='total_visitas', title='Evolução do Número de Visitas por Mês', markers=True, text='total_visitas')
-            fig3.update_traces(textposition="top center")
-            fig3.update_layout(xaxis_title="Mês", yaxis_title="Total de Visitas")
-            st.plotly_chart(fig3, use_container_width=True)
+            st.subheader("Análise Temporal")
+            if fig3 is not None:
+                st.plotly_chart(fig3, use_container_width=True)
         
-        with st.expander("Ver Tabela de Dados Filtrados"):
-            st.dataframe(df_filtrado)
-    else:
-        st.info("Nenhum registro encontrado para os filtros selecionados.")
\ No newline at end of file
+            with st.expander("Ver Tabela de Dados Filtrados"):
+                tabela_paginada(
+                    lambda inicio, tamanho, ordenar_por, decrescente, busca: fonte_dados.pagina(
+                        filtros, COLUNAS_TABELA, inicio, tamanho, ordenar_por, decrescente, busca
+                    ),
+                    COLUNAS_TABELA, chave="tabela_filtrada", contexto=filtros,
+                )
+        else:
+            st.info("Nenhum registro encontrado para os filtros selecionados.")
+
+# --- TEMPOS DESTA EXECUÇÃO (instrumentacao.py) ---
+execucao = finalizar_execucao()
+st.sidebar.markdown("---")
+if st.sidebar.toggle("⏱️ Mostrar tempos desta execução", key="mostrar_tempos") and execucao is not None:
+    st.sidebar.metric("Tempo total do script", f"{execucao.total_ms:,.0f} ms".replace(",", "."))
+    st.sidebar.dataframe(
+        execucao.tabela(), hide_index=True, use_container_width=True,
+        column_config={
+            'ms': st.column_config.NumberColumn('ms', format="%.1f"),
+            'linhas': st.column_config.NumberColumn('Linhas', format="%d"),
+            '% do total': st.column_config.ProgressColumn('% do total', format="%.0f%%", min_value=0, max_value=100),
+        },
+    )
+    if execucao.contadores:
+        st.sidebar.caption(" · ".join(f"{nome}: {valor:,}".replace(",", ".") for nome, valor in sorted(execucao.contadores.items())))
+    percentis_recentes = REGISTRO.percentis()
+    st.sidebar.caption(f"Últimas {int(percentis_recentes['n'].max())} execuções (todas as sessões), em ms:")
+    st.sidebar.dataframe(percentis_recentes.set_index('etapa').round(1), use_container_width=True)
@@ -1,7 +1,10 @@
 import streamlit as st
-import pandas as pd
-import os
 from datetime import datetime
+from armazenamento import COLUNAS_VISITAS
+from cubo import totais
+from paginacao import tabela_paginada
+from perfis import PERFIS_CLIENTE, codificar_perfis
+from servico_dados import conectar
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(
@@ -11,32 +14,15 @@ st.set_page_config(
 )
 
 # --- CONSTANTES E CONFIGURAÇÕES ---
-NOME_ARQUIVO_DADOS = 'dados_visitas.csv'
-
 LISTA_FUNCIONARIOS = [
     "Ana Julia", "Bruno Carvalho", "Carla Dias", "Daniel Martins", "Fernanda Souza", "Victor Alexandre", "Vinicius Alexandre"
 ]
-# NOVA LISTA: Perfis de cliente para segmentação
-PERFIS_CLIENTE = ["Residencial", "Comercial", "Industrial", "Agronegócio", "Condomínio"]
 
 # --- FUNÇÕES AUXILIARES ---
-def carregar_dados():
-    if os.path.exists(NOME_ARQUIVO_DADOS):
-        try:
-            return pd.read_csv(NOME_ARQUIVO_DADOS)
-        except pd.errors.EmptyDataError:
-            return criar_dataframe_vazio()
-    else:
-        return criar_dataframe_vazio()
-
-def criar_dataframe_vazio():
-    """Cria um DataFrame com a estrutura completa, incluindo as novas colunas."""
-    colunas = [
-        'data_visita', 'nome_funcionario', 'nome_consumidor', 'cidade', 
-        'estado', 'endereco', 'telefone', 'valor_fatura_r$', 'observacoes',
-        'latitude', 'longitude', 'perfil_cliente' # NOVAS COLUNAS
-    ]
-    return pd.DataFrame(columns=colunas)
+@st.cache_resource
+def obter_fonte_dados():
+    """Visitas, índices e cubo: no próprio processo ou no serviço de dados (ver servico_dados.py)."""
+    return conectar()
 
 # --- INTERFACE PRINCIPAL DO STREAMLIT ---
 st.title("☀️ Aplicativo de Coleta de Dados de Visitas")
@@ -83,12 +69,10 @@ with st.form("form_nova_visita", clear_on_submit=True):
             st.warning("Por favor, preencha os campos obrigatórios (Funcionário, Consumidor, Endereço e Cidade).")
         else:
             try:
-                df_existente = carregar_dados()
-                
                 # Converte a lista de perfis para uma string separada por vírgulas
                 perfis_str = ",".join(perfil_cliente) if perfil_cliente else ""
 
-                novo_dado = pd.DataFrame([{
+                novo_dado = {
                     'data_visita': data_visita.strftime('%Y-%m-%d'),
                     'nome_funcionario': nome_funcionario,
                     'nome_consumidor': nome_consumidor,
@@ -100,11 +84,12 @@ with st.form("form_nova_visita", clear_on_submit=True):
                     'observacoes': observacoes,
                     'latitude': latitude,
                     'longitude': longitude,
-                    'perfil_cliente': perfis_str
-                }])
+                    'perfil_cliente': perfis_str,
+                    'perfil_flags': codificar_perfis(perfil_cliente)
+                }
                 
-                df_atualizado = pd.concat([df_existente, novo_dado], ignore_index=True)
-                df_atualizado.to_csv(NOME_ARQUIVO_DADOS, index=False)
+                # Escrita append-only: custo constante e segura com várias sessões
+                obter_fonte_dados().anexar(novo_dado)
                 st.success("🎉 Visita registrada com sucesso!")
             except Exception as e:
                 st.error(f"Ocorreu um erro ao salvar os dados: {e}")
@@ -113,41 +98,44 @@ st.markdown("---")
 # --- SEÇÃO DE VISUALIZAÇÃO DE DADOS (VISÃO DO FUNCIONÁRIO) ---
 st.header("📊 Suas Últimas Visitas Registradas")
 
-# Carregar os dados para visualização
-df_dados = carregar_dados()
+# Carregar os dados para visualização: só as linhas exibidas saem da fonte de dados
+fonte_dados = obter_fonte_dados()
+fonte_dados.atualizar()
+opcoes_dados = fonte_dados.opcoes()
 
-if df_dados.empty:
+if opcoes_dados['linhas'] == 0:
     st.info("Ainda não há dados coletados para exibir. Comece registrando uma nova visita no formulário acima.")
 else:
-    # Garantir que as colunas de data e valor estão nos formatos corretos para análise
-    df_dados['data_visita'] = pd.to_datetime(df_dados['data_visita'])
-    df_dados['valor_fatura_r$'] = pd.to_numeric(df_dados['valor_fatura_r$'])
-
+    total_linhas = opcoes_dados['linhas']
     st.write("Visão geral de todos os registros:")
-    st.dataframe(df_dados.tail(10), use_container_width=True) # Mostrar apenas os 10 últimos registros
+    st.dataframe(fonte_dados.linhas(colunas=COLUNAS_VISITAS, posicoes=range(max(total_linhas - 10, 0), total_linhas)), use_container_width=True) # Mostrar apenas os 10 últimos registros
 
     # --- Filtro interativo para o funcionário ver seus próprios dados ---
     st.subheader("Filtrar seus resultados")
     funcionario_selecionado = st.selectbox(
         "Ver registros de:", 
-        options=['Todos'] + sorted(df_dados['nome_funcionario'].unique().tolist())
+        options=['Todos'] + sorted(opcoes_dados['funcionarios'])
     )
 
-    if funcionario_selecionado != 'Todos':
-        df_filtrado = df_dados[df_dados['nome_funcionario'] == funcionario_selecionado]
-    else:
-        df_filtrado = df_dados
+    filtros = {'funcionarios': [funcionario_selecionado]} if funcionario_selecionado != 'Todos' else {}
+    # Métricas do cubo e tabela paginada: as visitas do funcionário não são lidas de uma vez
+    totais_funcionario = totais(fonte_dados.celulas(filtros))
 
-    if not df_filtrado.empty:
+    if totais_funcionario['visitas']:
         col_analise1, col_analise2 = st.columns(2)
         with col_analise1:
-            total_visitas = len(df_filtrado)
+            total_visitas = totais_funcionario['visitas']
             st.metric("Total de Visitas Registradas", f"{total_visitas}")
         with col_analise2:
-            fatura_media = df_filtrado['valor_fatura_r$'].mean()
+            fatura_media = totais_funcionario['media']
             st.metric("Valor Médio da Fatura", f"R$ {fatura_media:.2f}")
 
         st.write(f"Detalhes para: **{funcionario_selecionado}**")
-        st.dataframe(df_filtrado, use_container_width=True)
+        tabela_paginada(
+            lambda inicio, tamanho, ordenar_por, decrescente, busca: fonte_dados.pagina(
+                filtros, COLUNAS_VISITAS, inicio, tamanho, ordenar_por, decrescente, busca
+            ),
+            COLUNAS_VISITAS, chave="tabela_funcionario", contexto=funcionario_selecionado,
+        )
     else:
         st.write("Nenhum registro encontrado para a seleção.")
@@ -0,0 +1,133 @@
+import csv
+import io
+import os
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- ESQUEMA DO ARQUIVO DE VISITAS ---
+NOME_ARQUIVO_DADOS = 'dados_visitas.csv'
+DIRETORIO_COLUNAR = 'dados_visitas_parquet'
+
+COLUNAS_VISITAS = [
+    'data_visita', 'nome_funcionario', 'nome_consumidor', 'cidade',
+    'estado', 'endereco', 'telefone', 'valor_fatura_r$', 'observacoes',
+    'latitude', 'longitude', 'perfil_cliente', 'perfil_flags'
+]
+
+
+# --- TRAVA ENTRE PROCESSOS ---
+@contextmanager
+def trava_arquivo(caminho):
+    """Trava exclusiva sobre `caminho`, válida entre sessões e processos do Streamlit.
+
+    A trava fica num arquivo `.lock` ao lado dos dados, assim leitores do CSV
+    nunca são bloqueados.
+    """
+    with open(caminho + '.lock', 'a+b') as arquivo_trava:
+        if fcntl is not None:
+            fcntl.flock(arquivo_trava.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(arquivo_trava.fileno(), fcntl.LOCK_UN)
+        else:
+            arquivo_trava.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(arquivo_trava.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                arquivo_trava.seek(0)
+                msvcrt.locking(arquivo_trava.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# --- ESCRITA APPEND-ONLY ---
+def _linha_csv(valores):
+    """Formata uma linha CSV no mesmo dialeto usado pelo `DataFrame.to_csv`."""
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='\n').writerow(valores)
+    return buffer.getvalue().encode('utf-8')
+
+
+def anexar_visita(registro, caminho=NOME_ARQUIVO_DADOS):
+    """Acrescenta uma visita ao final do CSV sem reescrever o arquivo.
+
+    O custo é constante (independe do número de visitas já salvas) e a trava
+    garante que duas sessões salvando ao mesmo tempo não percam linhas.
+    """
+    linha = _linha_csv([registro.get(col, '') for col in COLUNAS_VISITAS])
+    with trava_arquivo(caminho):
+        if _cabecalho_desatualizado(caminho):
+            _migrar_csv_travado(caminho)
+        with open(caminho, 'a+b') as arquivo:
+            arquivo.seek(0, os.SEEK_END)
+            tamanho = arquivo.tell()
+            if tamanho == 0:
+                # Arquivo novo: escreve o cabeçalho junto com a primeira linha
+                linha = _linha_csv(COLUNAS_VISITAS) + linha
+            else:
+                # Garante que a linha nova não seja colada na última linha existente
+                arquivo.seek(tamanho - 1)
+                if arquivo.read(1) != b'\n':
+                    linha = b'\n' + linha
+            arquivo.write(linha)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+
+def _cabecalho_desatualizado(caminho):
+    """Indica se o CSV existente foi gravado com um esquema anterior (sem todas as colunas)."""
+    if not os.path.exists(caminho) or os.path.getsize(caminho) == 0:
+        return False
+    with open(caminho, 'rb') as arquivo:
+        return arquivo.readline().rstrip(b'\r\n') != _linha_csv(COLUNAS_VISITAS).rstrip(b'\n')
+
+
+def _migrar_csv_travado(caminho):
+    """Reescreve o CSV no esquema atual, calculando `perfil_flags`. Exige a trava já adquirida."""
+    import pandas as pd
+    from perfis import codificar_serie
+    df = pd.read_csv(caminho, dtype=str, keep_default_na=False)
+    df['perfil_flags'] = codificar_serie(df.get('perfil_cliente', pd.Series('', index=df.index)))
+    df = df.reindex(columns=COLUNAS_VISITAS, fill_value='')
+    temporario = caminho + '.migrando'
+    df.to_csv(temporario, index=False)
+    os.replace(temporario, caminho)
+    return len(df)
+
+
+def migrar_csv(caminho=NOME_ARQUIVO_DADOS):
+    """Migração única do CSV de visitas para o esquema atual (com `perfil_flags`)."""
+    with trava_arquivo(caminho):
+        if not _cabecalho_desatualizado(caminho):
+            return 0
+        return _migrar_csv_travado(caminho)
+
+
+def armazenamento_colunar_ativo(diretorio=DIRETORIO_COLUNAR):
+    """Indica se as visitas já foram migradas para o armazenamento colunar."""
+    return os.path.isdir(diretorio)
+
+
+def registrar_visita(registro, caminho=NOME_ARQUIVO_DADOS):
+    """Grava a visita no armazenamento ativo: colunar (se já migrado) ou CSV."""
+    if 'perfil_flags' not in registro:
+        from perfis import codificar_perfis
+        registro = dict(registro, perfil_flags=codificar_perfis(registro.get('perfil_cliente', '')))
+    if armazenamento_colunar_ativo():
+        # Importação tardia: o pyarrow só é exigido depois da migração
+        import pandas as pd
+        from armazenamento_colunar import anexar_segmento
+        anexar_segmento(pd.DataFrame([registro]))
+    else:
+        anexar_visita(registro, caminho)
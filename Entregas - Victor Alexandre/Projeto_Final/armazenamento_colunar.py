@@ -0,0 +1,225 @@
+"""Armazenamento colunar (Parquet/Arrow) das visitas, com esquema tipado.
+
+Uso pela linha de comando:
+    python armazenamento_colunar.py converter   # dados_visitas.csv -> dados_visitas_parquet/
+    python armazenamento_colunar.py exportar    # dados_visitas_parquet/ -> dados_visitas_exportado.csv
+    python armazenamento_colunar.py compactar   # junta os segmentos pequenos num só arquivo
+
+Cada visita gravada vira um segmento pequeno; quando os segmentos pequenos do fim passam
+de `MAX_SEGMENTOS_PEQUENOS`, a própria gravação os junta num só (até o segmento juntado
+chegar a `LIMITE_SEGMENTO_PEQUENO_BYTES`, quando deixa de ser reescrito). O segmento
+juntado guarda nos metadados quais segmentos substituiu, para quem já os leu não precisar
+reler tudo (ver `origem_compactacao`). Quem lê os segmentos segura a trava do diretório,
+para nunca ver o compactado e os substituídos ao mesmo tempo.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from armazenamento import NOME_ARQUIVO_DADOS, DIRETORIO_COLUNAR, COLUNAS_VISITAS, trava_arquivo
+from perfis import codificar_serie
+
+# --- ESQUEMA COLUNAR ---
+_CATEGORIA = pa.dictionary(pa.int32(), pa.string())
+
+ESQUEMA_VISITAS = pa.schema([
+    ('data_visita', pa.date32()),
+    ('nome_funcionario', _CATEGORIA),
+    ('nome_consumidor', pa.string()),
+    ('cidade', _CATEGORIA),
+    ('estado', _CATEGORIA),
+    ('endereco', pa.string()),
+    ('telefone', pa.string()),
+    ('valor_fatura_r$', pa.float64()),
+    ('observacoes', pa.string()),
+    ('latitude', pa.float32()),
+    ('longitude', pa.float32()),
+    ('perfil_cliente', _CATEGORIA),
+    ('perfil_flags', pa.uint8()),
+])
+
+MAX_SEGMENTOS_PEQUENOS = 32
+LIMITE_SEGMENTO_PEQUENO_BYTES = 4 * 1024 * 1024
+CHAVE_ORIGEM = b'segmentos_compactados'  # metadado do segmento compactado: [[segmento, linhas], ...]
+
+COLUNAS_NUMERICAS = ['valor_fatura_r$', 'latitude', 'longitude']
+COLUNAS_TEXTO = [c for c in COLUNAS_VISITAS if c not in COLUNAS_NUMERICAS + ['data_visita', 'perfil_flags']]
+
+
+# --- CONVERSÃO PARA O ESQUEMA ---
+def para_tabela_arrow(df):
+    """Converte um DataFrame com colunas em texto (como vem do CSV) para uma tabela Arrow tipada."""
+    df = df.reindex(columns=COLUNAS_VISITAS)
+    dados = {}
+    dados['data_visita'] = pd.to_datetime(df['data_visita'], errors='coerce').dt.date
+    for col in COLUNAS_NUMERICAS:
+        dados[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in COLUNAS_TEXTO:
+        dados[col] = df[col].fillna('').astype(str)
+    dados['valor_fatura_r$'] = dados['valor_fatura_r$'].fillna(0)
+    flags = pd.to_numeric(df['perfil_flags'], errors='coerce')
+    if flags.isna().any():
+        # Linhas sem a codificação (CSV antigo): calcula a partir do texto dos perfis
+        flags = flags.fillna(pd.Series(codificar_serie(dados['perfil_cliente']), index=df.index))
+    dados['perfil_flags'] = flags.astype('uint8')
+    return pa.Table.from_pandas(pd.DataFrame(dados), schema=ESQUEMA_VISITAS, preserve_index=False)
+
+
+def _nome_segmento(momento_ns=None):
+    # O prefixo com o horário em nanossegundos mantém os segmentos em ordem de chegada
+    return f"parte-{time.time_ns() if momento_ns is None else momento_ns:020d}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _gravar_segmento(tabela, diretorio):
+    """Grava um segmento de forma atômica (arquivo temporário oculto + rename)."""
+    nome = _nome_segmento()
+    temporario = os.path.join(diretorio, '.' + nome)
+    pq.write_table(tabela, temporario, compression='zstd')
+    os.replace(temporario, os.path.join(diretorio, nome))
+    return nome
+
+
+# --- ESCRITA ---
+def anexar_segmento(df, diretorio=DIRETORIO_COLUNAR):
+    """Acrescenta visitas como um novo segmento Parquet e junta os pequenos quando passam do limite."""
+    os.makedirs(diretorio, exist_ok=True)
+    nome = _gravar_segmento(para_tabela_arrow(df), diretorio)
+    if len(_pequenos_do_fim(diretorio, listar_segmentos(diretorio))) > MAX_SEGMENTOS_PEQUENOS:
+        compactar(diretorio, so_pequenos=True)
+    return nome
+
+
+def converter_csv(caminho_csv=NOME_ARQUIVO_DADOS, diretorio=DIRETORIO_COLUNAR, linhas_por_segmento=1_000_000, encoding='utf-8'):
+    """Conversão única do CSV existente para o armazenamento colunar."""
+    if os.path.exists(diretorio):
+        raise FileExistsError(f"O diretório '{diretorio}' já existe; apague-o antes de converter novamente.")
+    temporario = diretorio + '.convertendo'
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    total = 0
+    leitor = pd.read_csv(caminho_csv, dtype=str, keep_default_na=False, encoding=encoding, chunksize=linhas_por_segmento)
+    for bloco in leitor:
+        _gravar_segmento(para_tabela_arrow(bloco), temporario)
+        total += len(bloco)
+    os.replace(temporario, diretorio)
+    return total
+
+
+def _pequenos_do_fim(diretorio, segmentos):
+    """Segmentos do fim da lista menores que o limite (os que a compactação automática junta)."""
+    inicio = len(segmentos)
+    while inicio and os.path.getsize(os.path.join(diretorio, segmentos[inicio - 1])) < LIMITE_SEGMENTO_PEQUENO_BYTES:
+        inicio -= 1
+    return segmentos[inicio:]
+
+
+def compactar(diretorio=DIRETORIO_COLUNAR, so_pequenos=False):
+    """Junta os segmentos (todos, ou só os pequenos do fim) num único arquivo, preservando a ordem das linhas.
+
+    O compactado recebe um nome logo antes do primeiro segmento juntado e aparece antes de
+    os substituídos serem apagados; como os leitores seguram a mesma trava, nenhum vê os dois.
+    """
+    with trava_arquivo(diretorio):
+        segmentos = listar_segmentos(diretorio)
+        if so_pequenos:
+            segmentos = _pequenos_do_fim(diretorio, segmentos)
+            if len(segmentos) <= MAX_SEGMENTOS_PEQUENOS:
+                return 0
+        if len(segmentos) <= 1:
+            return len(segmentos)
+        caminhos = [os.path.join(diretorio, s) for s in segmentos]
+        origem = [[s, pq.read_metadata(c).num_rows] for s, c in zip(segmentos, caminhos)]
+        tabela = ds.dataset(caminhos, schema=ESQUEMA_VISITAS, format='parquet').to_table().unify_dictionaries()
+        tabela = tabela.replace_schema_metadata({CHAVE_ORIGEM: json.dumps(origem)})
+        nome = _nome_segmento(int(segmentos[0].split('-')[1]) - 1)
+        temporario = os.path.join(diretorio, '.' + nome)
+        pq.write_table(tabela, temporario, compression='zstd')
+        os.replace(temporario, os.path.join(diretorio, nome))
+        for caminho in caminhos:
+            os.remove(caminho)
+        return len(segmentos)
+
+
+def migrar_segmentos(diretorio=DIRETORIO_COLUNAR):
+    """Acrescenta `perfil_flags` aos segmentos gravados antes da coluna existir."""
+    migrados = 0
+    with trava_arquivo(diretorio):
+        for nome in listar_segmentos(diretorio):
+            caminho = os.path.join(diretorio, nome)
+            tabela = pq.read_table(caminho)
+            if 'perfil_flags' in tabela.column_names:
+                continue
+            temporario = os.path.join(diretorio, '.' + nome)
+            pq.write_table(para_tabela_arrow(tabela.to_pandas()), temporario, compression='zstd')
+            os.replace(temporario, caminho)
+            migrados += 1
+    return migrados
+
+
+# --- LEITURA ---
+def listar_segmentos(diretorio=DIRETORIO_COLUNAR):
+    """Segmentos visíveis, em ordem de chegada."""
+    if not os.path.isdir(diretorio):
+        return []
+    return sorted(n for n in os.listdir(diretorio) if n.endswith('.parquet') and not n.startswith('.'))
+
+
+def origem_compactacao(diretorio, nome):
+    """[(segmento, linhas)] que a compactação juntou no segmento `nome`; [] para um segmento comum."""
+    metadados = pq.read_schema(os.path.join(diretorio, nome)).metadata or {}
+    if CHAVE_ORIGEM not in metadados:
+        return []
+    return [tuple(item) for item in json.loads(metadados[CHAVE_ORIGEM])]
+
+
+def ler_visitas(colunas=None, diretorio=DIRETORIO_COLUNAR, segmentos=None):
+    """Lê as visitas já tipadas, apenas com as colunas pedidas (projeção)."""
+    if segmentos is None:
+        segmentos = listar_segmentos(diretorio)
+    colunas = list(colunas) if colunas is not None else COLUNAS_VISITAS
+    if not segmentos:
+        return pa.Table.from_pylist([], schema=ESQUEMA_VISITAS).select(colunas).to_pandas(date_as_object=False)
+    dataset = ds.dataset([os.path.join(diretorio, s) for s in segmentos], schema=ESQUEMA_VISITAS, format='parquet')
+    return dataset.to_table(columns=colunas).to_pandas(date_as_object=False)
+
+
+def exportar_csv(caminho_csv, diretorio=DIRETORIO_COLUNAR, linhas_por_bloco=250_000):
+    """Exporta o armazenamento colunar para CSV (mesmo layout do `dados_visitas.csv`), em blocos."""
+    total = 0
+    with trava_arquivo(diretorio), open(caminho_csv, 'w', encoding='utf-8', newline='') as saida:
+        dataset = ds.dataset([os.path.join(diretorio, s) for s in listar_segmentos(diretorio)], schema=ESQUEMA_VISITAS, format='parquet')
+        pd.DataFrame(columns=COLUNAS_VISITAS).to_csv(saida, index=False)
+        for lote in dataset.to_batches(batch_size=linhas_por_bloco):
+            bloco = lote.to_pandas(date_as_object=True)
+            bloco.to_csv(saida, index=False, header=False)
+            total += len(bloco)
+    return total
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Armazenamento colunar das visitas.")
+    parser.add_argument('comando', choices=['converter', 'exportar', 'compactar'])
+    parser.add_argument('--csv', default=None, help="Caminho do CSV de origem/destino.")
+    parser.add_argument('--diretorio', default=DIRETORIO_COLUNAR)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.comando == 'converter':
+        n = converter_csv(args.csv or NOME_ARQUIVO_DADOS, args.diretorio)
+        print(f"{n} visitas convertidas para '{args.diretorio}'.")
+    elif args.comando == 'exportar':
+        destino = args.csv or 'dados_visitas_exportado.csv'
+        n = exportar_csv(destino, args.diretorio)
+        print(f"{n} visitas exportadas para '{destino}'.")
+    else:
+        n = compactar(args.diretorio)
+        print(f"{n} segmentos compactados.")
+    print(f"Tempo: {time.perf_counter() - inicio:.2f}s")
@@ -0,0 +1,286 @@
+"""Benchmark das etapas do dashboard, sem navegador, sobre visitas sintéticas.
+
+Para cada volume pedido, gera as visitas (ver dados_sinteticos.py) num diretório de
+trabalho e mede cada etapa do dashboard isoladamente: leitura do CSV, preparação,
+cache incremental, índices, filtros, os cálculos de cada aba e a exportação. Para cada
+etapa saem a mediana e o mínimo do tempo (em `--repeticoes` execuções) e o pico de
+memória alocada (tracemalloc, numa execução à parte para não distorcer o tempo).
+
+Os resultados podem ser gravados em JSON e comparados com uma execução anterior: as
+etapas que ficaram mais lentas que a tolerância são listadas e o processo termina com
+código 1 (útil para rodar antes de cada entrega).
+
+Uso pela linha de comando:
+    python benchmark.py --linhas 10000 100000 1000000 --saida benchmark.json
+    python benchmark.py --linhas 100000 --comparar benchmark.json --tolerancia 0.25
+    python benchmark.py --linhas 100000 --app   # inclui a execução completa do dashboard (AppTest)
+"""
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from camada_dados import CacheVisitas, preparar_dados_visitas
+from cubo import CuboVisitas, agregar_por, serie_mensal, totais
+from dados_sinteticos import FUNCIONARIOS, gravar_csv
+from exportacao import exportar
+from foco import IndiceValor, mensagem_foco, mensagens_por_segmento
+from geo import IndiceGeo
+from indice_filtros import IndiceFiltros
+from metas import METRICA_TICKET, METRICA_VISITAS
+from orientador_ia import montar_resumo_dados
+from paginacao import ordem_estavel
+from plano_acao import ArmazemPlanos
+from servico_dados import ServicoDados
+
+# Mesmas colunas que o dashboard lê e exporta (ver app.analisesolar.py)
+COLUNAS_PAINEL = (
+    'data_visita', 'nome_funcionario', 'nome_consumidor', 'cidade', 'estado',
+    'telefone', 'valor_fatura_r$', 'latitude', 'longitude', 'perfil_cliente', 'perfil_flags'
+)
+COLUNAS_EXPORTACAO = list(COLUNAS_PAINEL) + ['mes_ano', 'endereco', 'observacoes']
+COLUNAS_MAPA = ['nome_consumidor', 'cidade', 'valor_fatura_r$', 'perfil_cliente', 'latitude', 'longitude']
+DIRETORIO_DADOS_PADRAO = os.path.join(tempfile.gettempdir(), 'benchmark_solar')
+MINIMO_MS_REGRESSAO = 5.0  # diferenças menores que isso são ruído, mesmo acima da tolerância
+
+
+# --- MEDIÇÃO ---
+def medir(funcao, repeticoes=3, memoria=True):
+    """Mediana e mínimo do tempo de `funcao()` (ms) e pico de memória alocada (MB) numa execução extra."""
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    pico_mb = None
+    if memoria:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            funcao()
+            pico_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return {'mediana_ms': statistics.median(tempos), 'minimo_ms': min(tempos), 'pico_mb': pico_mb}
+
+
+def _rss_maximo_mb():
+    """Maior memória residente do processo até agora (None onde `resource` não existe, ex.: Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maximo / 2**20 if platform.system() == 'Darwin' else maximo / 2**10
+
+
+# --- PREPARAÇÃO DO VOLUME ---
+def preparar_diretorio(linhas, diretorio_dados, semente=0):
+    """Diretório de trabalho com `dados_visitas.csv` de `linhas` visitas (o CSV gerado é reaproveitado)."""
+    os.makedirs(diretorio_dados, exist_ok=True)
+    gerado = os.path.join(diretorio_dados, f"visitas_{linhas}_{semente}.csv")
+    if not os.path.exists(gerado):
+        gravar_csv(gerado + '.tmp', linhas, semente)
+        os.replace(gerado + '.tmp', gerado)
+    trabalho = tempfile.mkdtemp(prefix=f"benchmark_{linhas}_")
+    shutil.copyfile(gerado, os.path.join(trabalho, 'dados_visitas.csv'))
+    return trabalho
+
+
+def _metas(df):
+    """Uma meta de visitas e uma de ticket médio por funcionário e por mês dos dados."""
+    meses = df['data_visita'].dt.to_period('M').dropna().unique()
+    linhas = [
+        {'funcionario': f, 'metrica': m, 'valor_meta': 100, 'periodo': p.strftime('%m/%Y')}
+        for f in FUNCIONARIOS for p in meses for m in (METRICA_VISITAS, METRICA_TICKET)
+    ]
+    return pd.DataFrame(linhas).assign(id_meta=lambda d: 'META-' + d.index.astype(str))
+
+
+# --- ETAPAS ---
+def etapas(trabalho):
+    """Lista de (nome, função) na ordem em que o dashboard as executa. Prepara o que elas usam."""
+    caminho = os.path.join(trabalho, 'dados_visitas.csv')
+    servico = ServicoDados(COLUNAS_PAINEL, caminho)
+    servico.atualizar()
+    df, versao = CacheVisitas(COLUNAS_PAINEL, caminho_csv=caminho).obter()
+    indice = IndiceFiltros(df)
+    celulas = servico.celulas()
+    df_metas = _metas(df)
+    planos = ArmazemPlanos(os.path.join(trabalho, 'planos.sqlite'), csv_legado=None)
+    for i in range(2000):
+        planos.criar_acao(f"análise {i % 20}", f"ação {i}", list(FUNCIONARIOS)[i % len(FUNCIONARIOS)], '2025-07-01')
+
+    # Filtros padrão do dashboard: tudo selecionado
+    opcoes = servico.opcoes()
+    cidades = sorted({c for e in opcoes['estados'] for c in opcoes['cidades_por_estado'][e]})
+    filtros_padrao = dict(
+        data_inicio=opcoes['data_min'], data_fim=opcoes['data_max'], estados=opcoes['estados'], cidades=cidades,
+        funcionarios=list(FUNCIONARIOS), perfis=opcoes['perfis'],
+    )
+    fim = pd.Timestamp(opcoes['data_max'])
+    filtros_recorte = dict(
+        data_inicio=(fim - pd.DateOffset(months=3)).date(), data_fim=opcoes['data_max'],
+        funcionarios=['Ana Julia'], estados=['GO', 'DF'],
+    )
+    registro = {
+        'data_visita': str(opcoes['data_max']), 'nome_funcionario': 'Ana Julia', 'nome_consumidor': 'Benchmark',
+        'cidade': 'Goiania', 'estado': 'GO', 'endereco': 'Rua 1, 1, Centro', 'telefone': '(62) 90000-0000',
+        'valor_fatura_r$': 800.0, 'observacoes': '', 'latitude': -16.68, 'longitude': -49.26, 'perfil_cliente': 'Residencial',
+    }
+
+    def carregar_dados():
+        # Como o dashboard lia antes do cache incremental: o CSV inteiro a cada versão
+        lido = pd.read_csv(caminho, encoding='utf-8')
+        lido['data_visita'] = pd.to_datetime(lido['data_visita'], errors='coerce')
+        return lido
+    lido = carregar_dados()
+
+    def pagina_ordenada():
+        posicoes = indice.posicoes(**filtros_padrao)
+        ordem = posicoes[ordem_estavel(df['valor_fatura_r$'].take(posicoes), decrescente=True)]
+        return df.take(ordem[:50])
+
+    def aba_ranking():
+        resumo = agregar_por(celulas, 'nome_funcionario').set_index('nome_funcionario')
+        return [resumo[c].sort_values(ascending=False) for c in ('visitas', 'media', 'soma')]
+
+    def aba_ia():
+        resumo_cidades = agregar_por(celulas, 'cidade').set_index('cidade')
+        resumo_funcionarios = agregar_por(celulas, 'nome_funcionario').set_index('nome_funcionario')
+        return montar_resumo_dados(
+            (opcoes['data_min'], opcoes['data_max']), opcoes['estados'], cidades, totais(celulas), resumo_cidades, resumo_funcionarios
+        )
+
+    return [
+        ('carregar_dados (CSV inteiro)', carregar_dados),
+        ('preparar_dados_visitas', lambda: preparar_dados_visitas(lido.copy())),
+        ('cache incremental: carga inicial', lambda: CacheVisitas(COLUNAS_PAINEL, caminho_csv=caminho).obter()),
+        ('índice dos filtros', lambda: IndiceFiltros(df)),
+        ('cubo de agregados', lambda: CuboVisitas().atualizar(df, versao)),
+        ('índice geográfico', lambda: IndiceGeo(df)),
+        ('índice por fatura', lambda: IndiceValor(df)),
+        ('nova visita (gravação + atualização incremental)', lambda: servico.anexar(registro)),
+        ('filtros: padrão (tudo selecionado)', lambda: indice.posicoes(**filtros_padrao)),
+        ('filtros: funcionário + 2 estados + 3 meses', lambda: indice.posicoes(**filtros_recorte)),
+        ('filtros: cubo', lambda: servico.celulas(filtros_padrao)),
+        ('ações rápidas: foco (top 5)', lambda: mensagem_foco(servico.maiores(filtros_padrao, 5, 500))),
+        ('ações rápidas: foco por proximidade (50 km)', lambda: servico.oportunidades_proximas(filtros_padrao, -16.686, -49.265, 50, n=5)),
+        ('ações rápidas: mensagens de toda a equipe', lambda: mensagens_por_segmento(
+            servico.maiores_por_segmento(filtros_padrao, 5, 'nome_funcionario', 500))),
+        ('geo: mapa (1000 marcadores)', lambda: servico.mapa(filtros_padrao, 1000, COLUNAS_MAPA)),
+        ('ranking: agregados', aba_ranking),
+        ('metas: progresso', lambda: servico.progresso_metas(df_metas)),
+        ('orientador ia: resumo dos dados', aba_ia),
+        ('gráficos: série mensal', lambda: serie_mensal(celulas)),
+        ('tabela: página ordenada por fatura', pagina_ordenada),
+        ('plano de ação: página', lambda: planos.pagina_acoes(inicio=1000, ordenar_por='prazo', busca='ação 1')),
+        ('exportação CSV', lambda: exportar(servico, filtros_padrao, COLUNAS_EXPORTACAO, 'CSV', os.path.join(trabalho, 'exportacao.csv'))),
+        ('exportação Parquet', lambda: exportar(servico, filtros_padrao, COLUNAS_EXPORTACAO, 'Parquet', os.path.join(trabalho, 'exportacao.parquet'))),
+    ]
+
+
+def etapas_app(trabalho):
+    """Execução completa do dashboard pelo `AppTest` do Streamlit (primeira execução e reexecução)."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.analisesolar.py')
+    teste = {}
+
+    def primeira():
+        # Sem os caches do Streamlit de um volume anterior (fonte de dados, plano de ação etc.)
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        teste['app'] = AppTest.from_file(script, default_timeout=600).run()
+
+    def reexecucao():
+        teste['app'].run()
+    return [('dashboard: primeira execução', primeira, 1), ('dashboard: reexecução', reexecucao, None)]
+
+
+def executar(linhas, repeticoes=3, memoria=True, app=False, diretorio_dados=DIRETORIO_DADOS_PADRAO, semente=0):
+    """Mede todas as etapas para um volume. Devolve uma lista de resultados (um dict por etapa)."""
+    trabalho = preparar_diretorio(linhas, diretorio_dados, semente)
+    anterior = os.getcwd()
+    os.chdir(trabalho)  # os apps e módulos usam caminhos relativos ao diretório atual
+    resultados = []
+    try:
+        lista = [(nome, funcao, None) for nome, funcao in etapas(trabalho)]
+        if app:
+            lista += etapas_app(trabalho)
+        for nome, funcao, repeticoes_etapa in lista:
+            medida = medir(funcao, repeticoes_etapa or repeticoes, memoria and repeticoes_etapa is None)
+            resultado = {'linhas': linhas, 'etapa': nome, **medida, 'rss_maximo_mb': _rss_maximo_mb()}
+            resultados.append(resultado)
+            print(_formatar(resultado), flush=True)
+    finally:
+        os.chdir(anterior)
+        shutil.rmtree(trabalho, ignore_errors=True)
+    return resultados
+
+
+# --- RELATÓRIO E COMPARAÇÃO ---
+def _formatar(r):
+    pico = f"{r['pico_mb']:9.1f}" if r['pico_mb'] is not None else f"{'-':>9}"
+    return f"{r['linhas']:>10,} | {r['etapa']:<50} | {r['mediana_ms']:10.1f} | {r['minimo_ms']:10.1f} | {pico}"
+
+
+def comparar(resultados, base, tolerancia=0.25):
+    """Etapas (mesmo volume e nome) cuja mediana passou de `base * (1 + tolerancia)`."""
+    referencia = {(r['linhas'], r['etapa']): r for r in base}
+    regressoes = []
+    for r in resultados:
+        antes = referencia.get((r['linhas'], r['etapa']))
+        if antes is None:
+            continue
+        if r['mediana_ms'] > antes['mediana_ms'] * (1 + tolerancia) and r['mediana_ms'] - antes['mediana_ms'] > MINIMO_MS_REGRESSAO:
+            regressoes.append({**r, 'base_ms': antes['mediana_ms'], 'variacao': r['mediana_ms'] / antes['mediana_ms'] - 1})
+    return regressoes
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Mede as etapas do dashboard com visitas sintéticas.")
+    parser.add_argument('--linhas', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--sem-memoria', action='store_true', help="não mede o pico de memória (mais rápido)")
+    parser.add_argument('--app', action='store_true', help="inclui a execução completa do dashboard (AppTest)")
+    parser.add_argument('--dados', default=DIRETORIO_DADOS_PADRAO, help="onde guardar os CSVs sintéticos gerados")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', help="grava os resultados em JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior, para apontar regressões")
+    parser.add_argument('--tolerancia', type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"{'linhas':>10} | {'etapa':<50} | {'mediana ms':>10} | {'mínimo ms':>10} | {'pico MB':>9}")
+    resultados = []
+    for linhas in args.linhas:
+        resultados += executar(linhas, args.repeticoes, not args.sem_memoria, args.app, args.dados, args.semente)
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'data': datetime.now().isoformat(timespec='seconds'), 'python': platform.python_version(),
+                'pandas': pd.__version__, 'numpy': np.__version__, 'resultados': resultados,
+            }, arquivo, ensure_ascii=False, indent=1)
+        print(f"Resultados gravados em '{args.saida}'.")
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo)['resultados'], args.tolerancia)
+        for r in regressoes:
+            print(f"REGRESSÃO: {r['etapa']} ({r['linhas']:,} linhas): {r['base_ms']:.1f} -> {r['mediana_ms']:.1f} ms (+{r['variacao']:.0%})")
+        if regressoes:
+            sys.exit(1)
+        print(f"Nenhuma etapa mais lenta que a tolerância de {args.tolerancia:.0%}.")
@@ -0,0 +1,218 @@
+import io
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import NOME_ARQUIVO_DADOS, DIRETORIO_COLUNAR, armazenamento_colunar_ativo, trava_arquivo
+from instrumentacao import contar
+from perfis import codificar_serie
+
+# Colunas de texto lidas sempre como string, para que blocos novos tenham o mesmo tipo do já carregado
+COLUNAS_TEXTO = ['nome_funcionario', 'nome_consumidor', 'cidade', 'estado', 'endereco', 'telefone', 'observacoes', 'perfil_cliente']
+
+
+# --- VERSÃO DOS ARQUIVOS ---
+def versao_arquivo(caminho):
+    """Identidade e versão de um arquivo (ou diretório de segmentos): muda sempre que o conteúdo muda."""
+    if os.path.isdir(caminho):
+        segmentos = sorted(n for n in os.listdir(caminho) if n.endswith('.parquet') and not n.startswith('.'))
+        return (len(segmentos), segmentos[0] if segmentos else '', segmentos[-1] if segmentos else '')
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+
+# --- PREPARAÇÃO ---
+def preparar_dados_visitas(df):
+    """Prepara o DataFrame de visitas, garantindo que as colunas existam."""
+    if df.empty:
+        return df
+    df['valor_fatura_r$'] = pd.to_numeric(df['valor_fatura_r$'], errors='coerce').fillna(0)
+    for col in ['cidade', 'estado', 'nome_funcionario', 'perfil_cliente', 'telefone']:
+        if col not in df.columns:
+            df[col] = ''
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue # Já vem tipada (e sem nulos) do armazenamento colunar
+        df[col] = df[col].fillna('')
+    # Perfis como bits (ver perfis.py); linhas antigas sem a coluna são codificadas aqui
+    flags = pd.to_numeric(df['perfil_flags'], errors='coerce') if 'perfil_flags' in df.columns else pd.Series(np.nan, index=df.index)
+    if flags.isna().any():
+        flags = flags.fillna(pd.Series(codificar_serie(df['perfil_cliente']), index=df.index))
+    df['perfil_flags'] = flags.astype(np.uint8)
+    if 'data_visita' in df.columns and pd.api.types.is_datetime64_any_dtype(df['data_visita']):
+      df['mes_ano'] = df['data_visita'].dt.to_period('M').astype(str)
+    for col in ['latitude', 'longitude']:
+        if col not in df.columns:
+            df[col] = np.nan
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df
+
+
+def _concatenar(base, novo):
+    """Junta linhas novas ao frame preparado, unificando as categorias das colunas categóricas."""
+    if base.empty:
+        return novo.reset_index(drop=True)
+    if novo.empty:
+        return base
+    base = base.copy(deep=False) # O frame antigo pode estar em uso por outra sessão
+    novo = novo.copy(deep=False)
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype) and col in novo.columns:
+            novas = pd.Index(novo[col].astype(str).unique()).difference(base[col].cat.categories)
+            if len(novas):
+                base[col] = base[col].cat.add_categories(novas)
+            novo[col] = pd.Categorical(novo[col].astype(str), categories=base[col].cat.categories)
+    return pd.concat([base, novo], ignore_index=True)
+
+
+# --- CACHE INCREMENTAL DAS VISITAS ---
+class CacheVisitas:
+    """Mantém o frame de visitas preparado e só lê o que foi acrescentado desde a última leitura.
+
+    A versão vem da identidade do arquivo (inode, mtime, tamanho) no CSV, ou da lista de
+    segmentos no armazenamento colunar. Se o arquivo foi reescrito (e não só acrescido),
+    a leitura completa é refeita e a geração (primeiro item da versão) é incrementada: dentro
+    de uma mesma geração o frame só cresce no fim. Com `preparar=False` as colunas vêm como estão no arquivo
+    (útil para buscar colunas extras e juntá-las ao frame principal pelo índice).
+    """
+
+    def __init__(self, colunas=None, preparar=True, caminho_csv=NOME_ARQUIVO_DADOS, diretorio=DIRETORIO_COLUNAR):
+        self.colunas = list(colunas) if colunas is not None else None
+        self.preparar = preparar
+        self.caminho_csv = caminho_csv
+        self.diretorio = diretorio
+        self._trava = threading.Lock()
+        self.geracao = 0
+        self._limpar()
+
+    def _limpar(self):
+        self.geracao += 1
+        self.df = pd.DataFrame()
+        self.versao = None
+        self._origem = None
+        self._cabecalho = None  # (bytes da linha de cabeçalho, nomes das colunas)
+        self._posicao = 0       # bytes do CSV já consumidos
+        self._cauda = b''       # últimos bytes consumidos, para detectar reescrita do arquivo
+        self._inode = None
+        self._segmentos = []    # segmentos Parquet já consumidos
+
+    def obter(self):
+        """Devolve (frame preparado, versão). Nunca altera um frame já devolvido."""
+        with self._trava:
+            if armazenamento_colunar_ativo(self.diretorio):
+                self._atualizar_colunar()
+            else:
+                self._atualizar_csv()
+            return self.df, self.versao
+
+    # --- Armazenamento colunar: cada segmento novo é um bloco acrescido ---
+    def _atualizar_colunar(self):
+        from armazenamento_colunar import listar_segmentos, ler_visitas
+        # Com a trava, uma compactação nunca está pela metade durante a leitura
+        with trava_arquivo(self.diretorio):
+            segmentos = listar_segmentos(self.diretorio)
+            continuacao = self._continuar_apos_compactacao(segmentos) if self._origem == 'colunar' else None
+            if continuacao is None:
+                # Primeira leitura, troca de origem ou segmentos lidos que sumiram: recarrega tudo
+                self._limpar()
+                self._origem = 'colunar'
+                continuacao = (0, 0)
+            lidos, pular = continuacao
+            novos = segmentos[lidos:]
+            if novos or self.versao is None:
+                bloco = ler_visitas(self.colunas, self.diretorio, segmentos=novos)
+                bloco = bloco.iloc[pular:].reset_index(drop=True) if pular else bloco
+                contar('linhas_lidas_colunar', len(bloco))
+                self.df = _concatenar(self.df, preparar_dados_visitas(bloco) if self.preparar else bloco)
+                self.versao = (self.geracao, 'colunar', len(segmentos), segmentos[-1] if segmentos else '')
+            # Só compactação, sem linhas novas: o frame e a versão continuam os mesmos
+            self._segmentos = segmentos
+
+    def _continuar_apos_compactacao(self, segmentos):
+        """Quantos segmentos de `segmentos` já estão no frame, apesar de compactações desde a última leitura.
+
+        Devolve (nº de segmentos já lidos, linhas a pular no seguinte): o seguinte pode ser um
+        compactado que junta segmentos lidos e não lidos. None se é preciso reler tudo.
+        """
+        from armazenamento_colunar import origem_compactacao
+        lidos, i = self._segmentos, 0
+        for j, nome in enumerate(segmentos):
+            if i == len(lidos):
+                return j, 0
+            if nome == lidos[i]:
+                i += 1
+                continue
+            origem = origem_compactacao(self.diretorio, nome)
+            juntados, restantes = [s for s, _ in origem], len(lidos) - i
+            if not juntados or juntados[:restantes] != lidos[i:i + len(juntados)]:
+                return None
+            if len(juntados) > restantes:
+                # Juntou o resto do que já foi lido e segmentos novos: lê só as linhas novas dele
+                return j, sum(n for _, n in origem[:restantes])
+            i += len(juntados)
+        return (len(segmentos), 0) if i == len(lidos) else None
+
+    # --- CSV: lê apenas os bytes depois da última posição consumida ---
+    def _atualizar_csv(self):
+        try:
+            info = os.stat(self.caminho_csv)
+        except FileNotFoundError:
+            self._limpar()
+            self._origem = 'csv'
+            self.versao = (self.geracao, 'csv', None)
+            return
+
+        if self._origem != 'csv' or info.st_ino != self._inode or info.st_size < self._posicao or not self._prefixo_intacto():
+            self._limpar()
+            self._origem = 'csv'
+            self._inode = info.st_ino
+        if info.st_size > self._posicao or self.versao is None:
+            with open(self.caminho_csv, 'rb') as arquivo:
+                arquivo.seek(self._posicao)
+                conteudo = arquivo.read(info.st_size - self._posicao)
+            if self._cabecalho is None:
+                fim_cabecalho = conteudo.find(b'\n') + 1
+                if fim_cabecalho == 0:
+                    # Arquivo vazio ou só com cabeçalho incompleto
+                    self.versao = (self.geracao, 'csv', info.st_ino, 0)
+                    return
+                linha = conteudo[:fim_cabecalho]
+                nomes = pd.read_csv(io.BytesIO(linha), encoding='utf-8', encoding_errors='replace', nrows=0).columns.tolist()
+                self._cabecalho = (linha, nomes)
+                self._posicao = fim_cabecalho
+                conteudo = conteudo[fim_cabecalho:]
+            # Só consome até a última quebra de linha: uma linha sendo gravada fica para a próxima leitura
+            fim = conteudo.rfind(b'\n') + 1
+            if fim:
+                bloco = self._ler_bloco_csv(conteudo[:fim])
+                contar('linhas_lidas_csv', len(bloco))
+                self.df = _concatenar(self.df, bloco)
+                self._posicao += fim
+                self._cauda = conteudo[max(0, fim - 64):fim]
+            self.versao = (self.geracao, 'csv', info.st_ino, self._posicao)
+
+    def _prefixo_intacto(self):
+        """Confere se o cabeçalho e o fim do trecho já lido continuam iguais (arquivo só foi acrescido)."""
+        if self._cabecalho is None:
+            return True
+        linha = self._cabecalho[0]
+        with open(self.caminho_csv, 'rb') as arquivo:
+            if arquivo.read(len(linha)) != linha:
+                return False
+            arquivo.seek(self._posicao - len(self._cauda))
+            return arquivo.read(len(self._cauda)) == self._cauda
+
+    def _ler_bloco_csv(self, conteudo):
+        nomes = self._cabecalho[1]
+        usecols = (lambda c: c in self.colunas) if self.colunas is not None else None
+        bloco = pd.read_csv(
+            io.BytesIO(conteudo), encoding='utf-8', encoding_errors='replace', header=None, names=nomes, usecols=usecols,
+            dtype={c: str for c in COLUNAS_TEXTO if c in nomes},
+        )
+        if 'data_visita' in bloco.columns:
+            bloco['data_visita'] = pd.to_datetime(bloco['data_visita'], errors='coerce')
+        return preparar_dados_visitas(bloco) if self.preparar else bloco
@@ -0,0 +1,114 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from perfis import codificar_perfis
+
+# Cada célula do cubo é uma combinação dia x funcionário x cidade x estado x perfis
+DIMENSOES = ['dia', 'nome_funcionario', 'cidade', 'estado', 'perfil_flags']
+MEDIDAS = ['visitas', 'soma', 'soma_quadrados']
+
+
+def _celulas_vazias():
+    return pd.DataFrame({col: pd.Series(dtype=tipo) for col, tipo in [
+        ('dia', 'datetime64[ns]'), ('nome_funcionario', object), ('cidade', object), ('estado', object),
+        ('perfil_flags', np.uint8), ('visitas', np.int64), ('soma', np.float64), ('soma_quadrados', np.float64),
+    ]})
+
+
+def agregar_linhas(df):
+    """Agrega visitas (linhas) em células com contagem, soma e soma dos quadrados da fatura."""
+    if df.empty:
+        return _celulas_vazias()
+    valor = df['valor_fatura_r$'].to_numpy(dtype=np.float64)
+    base = pd.DataFrame({
+        'dia': df['data_visita'].dt.floor('D').to_numpy(dtype='datetime64[ns]'),
+        'nome_funcionario': df['nome_funcionario'].astype(str).to_numpy(dtype=object),
+        'cidade': df['cidade'].astype(str).to_numpy(dtype=object),
+        'estado': df['estado'].astype(str).to_numpy(dtype=object),
+        'perfil_flags': df['perfil_flags'].to_numpy(dtype=np.uint8),
+        'visitas': np.ones(len(df), dtype=np.int64),
+        'soma': valor,
+        'soma_quadrados': valor * valor,
+    })
+    return base.groupby(DIMENSOES, dropna=False, sort=False, as_index=False)[MEDIDAS].sum()
+
+
+def fundir_celulas(celulas, novas):
+    """Soma células novas ao cubo existente (as medidas são aditivas)."""
+    if celulas.empty:
+        return novas
+    if novas.empty:
+        return celulas
+    juntas = pd.concat([celulas, novas], ignore_index=True)
+    return juntas.groupby(DIMENSOES, dropna=False, sort=False, as_index=False)[MEDIDAS].sum()
+
+
+class CuboVisitas:
+    """Cubo de agregados mantido incrementalmente a partir do frame do `CacheVisitas`.
+
+    Enquanto a geração do cache (primeiro item da versão) não muda, o frame só cresce
+    no fim, então só as linhas novas são agregadas e somadas às células.
+    """
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.celulas = _celulas_vazias()
+        self._geracao = None
+        self._linhas = 0
+
+    def atualizar(self, df, versao):
+        """Incorpora as linhas novas de `df` e devolve as células (nunca alteradas depois de devolvidas)."""
+        with self._trava:
+            geracao = versao[0] if versao else None
+            if geracao != self._geracao or len(df) < self._linhas:
+                self.celulas = _celulas_vazias()
+                self._geracao = geracao
+                self._linhas = 0
+            if len(df) > self._linhas:
+                self.celulas = fundir_celulas(self.celulas, agregar_linhas(df.iloc[self._linhas:]))
+                self._linhas = len(df)
+            return self.celulas
+
+
+# --- CONSULTAS ---
+def filtrar_celulas(celulas, data_inicio=None, data_fim=None, estados=None, cidades=None, funcionarios=None, perfis=None):
+    """Aplica os filtros da barra lateral às células (mesma semântica de `IndiceFiltros.posicoes`)."""
+    mascara = np.ones(len(celulas), dtype=bool)
+    if data_inicio is not None:
+        mascara &= (celulas['dia'] >= pd.Timestamp(data_inicio)).to_numpy()
+    if data_fim is not None:
+        mascara &= (celulas['dia'] <= pd.Timestamp(data_fim)).to_numpy()
+    for coluna, selecionados in (('estado', estados), ('cidade', cidades), ('nome_funcionario', funcionarios)):
+        if selecionados:
+            mascara &= celulas[coluna].isin(selecionados).to_numpy()
+    if perfis:
+        mascara &= (celulas['perfil_flags'].to_numpy() & np.uint8(codificar_perfis(perfis))) != 0
+    return celulas[mascara]
+
+
+def _com_estatisticas(agregado):
+    agregado['media'] = agregado['soma'] / agregado['visitas']
+    variancia = agregado['soma_quadrados'] / agregado['visitas'] - agregado['media'] ** 2
+    agregado['desvio_padrao'] = np.sqrt(variancia.clip(lower=0))
+    return agregado
+
+
+def agregar_por(celulas, dimensao):
+    """Visitas, soma, média e desvio padrão da fatura por `dimensao` (ex.: 'cidade')."""
+    agregado = celulas.groupby(dimensao, sort=False, as_index=False)[MEDIDAS].sum()
+    return _com_estatisticas(agregado)
+
+
+def serie_mensal(celulas):
+    """Total de visitas e fatura média por mês (coluna `mes_ano`, como 'AAAA-MM')."""
+    mensal = celulas.dropna(subset=['dia']).assign(mes_ano=lambda d: d['dia'].dt.to_period('M').astype(str))
+    return _com_estatisticas(mensal.groupby('mes_ano', as_index=False)[MEDIDAS].sum())
+
+
+def totais(celulas):
+    """Totais do recorte: nº de visitas, soma e média da fatura."""
+    visitas = int(celulas['visitas'].sum())
+    soma = float(celulas['soma'].sum())
+    return {'visitas': visitas, 'soma': soma, 'media': soma / visitas if visitas else float('nan')}
@@ -0,0 +1,183 @@
+"""Visitas sintéticas (10 mil a 10 milhões de linhas) para testar os apps com volume.
+
+As visitas seguem o formato de `dados_visitas.csv`: funcionários com estados de atuação,
+cidades brasileiras com coordenadas (e um espalhamento em volta do centro), mistura de
+perfis de cliente, fatura com distribuição log-normal por perfil, telefones com o DDD da
+cidade e endereço/observações de texto livre. As datas crescem ao longo do arquivo, como
+nas visitas registradas pelo app de coleta. O CSV é gravado em blocos, sem montar o
+arquivo inteiro na memória.
+
+Uso pela linha de comando:
+    python dados_sinteticos.py --linhas 1000000 --saida dados_sinteticos.csv
+"""
+import numpy as np
+import pandas as pd
+
+from armazenamento import COLUNAS_VISITAS
+from perfis import codificar_serie
+
+LINHAS_POR_BLOCO = 500_000
+
+# (cidade, estado, latitude, longitude, DDD, peso no sorteio)
+CIDADES = [
+    ("Sao Paulo", "SP", -23.550, -46.633, 11, 12.0), ("Campinas", "SP", -22.906, -47.061, 19, 2.0),
+    ("Santos", "SP", -23.961, -46.333, 13, 1.0), ("Ribeirao Preto", "SP", -21.177, -47.810, 16, 1.2),
+    ("Sorocaba", "SP", -23.502, -47.458, 15, 1.0), ("Rio de Janeiro", "RJ", -22.907, -43.173, 21, 7.0),
+    ("Niteroi", "RJ", -22.883, -43.104, 21, 1.0), ("Belo Horizonte", "MG", -19.917, -43.934, 31, 3.5),
+    ("Uberlandia", "MG", -18.912, -48.275, 34, 1.3), ("Juiz de Fora", "MG", -21.764, -43.350, 32, 1.0),
+    ("Goiania", "GO", -16.686, -49.265, 62, 3.0), ("Anapolis", "GO", -16.328, -48.953, 62, 0.8),
+    ("Rio Verde", "GO", -17.792, -50.919, 64, 0.6), ("Brasilia", "DF", -15.794, -47.882, 61, 4.0),
+    ("Curitiba", "PR", -25.429, -49.271, 41, 3.0), ("Londrina", "PR", -23.310, -51.163, 43, 1.0),
+    ("Maringa", "PR", -23.420, -51.933, 44, 0.9), ("Porto Alegre", "RS", -30.035, -51.218, 51, 2.5),
+    ("Caxias do Sul", "RS", -29.168, -51.179, 54, 0.9), ("Florianopolis", "SC", -27.595, -48.548, 48, 1.2),
+    ("Joinville", "SC", -26.304, -48.846, 47, 1.1), ("Salvador", "BA", -12.971, -38.501, 71, 4.0),
+    ("Feira de Santana", "BA", -12.267, -38.967, 75, 1.0), ("Recife", "PE", -8.048, -34.877, 81, 3.0),
+    ("Fortaleza", "CE", -3.732, -38.527, 85, 4.0), ("Natal", "RN", -5.795, -35.209, 84, 1.4),
+    ("Joao Pessoa", "PB", -7.115, -34.864, 83, 1.3), ("Maceio", "AL", -9.666, -35.735, 82, 1.3),
+    ("Teresina", "PI", -5.089, -42.802, 86, 1.2), ("Sao Luis", "MA", -2.530, -44.303, 98, 1.4),
+    ("Belem", "PA", -1.456, -48.490, 91, 2.0), ("Manaus", "AM", -3.119, -60.022, 92, 3.0),
+    ("Cuiaba", "MT", -15.601, -56.097, 65, 1.1), ("Campo Grande", "MS", -20.470, -54.620, 67, 1.2),
+    ("Vitoria", "ES", -20.315, -40.312, 27, 1.0), ("Palmas", "TO", -10.184, -48.333, 63, 0.5),
+]
+# Funcionário -> estados em que ele atua (visitas fora deles são raras)
+FUNCIONARIOS = {
+    "Ana Julia": ["GO", "DF", "TO", "MT"], "Bruno Carvalho": ["SP", "MS"], "Carla Dias": ["RJ", "ES", "MG"],
+    "Daniel Martins": ["PR", "SC", "RS"], "Fernanda Souza": ["BA", "PE", "AL", "PB", "RN", "CE"],
+    "Victor Alexandre": ["GO", "SP", "MG"], "Vinicius Alexandre": ["AM", "PA", "MA", "PI", "DF"],
+}
+# (perfil_cliente, peso, mediana da fatura em R$, desvio do log)
+PERFIS = [
+    ("Residencial", 0.55, 450.0, 0.45), ("Comercial", 0.20, 1500.0, 0.55), ("Industrial", 0.06, 4200.0, 0.65),
+    ("Agronegócio", 0.06, 2600.0, 0.70), ("Condomínio", 0.07, 3000.0, 0.50),
+    ("Comercial,Industrial", 0.03, 3500.0, 0.60), ("Residencial,Comercial", 0.03, 900.0, 0.50),
+]
+PRENOMES = np.array(["Mariana", "Carlos", "Juliana", "Rogerio", "Patricia", "Lucas", "Fernanda", "Joao", "Aline",
+                     "Marcos", "Beatriz", "Rafael", "Camila", "Pedro", "Larissa", "Gustavo", "Renata", "Thiago"])
+SOBRENOMES = np.array(["Silva", "Santos", "Oliveira", "Souza", "Costa", "Pereira", "Almeida", "Ferreira", "Rodrigues",
+                       "Lima", "Gomes", "Ribeiro", "Carvalho", "Martins", "Rocha", "Peixoto", "Barbosa", "Teixeira"])
+NEGOCIOS = {
+    "Comercial": ["Padaria", "Restaurante", "Mercado", "Clinica", "Oficina", "Loja", "Farmacia", "Academia"],
+    "Industrial": ["Industria", "Metalurgica", "Fabrica", "Grafica", "Laticinios"],
+    "Agronegócio": ["Fazenda", "Sitio", "Granja", "Cooperativa"],
+    "Condomínio": ["Condominio Residencial", "Edificio", "Condominio"],
+}
+LOGRADOUROS = np.array(["Rua", "Av.", "Alameda", "Travessa", "Rodovia"])
+BAIRROS = np.array(["Centro", "Setor Sul", "Jardim America", "Vila Nova", "Boa Vista", "Industrial", "Santa Cruz", "Bela Vista"])
+OBSERVACOES = np.array([
+    "", "", "", "Cliente interessado, pediu proposta.", "Telhado com boa face norte.", "Alto consumo no verao.",
+    "Retornar em 30 dias.", "Ar condicionado e o maior vilao da conta.", "Comparando com outra empresa.",
+    "Potencial para grande projeto.", "Pediu simulacao de financiamento.",
+])
+FRACAO_SEM_COORDENADAS = 0.08
+
+
+def _nomes(rng, perfis, n):
+    """Pessoa física (residencial) ou nome de negócio conforme o primeiro perfil."""
+    sobrenome = pd.Series(rng.choice(SOBRENOMES, n))
+    nomes = pd.Series(rng.choice(PRENOMES, n)) + " " + sobrenome
+    principal = pd.Series(perfis).str.split(',').str[0]
+    for perfil, negocios in NEGOCIOS.items():
+        mascara = (principal == perfil).to_numpy()
+        if mascara.any():
+            nomes[mascara] = pd.Series(rng.choice(negocios, int(mascara.sum()))).to_numpy() + " " + sobrenome[mascara].to_numpy()
+    return nomes
+
+
+def _gerar_bloco(rng, dias, data_inicio):
+    n = len(dias)
+    cidades = pd.DataFrame(CIDADES, columns=['cidade', 'estado', 'lat', 'lon', 'ddd', 'peso'])
+    funcionarios = np.array(list(FUNCIONARIOS))
+    funcionario = rng.integers(0, len(funcionarios), n)
+
+    # Cidade sorteada entre as dos estados do funcionário (5% das visitas em qualquer cidade)
+    cidade = np.empty(n, dtype=np.int64)
+    for i, estados in enumerate(FUNCIONARIOS.values()):
+        mascara = funcionario == i
+        candidatas = cidades.index[cidades['estado'].isin(estados)].to_numpy()
+        pesos = cidades.loc[candidatas, 'peso'].to_numpy()
+        cidade[mascara] = rng.choice(candidatas, int(mascara.sum()), p=pesos / pesos.sum())
+    fora = rng.random(n) < 0.05
+    cidade[fora] = rng.choice(len(cidades), int(fora.sum()), p=cidades['peso'] / cidades['peso'].sum())
+
+    pesos_perfil = np.array([p[1] for p in PERFIS])
+    perfil = rng.choice(len(PERFIS), n, p=pesos_perfil / pesos_perfil.sum())
+    medianas = np.array([p[2] for p in PERFIS])[perfil]
+    desvios = np.array([p[3] for p in PERFIS])[perfil]
+    fatura = np.round(medianas * np.exp(rng.normal(0, 1, n) * desvios), 2)
+    nomes_perfil = np.array([p[0] for p in PERFIS], dtype=object)[perfil]
+
+    lat = cidades['lat'].to_numpy()[cidade] + rng.normal(0, 0.04, n)
+    lon = cidades['lon'].to_numpy()[cidade] + rng.normal(0, 0.04, n)
+    sem_coordenadas = rng.random(n) < FRACAO_SEM_COORDENADAS
+    lat[sem_coordenadas] = np.nan
+    lon[sem_coordenadas] = np.nan
+
+    ddd = cidades['ddd'].to_numpy()[cidade]
+    telefone = pd.Series(np.char.mod('(%02d) 9', ddd)) + pd.Series(np.char.mod('%04d', rng.integers(0, 10000, n))) \
+        + '-' + pd.Series(np.char.mod('%04d', rng.integers(0, 10000, n)))
+    endereco = pd.Series(rng.choice(LOGRADOUROS, n)) + ' ' + pd.Series(np.char.mod('%d', rng.integers(1, 400, n))) \
+        + ', ' + pd.Series(np.char.mod('%d', rng.integers(1, 3000, n))) + ', ' + pd.Series(rng.choice(BAIRROS, n))
+
+    bloco = pd.DataFrame({
+        'data_visita': (pd.Timestamp(data_inicio) + pd.to_timedelta(dias, unit='D')).strftime('%Y-%m-%d'),
+        'nome_funcionario': funcionarios[funcionario],
+        'nome_consumidor': _nomes(rng, nomes_perfil, n).to_numpy(),
+        'cidade': cidades['cidade'].to_numpy()[cidade],
+        'estado': cidades['estado'].to_numpy()[cidade],
+        'endereco': endereco.to_numpy(),
+        'telefone': telefone.to_numpy(),
+        'valor_fatura_r$': fatura,
+        'observacoes': rng.choice(OBSERVACOES, n),
+        'latitude': np.round(lat, 5),
+        'longitude': np.round(lon, 5),
+        'perfil_cliente': nomes_perfil,
+    })
+    bloco['perfil_flags'] = codificar_serie(bloco['perfil_cliente'])
+    return bloco[COLUNAS_VISITAS]
+
+
+def _dias(rng, n, data_inicio, data_fim):
+    total_dias = (pd.Timestamp(data_fim) - pd.Timestamp(data_inicio)).days + 1
+    return np.sort(rng.integers(0, total_dias, n).astype(np.int32))
+
+
+def blocos_de_visitas(n, semente=0, data_inicio='2024-01-01', data_fim='2025-06-30', linhas_por_bloco=LINHAS_POR_BLOCO):
+    """Gera as `n` visitas em blocos (DataFrames), em ordem de data. Mesma semente, mesmas visitas."""
+    dias = _dias(np.random.default_rng(semente), n, data_inicio, data_fim)
+    for numero, inicio in enumerate(range(0, n, linhas_por_bloco)):
+        yield _gerar_bloco(np.random.default_rng([semente, numero]), dias[inicio:inicio + linhas_por_bloco], data_inicio)
+
+
+def gerar_visitas(n, semente=0, **opcoes):
+    """As `n` visitas num único DataFrame (para volumes que cabem folgados na memória)."""
+    blocos = list(blocos_de_visitas(n, semente, **opcoes))
+    return pd.concat(blocos, ignore_index=True) if blocos else pd.DataFrame(columns=COLUNAS_VISITAS)
+
+
+def gravar_csv(caminho, n, semente=0, **opcoes):
+    """Grava as `n` visitas em `caminho` (mesmo formato do `dados_visitas.csv`), bloco a bloco."""
+    with open(caminho, 'w', encoding='utf-8', newline='') as arquivo:
+        cabecalho = True
+        for bloco in blocos_de_visitas(n, semente, **opcoes):
+            bloco.to_csv(arquivo, header=cabecalho, index=False)
+            cabecalho = False
+        if cabecalho:
+            pd.DataFrame(columns=COLUNAS_VISITAS).to_csv(arquivo, index=False)
+    return n
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Gera visitas sintéticas no formato de dados_visitas.csv.")
+    parser.add_argument('--linhas', type=int, default=100_000)
+    parser.add_argument('--saida', default='dados_sinteticos.csv')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--inicio', default='2024-01-01')
+    parser.add_argument('--fim', default='2025-06-30')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    gravar_csv(args.saida, args.linhas, args.semente, data_inicio=args.inicio, data_fim=args.fim)
+    print(f"{args.linhas} visitas gravadas em '{args.saida}' em {time.perf_counter() - inicio:.1f}s.")
@@ -0,0 +1,178 @@
+"""Exportação das visitas filtradas em blocos, direto para um arquivo (CSV, CSV gzip ou Parquet).
+
+As posições filtradas são lidas uma vez da fonte de dados (ver servico_dados.py) e as
+linhas saem um bloco por vez, gravadas no arquivo conforme chegam: nunca existe uma
+string com a exportação inteira na memória. Como a tabela de visitas só cresce no fim,
+as posições continuam valendo mesmo se uma visita nova chegar durante a exportação.
+
+O arquivo pronto fica num diretório temporário com nome derivado dos filtros, das
+colunas, do formato e da versão dos dados, e é reaproveitado enquanto os dados não
+mudam (sem precisar comparar o conteúdo das linhas). O botão de download do dashboard
+só lê o arquivo quando é clicado (`ler_exportacao`); se outra sessão descartou o
+arquivo nesse meio-tempo, ele é gerado de novo.
+
+Uso pela linha de comando (todas as visitas):
+    python exportacao.py --formato parquet --saida visitas.parquet
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+import uuid
+
+from instrumentacao import contar
+
+DIRETORIO_EXPORTACOES = os.path.join(tempfile.gettempdir(), 'exportacoes_solar')
+MAX_ARQUIVOS_EXPORTACAO = 8
+LINHAS_POR_BLOCO = 100_000
+# Nome exibido -> (extensão, tipo MIME)
+FORMATOS_EXPORTACAO = {
+    'CSV': ('.csv', 'text/csv'),
+    'CSV compactado (gzip)': ('.csv.gz', 'application/gzip'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def caminho_exportacao(filtros, colunas, formato, versao, diretorio=DIRETORIO_EXPORTACOES):
+    """Arquivo da exportação: o nome é o hash dos filtros, colunas, formato e versão dos dados."""
+    especificacao = repr((sorted((filtros or {}).items()), list(colunas), formato, versao))
+    nome = hashlib.sha256(especificacao.encode('utf-8')).hexdigest()[:24]
+    return os.path.join(diretorio, f"exportacao-{nome}{FORMATOS_EXPORTACAO[formato][0]}")
+
+
+def _momento(caminho):
+    try:
+        return os.path.getmtime(caminho)
+    except FileNotFoundError:  # outra sessão acabou de apagar
+        return 0.0
+
+
+def _limpar_antigos(diretorio, manter):
+    arquivos = sorted(
+        (os.path.join(diretorio, nome) for nome in os.listdir(diretorio) if nome.startswith('exportacao-')),
+        key=_momento, reverse=True,
+    )
+    for caminho in arquivos[manter:]:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+# --- ESCRITORES ---
+class _EscritorCSV:
+    def __init__(self, caminho, compactar):
+        self.arquivo = gzip.open(caminho, 'wt', encoding='utf-8', newline='') if compactar else open(caminho, 'w', encoding='utf-8', newline='')
+        self.cabecalho = True
+
+    def escrever(self, bloco):
+        bloco.to_csv(self.arquivo, header=self.cabecalho, index=False)
+        self.cabecalho = False
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+class _EscritorParquet:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.escritor = None
+        self.esquema = None
+
+    def escrever(self, bloco):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        if self.escritor is None:
+            # Coluna toda nula no primeiro bloco não fixa o tipo `null` para os blocos seguintes
+            esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+            self.esquema = pa.schema([
+                campo.with_type(pa.string()) if pa.types.is_null(campo.type) else campo for campo in esquema
+            ])
+            self.escritor = pq.ParquetWriter(self.caminho, self.esquema, compression='zstd')
+        self.escritor.write_table(pa.Table.from_pandas(bloco, schema=self.esquema, preserve_index=False))
+
+    def fechar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def _escritor(caminho, formato):
+    if formato == 'Parquet':
+        return _EscritorParquet(caminho)
+    return _EscritorCSV(caminho, compactar=FORMATOS_EXPORTACAO[formato][0].endswith('.gz'))
+
+
+# --- EXPORTAÇÃO ---
+def exportar(fonte, filtros, colunas, formato, caminho, linhas_por_bloco=LINHAS_POR_BLOCO, progresso=None):
+    """Grava as visitas filtradas em `caminho`, bloco a bloco. Devolve o nº de linhas gravadas.
+
+    `fonte` é um `ServicoDados` ou `ClienteDados`; `progresso(feitas, total)` é chamado a cada bloco.
+    O arquivo é montado num temporário e só aparece em `caminho` quando está completo.
+    """
+    os.makedirs(os.path.dirname(caminho) or '.', exist_ok=True)
+    temporario = f"{caminho}.{uuid.uuid4().hex[:8]}.tmp"
+    escritor = _escritor(temporario, formato)
+    try:
+        posicoes = fonte.posicoes(filtros)
+        total = len(posicoes)
+        # Ao menos um bloco: sem linhas, o arquivo sai só com o cabeçalho/esquema
+        for inicio in range(0, max(total, 1), linhas_por_bloco):
+            escritor.escrever(fonte.linhas(colunas=colunas, posicoes=posicoes[inicio:inicio + linhas_por_bloco]))
+            if progresso:
+                progresso(min(inicio + linhas_por_bloco, total), total)
+        escritor.fechar()
+        os.replace(temporario, caminho)
+    except BaseException:
+        escritor.fechar()
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return total
+
+
+def exportacao_em_cache(fonte, filtros, colunas, formato, versao, progresso=None, diretorio=DIRETORIO_EXPORTACOES):
+    """Caminho do arquivo exportado, gerando-o só se ainda não existe para esta versão dos dados."""
+    caminho = caminho_exportacao(filtros, colunas, formato, versao, diretorio)
+    try:
+        os.utime(caminho)  # mais recente, para não ser o próximo descartado
+        contar('exportacao_cache_acerto')
+    except FileNotFoundError:
+        contar('exportacao_cache_falha')
+        exportar(fonte, filtros, colunas, formato, caminho, progresso=progresso)
+        _limpar_antigos(diretorio, MAX_ARQUIVOS_EXPORTACAO)
+    return caminho
+
+
+def ler_exportacao(fonte, filtros, colunas, formato, versao, diretorio=DIRETORIO_EXPORTACOES):
+    """Conteúdo do arquivo exportado, para o download: chamado só quando o botão é clicado.
+
+    Se o arquivo foi descartado por outra sessão entre a verificação e a leitura, é gerado de novo.
+    """
+    for tentativa in range(2):
+        caminho = exportacao_em_cache(fonte, filtros, colunas, formato, versao, diretorio=diretorio)
+        try:
+            with open(caminho, 'rb') as arquivo:
+                return arquivo.read()
+        except FileNotFoundError:
+            if tentativa:
+                raise
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from armazenamento import COLUNAS_VISITAS
+    from servico_dados import conectar
+
+    parser = argparse.ArgumentParser(description="Exporta as visitas em blocos.")
+    parser.add_argument('--formato', choices=['csv', 'gzip', 'parquet'], default='csv')
+    parser.add_argument('--saida', required=True)
+    parser.add_argument('--linhas-por-bloco', type=int, default=LINHAS_POR_BLOCO)
+    args = parser.parse_args()
+
+    formato = {'csv': 'CSV', 'gzip': 'CSV compactado (gzip)', 'parquet': 'Parquet'}[args.formato]
+    fonte = conectar()
+    fonte.atualizar()
+    inicio = time.perf_counter()
+    linhas = exportar(fonte, None, COLUNAS_VISITAS, formato, args.saida, args.linhas_por_bloco)
+    print(f"{linhas} linhas gravadas em '{args.saida}' em {time.perf_counter() - inicio:.2f}s.")
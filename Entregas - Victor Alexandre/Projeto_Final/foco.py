@@ -0,0 +1,189 @@
+"""Seleção dos clientes prioritários e montagem das mensagens do Foco Semanal.
+
+As posições das visitas ficam ordenadas pela fatura (maior primeiro) num índice mantido
+a cada visita nova; o top-N de um recorte é o começo dessa ordem restrito às posições
+filtradas, sem ordenar o recorte a cada clique. As mensagens são montadas por modelo
+(`str.format`), coluna a coluna, em vez de linha a linha com `iterrows()`.
+
+Uso pela linha de comando (mensagens de todos os funcionários de uma vez):
+    python foco.py --por nome_funcionario --top 5 --fatura-minima 500 --saida mensagens_foco.csv
+"""
+import string
+import threading
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+CABECALHO_FOCO = (
+    "🎯 FOCO DA SEMANA - {data} 🎯\n\n"
+    "Equipe, vamos priorizar o contato com os seguintes clientes de alto potencial identificados na plataforma:\n\n"
+)
+CABECALHO_FOCO_SEGMENTO = (
+    "🎯 FOCO DA SEMANA - {data} - {segmento} 🎯\n\n"
+    "Equipe, vamos priorizar o contato com os seguintes clientes de alto potencial identificados na plataforma:\n\n"
+)
+MODELO_CLIENTE = (
+    "👤 Cliente: {nome_consumidor}\n"
+    "📍 Cidade: {cidade}\n"
+    "📞 Telefone: {telefone}\n"
+    "💰 Potencial (Fatura): R$ {valor_fatura_r$:.2f}\n"
+    "--------------------------------------\n"
+)
+MODELO_CLIENTE_DISTANCIA = MODELO_CLIENTE.replace(
+    "--------", "🚗 Distância: {distancia_km:.1f} km\n--------", 1
+)
+
+
+# --- ÍNDICE POR FATURA ---
+class IndiceValor:
+    """Posições das visitas em ordem decrescente de fatura (imutável; ver `acrescentar`)."""
+
+    def __init__(self, df=None):
+        valor = np.empty(0) if df is None else df['valor_fatura_r$'].to_numpy(dtype=np.float64)
+        self.n = len(valor)
+        self.valor = valor
+        # Fatura nula vai para o fim; empates mantêm a ordem de chegada
+        self._chave = np.where(np.isnan(valor), np.inf, -valor)
+        self.ordem = np.argsort(self._chave, kind='stable')
+        self._chaves_ordenadas = self._chave[self.ordem]
+
+    def acrescentar(self, df_novo):
+        """Novo índice com as linhas de `df_novo` intercaladas na ordem existente."""
+        trecho = IndiceValor(df_novo)
+        novo = object.__new__(IndiceValor)
+        novo.n = self.n + trecho.n
+        novo.valor = np.concatenate([self.valor, trecho.valor])
+        novo._chave = np.concatenate([self._chave, trecho._chave])
+        insercao = np.searchsorted(self._chaves_ordenadas, trecho._chaves_ordenadas, 'right')
+        novo.ordem = np.insert(self.ordem, insercao, trecho.ordem + self.n)
+        novo._chaves_ordenadas = np.insert(self._chaves_ordenadas, insercao, trecho._chaves_ordenadas)
+        return novo
+
+    def _acima(self, valor_minimo):
+        """Trecho da ordem com fatura >= `valor_minimo` (um prefixo, por busca binária)."""
+        return self.ordem[:np.searchsorted(self._chaves_ordenadas, -float(valor_minimo), 'right')]
+
+    def maiores(self, n, posicoes=None, valor_minimo=0, bloco=4096):
+        """Posições das `n` maiores faturas entre `posicoes` (None = todas), da maior para a menor.
+
+        Percorre a ordem em blocos e para assim que junta `n` linhas do recorte.
+        """
+        candidatos = self._acima(valor_minimo)
+        if posicoes is None:
+            return candidatos[:n]
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[posicoes] = True
+        encontrados = []
+        faltam = n
+        for inicio in range(0, len(candidatos), bloco):
+            trecho = candidatos[inicio:inicio + bloco]
+            trecho = trecho[mascara[trecho]][:faltam]
+            encontrados.append(trecho)
+            faltam -= len(trecho)
+            if faltam <= 0:
+                break
+        return np.concatenate(encontrados) if encontrados else np.empty(0, dtype=np.int64)
+
+    def maiores_por_segmento(self, n, segmentos, posicoes=None, valor_minimo=0):
+        """Top `n` de cada segmento numa passada só.
+
+        `segmentos` é um array (uma entrada por linha do frame) com o funcionário, a cidade etc.
+        Devolve (posições, segmento de cada posição), agrupadas por segmento e por fatura decrescente.
+        """
+        candidatos = self._acima(valor_minimo)
+        if posicoes is not None:
+            mascara = np.zeros(self.n, dtype=bool)
+            mascara[posicoes] = True
+            candidatos = candidatos[mascara[candidatos]]
+        codigos, valores = pd.factorize(np.asarray(segmentos, dtype=object)[candidatos], sort=True)
+        # Ordenação estável pelo segmento: dentro de cada um a ordem por fatura se mantém
+        ordem = np.argsort(codigos, kind='stable')
+        codigos, candidatos = codigos[ordem], candidatos[ordem]
+        inicio_segmento = np.searchsorted(codigos, codigos, 'left')
+        manter = (np.arange(len(codigos)) - inicio_segmento < n) & (codigos >= 0)
+        return candidatos[manter], np.asarray(valores, dtype=object)[codigos[manter]]
+
+
+class IndiceValorIncremental:
+    """Mantém o `IndiceValor` em dia com o frame do `CacheVisitas`, acrescentando só as linhas novas."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.indice = IndiceValor()
+        self._geracao = None
+
+    def atualizar(self, df, versao):
+        """Devolve o índice (imutável) correspondente a `df`."""
+        with self._trava:
+            geracao = versao[0] if versao else None
+            if geracao != self._geracao or len(df) < self.indice.n:
+                self.indice = IndiceValor(df)
+                self._geracao = geracao
+            elif len(df) > self.indice.n:
+                self.indice = self.indice.acrescentar(df.iloc[self.indice.n:])
+            return self.indice
+
+
+# --- MENSAGENS ---
+def _formatar_coluna(serie, formato):
+    if not formato:
+        return serie.astype(str)
+    if formato.startswith('.') and formato.endswith('f'):
+        return pd.Series(np.char.mod('%' + formato, serie.to_numpy(dtype=np.float64)), index=serie.index)
+    return serie.map(lambda v: format(v, formato))
+
+
+def renderizar_blocos(df, modelo=MODELO_CLIENTE):
+    """Um bloco de texto por linha de `df`, preenchendo o modelo coluna a coluna."""
+    blocos = pd.Series('', index=df.index, dtype=object)
+    for literal, campo, formato, _ in string.Formatter().parse(modelo):
+        blocos = blocos + literal
+        if campo is not None:
+            blocos = blocos + _formatar_coluna(df[campo], formato).to_numpy(dtype=object)
+    return blocos
+
+
+def mensagem_foco(clientes, data=None, modelo=MODELO_CLIENTE):
+    """Mensagem do Foco Semanal para os clientes (já na ordem de prioridade)."""
+    data = data or datetime.now().strftime("%d/%m/%Y")
+    return CABECALHO_FOCO.format(data=data) + ''.join(renderizar_blocos(clientes, modelo))
+
+
+def mensagens_por_segmento(clientes, coluna='segmento', data=None):
+    """Uma mensagem por valor de `coluna`, com os clientes já selecionados e ordenados.
+
+    `clientes` normalmente vem de `IndiceValor.maiores_por_segmento` (ou de
+    `ServicoDados.maiores_por_segmento`). Devolve um DataFrame com `segmento`, `clientes` e `mensagem`.
+    """
+    data = data or datetime.now().strftime("%d/%m/%Y")
+    if clientes.empty:
+        return pd.DataFrame({'segmento': [], 'clientes': [], 'mensagem': []})
+    blocos = pd.DataFrame({'segmento': clientes[coluna].to_numpy(dtype=object), 'bloco': renderizar_blocos(clientes).to_numpy()})
+    agrupado = blocos.groupby('segmento', sort=False).agg(clientes=('bloco', 'size'), corpo=('bloco', ''.join)).reset_index()
+    agrupado['mensagem'] = [
+        CABECALHO_FOCO_SEGMENTO.format(data=data, segmento=s) + corpo
+        for s, corpo in zip(agrupado['segmento'], agrupado['corpo'])
+    ]
+    return agrupado[['segmento', 'clientes', 'mensagem']]
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    from camada_dados import CacheVisitas
+
+    parser = argparse.ArgumentParser(description="Gera as mensagens do Foco Semanal de todos os segmentos.")
+    parser.add_argument('--por', default='nome_funcionario', choices=['nome_funcionario', 'cidade', 'estado'])
+    parser.add_argument('--top', type=int, default=5)
+    parser.add_argument('--fatura-minima', type=float, default=500)
+    parser.add_argument('--saida', default='mensagens_foco.csv')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    df, _ = CacheVisitas().obter()
+    posicoes, segmentos = IndiceValor(df).maiores_por_segmento(args.top, df[args.por].to_numpy(dtype=object), valor_minimo=args.fatura_minima)
+    mensagens = mensagens_por_segmento(df.take(posicoes).assign(segmento=segmentos))
+    mensagens.to_csv(args.saida, index=False, encoding='utf-8')
+    print(f"{len(mensagens)} mensagens gravadas em '{args.saida}'.")
+    print(f"Tempo: {time.perf_counter() - inicio:.2f}s")
@@ -0,0 +1,251 @@
+"""Grade espacial (geohash implementado localmente) e índice das visitas por coordenada.
+
+Além de agrupar o mapa, o índice responde consultas por raio e k-vizinhos mais próximos
+(distância de haversine) usadas para priorizar clientes perto de um ponto.
+
+O código de cada ponto é um inteiro de 52 bits com os bits de longitude e latitude
+intercalados, na mesma ordem do geohash. Os `5 * p` bits mais altos são a célula de
+geohash com `p` caracteres, então todas as visitas de uma célula ficam contíguas
+quando os códigos estão ordenados.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from perfis import codificar_perfis
+
+BITS_POR_EIXO = 26
+BITS_TOTAL = 2 * BITS_POR_EIXO
+PRECISAO_MAXIMA = BITS_TOTAL // 5  # 10 caracteres
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_VALOR_BASE32 = {c: i for i, c in enumerate(_BASE32)}
+
+RAIO_TERRA_KM = 6371.0088
+KM_POR_GRAU = 111.32
+DISTANCIA_REFERENCIA_KM = 10.0  # distância em que o potencial de uma visita cai pela metade
+
+
+# --- CODIFICAÇÃO ---
+def _espalhar_bits(x):
+    """Coloca os 26 bits de `x` nas posições pares de um uint64."""
+    x = x.astype(np.uint64) & np.uint64(0x3FFFFFF)
+    for deslocamento, mascara in ((16, 0x0000FFFF0000FFFF), (8, 0x00FF00FF00FF00FF), (4, 0x0F0F0F0F0F0F0F0F),
+                                  (2, 0x3333333333333333), (1, 0x5555555555555555)):
+        x = (x | (x << np.uint64(deslocamento))) & np.uint64(mascara)
+    return x
+
+
+def codificar(lat, lon):
+    """Código espacial (uint64) de cada par latitude/longitude."""
+    escala = float(1 << BITS_POR_EIXO)
+    lat_q = np.clip(np.floor((np.asarray(lat, dtype=np.float64) + 90.0) / 180.0 * escala), 0, escala - 1)
+    lon_q = np.clip(np.floor((np.asarray(lon, dtype=np.float64) + 180.0) / 360.0 * escala), 0, escala - 1)
+    return (_espalhar_bits(lon_q) << np.uint64(1)) | _espalhar_bits(lat_q)
+
+
+def celula(codigos, precisao):
+    """Célula de geohash (como inteiro) com `precisao` caracteres."""
+    return np.asarray(codigos, dtype=np.uint64) >> np.uint64(BITS_TOTAL - 5 * precisao)
+
+
+def para_geohash(celula_int, precisao):
+    """Inteiro da célula -> texto do geohash."""
+    celula_int = int(celula_int)
+    return ''.join(_BASE32[(celula_int >> (5 * (precisao - 1 - i))) & 31] for i in range(precisao))
+
+
+def de_geohash(texto):
+    """Texto do geohash -> (inteiro da célula, precisão)."""
+    valor = 0
+    for c in texto:
+        valor = (valor << 5) | _VALOR_BASE32[c]
+    return valor, len(texto)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Distância em km pela fórmula de haversine (aceita arrays)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# --- ÍNDICE ---
+class IndiceGeo:
+    """Códigos espaciais das visitas com coordenadas válidas, ordenados para busca por célula.
+
+    O índice é imutável: `acrescentar` devolve um índice novo com as linhas acrescidas
+    intercaladas nos códigos já ordenados (sem reordenar tudo), então uma sessão pode
+    continuar consultando a versão anterior enquanto outra atualiza.
+    As consultas recebem as posições já filtradas (ver `IndiceFiltros.posicoes`).
+    """
+
+    def __init__(self, df=None):
+        if df is None:
+            df = pd.DataFrame({'latitude': [], 'longitude': [], 'valor_fatura_r$': [], 'perfil_flags': []})
+        self.n = len(df)
+        self.lat = pd.to_numeric(df['latitude'], errors='coerce').to_numpy(dtype=np.float64)
+        self.lon = pd.to_numeric(df['longitude'], errors='coerce').to_numpy(dtype=np.float64)
+        self.valor = df['valor_fatura_r$'].to_numpy(dtype=np.float64)
+        self.perfil_flags = df['perfil_flags'].to_numpy(dtype=np.uint8)
+        # Mesmo critério do mapa original: sem coordenada ou em (0, 0) não entra
+        self.valida = ~np.isnan(self.lat) & ~np.isnan(self.lon) & (self.lat != 0) & (self.lon != 0)
+        self.codigo_linha = np.zeros(self.n, dtype=np.uint64)
+        self.codigo_linha[self.valida] = codificar(self.lat[self.valida], self.lon[self.valida])
+        validas = np.flatnonzero(self.valida)
+        ordem = np.argsort(self.codigo_linha[validas], kind='stable')
+        self.posicoes_ordenadas = validas[ordem]
+        self.codigos_ordenados = self.codigo_linha[self.posicoes_ordenadas]
+
+    def acrescentar(self, df_novo):
+        """Novo índice com as linhas de `df_novo` no fim (posições a partir de `self.n`)."""
+        trecho = IndiceGeo(df_novo)
+        novo = object.__new__(IndiceGeo)
+        novo.n = self.n + trecho.n
+        for atributo in ('lat', 'lon', 'valor', 'perfil_flags', 'valida', 'codigo_linha'):
+            setattr(novo, atributo, np.concatenate([getattr(self, atributo), getattr(trecho, atributo)]))
+        insercao = np.searchsorted(self.codigos_ordenados, trecho.codigos_ordenados, 'right')
+        novo.codigos_ordenados = np.insert(self.codigos_ordenados, insercao, trecho.codigos_ordenados)
+        novo.posicoes_ordenadas = np.insert(self.posicoes_ordenadas, insercao, trecho.posicoes_ordenadas + self.n)
+        return novo
+
+    def _mascara(self, posicoes):
+        if posicoes is None:
+            return None
+        mascara = np.zeros(self.n, dtype=bool)
+        mascara[posicoes] = True
+        return mascara
+
+    def com_coordenadas(self, posicoes):
+        """Só as posições que têm coordenadas válidas."""
+        return posicoes[self.valida[posicoes]]
+
+    # --- Grade para o mapa ---
+    def escolher_precisao(self, posicoes, max_celulas):
+        """Maior precisão cujo nº de células ocupadas não passa de `max_celulas`."""
+        codigos = np.sort(self.codigo_linha[posicoes])
+        escolhida = 1
+        for precisao in range(1, PRECISAO_MAXIMA + 1):
+            celulas = celula(codigos, precisao)
+            ocupadas = 1 + int(np.count_nonzero(celulas[1:] != celulas[:-1])) if len(celulas) else 0
+            if ocupadas > max_celulas:
+                break
+            escolhida = precisao
+        return escolhida
+
+    def agregar(self, posicoes, precisao):
+        """Nº de visitas, soma e média da fatura e centro (média das coordenadas) por célula."""
+        celulas, inverso = np.unique(celula(self.codigo_linha[posicoes], precisao), return_inverse=True)
+        visitas = np.bincount(inverso, minlength=len(celulas))
+        soma = np.bincount(inverso, weights=self.valor[posicoes], minlength=len(celulas))
+        agregado = pd.DataFrame({
+            'geohash': [para_geohash(c, precisao) for c in celulas],
+            'latitude': np.bincount(inverso, weights=self.lat[posicoes], minlength=len(celulas)) / visitas,
+            'longitude': np.bincount(inverso, weights=self.lon[posicoes], minlength=len(celulas)) / visitas,
+            'visitas': visitas,
+            'soma': soma,
+            'media': soma / visitas,
+        })
+        return agregado.sort_values('soma', ascending=False, ignore_index=True)
+
+    def linhas_da_celula(self, geohash, posicoes=None):
+        """Posições das visitas dentro da célula (busca binária), opcionalmente restritas a `posicoes`."""
+        valor, precisao = de_geohash(geohash)
+        deslocamento = np.uint64(BITS_TOTAL - 5 * precisao)
+        inicio = np.uint64(valor) << deslocamento
+        fim = np.uint64(valor + 1) << deslocamento
+        a, b = np.searchsorted(self.codigos_ordenados, [inicio, fim])
+        dentro = self.posicoes_ordenadas[a:b]
+        mascara = self._mascara(posicoes)
+        if mascara is not None:
+            dentro = dentro[mascara[dentro]]
+        return np.sort(dentro)
+
+    # --- Consultas por proximidade ---
+    def _candidatos(self, lat, lon, raio_km):
+        """Posições nas células da grade que cobrem o quadrado envolvente do círculo."""
+        dlat = raio_km / KM_POR_GRAU
+        cos_lat = max(np.cos(np.radians(min(abs(lat) + dlat, 89.9))), 1e-6)
+        dlon = min(raio_km / (KM_POR_GRAU * cos_lat), 180.0)
+        # Células pelo menos do tamanho do raio, para o círculo caber em poucas delas
+        bits = int(np.clip(np.floor(np.log2(180.0 / max(dlat, 1e-9))) - 1, 1, BITS_POR_EIXO))
+        while True:
+            escala = 1 << bits
+            linhas = np.arange(
+                int(np.clip(np.floor((lat - dlat + 90.0) / 180.0 * escala), 0, escala - 1)),
+                int(np.clip(np.floor((lat + dlat + 90.0) / 180.0 * escala), 0, escala - 1)) + 1,
+            )
+            colunas = np.unique(np.arange(
+                int(np.floor((lon - dlon + 180.0) / 360.0 * escala)),
+                int(np.floor((lon + dlon + 180.0) / 360.0 * escala)) + 1,
+            ) % escala)  # o módulo trata a volta em ±180°
+            if len(linhas) * len(colunas) <= 64 or bits == 1:
+                break
+            bits -= 1
+        jj, ii = np.meshgrid(colunas, linhas)
+        chaves = (_espalhar_bits(jj.ravel()) << np.uint64(1)) | _espalhar_bits(ii.ravel())
+        deslocamento = np.uint64(2 * (BITS_POR_EIXO - bits))
+        inicios = np.searchsorted(self.codigos_ordenados, chaves << deslocamento)
+        fins = np.searchsorted(self.codigos_ordenados, (chaves + np.uint64(1)) << deslocamento)
+        if not len(inicios):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.posicoes_ordenadas[a:b] for a, b in zip(inicios, fins)])
+
+    def no_raio(self, lat, lon, raio_km, posicoes=None):
+        """Visitas a até `raio_km` do ponto: (posições, distâncias em km), da mais próxima para a mais distante."""
+        candidatos = self._candidatos(lat, lon, raio_km)
+        mascara = self._mascara(posicoes)
+        if mascara is not None:
+            candidatos = candidatos[mascara[candidatos]]
+        distancias = haversine_km(lat, lon, self.lat[candidatos], self.lon[candidatos])
+        dentro = distancias <= raio_km
+        candidatos, distancias = candidatos[dentro], distancias[dentro]
+        ordem = np.argsort(distancias, kind='stable')
+        return candidatos[ordem], distancias[ordem]
+
+    def mais_proximos(self, lat, lon, k, posicoes=None, raio_max_km=2 * np.pi * RAIO_TERRA_KM):
+        """As `k` visitas mais próximas do ponto (raio de busca dobrando até achar `k`)."""
+        raio = 5.0
+        while True:
+            encontrados, distancias = self.no_raio(lat, lon, min(raio, raio_max_km), posicoes)
+            if len(encontrados) >= k or raio >= raio_max_km:
+                return encontrados[:k], distancias[:k]
+            raio *= 2
+
+    def oportunidades_proximas(self, lat, lon, raio_km, posicoes=None, pesos_perfil=None, valor_minimo=0, n=None):
+        """Visitas no raio ordenadas por potencial: fatura x peso do perfil, descontada pela distância.
+
+        `pesos_perfil` mapeia nome do perfil -> peso (padrão 1); uma visita com vários perfis
+        usa o maior peso entre eles. A pontuação é `valor * peso / (1 + distância / 10 km)`.
+        """
+        encontrados, distancias = self.no_raio(lat, lon, raio_km, posicoes)
+        acima = self.valor[encontrados] >= valor_minimo
+        encontrados, distancias = encontrados[acima], distancias[acima]
+        peso = np.ones(len(encontrados))
+        for perfil, peso_perfil in (pesos_perfil or {}).items():
+            tem = (self.perfil_flags[encontrados] & np.uint8(codificar_perfis([perfil]))) != 0
+            peso = np.where(tem, np.maximum(peso, peso_perfil), peso)
+        pontuacao = self.valor[encontrados] * peso / (1 + distancias / DISTANCIA_REFERENCIA_KM)
+        resultado = pd.DataFrame({'posicao': encontrados, 'distancia_km': distancias, 'pontuacao': pontuacao})
+        resultado = resultado.sort_values('pontuacao', ascending=False, ignore_index=True, kind='stable')
+        return resultado if n is None else resultado.head(n)
+
+
+class IndiceGeoIncremental:
+    """Mantém o `IndiceGeo` em dia com o frame do `CacheVisitas`, acrescentando só as linhas novas."""
+
+    def __init__(self):
+        self._trava = threading.Lock()
+        self.indice = IndiceGeo()
+        self._geracao = None
+
+    def atualizar(self, df, versao):
+        """Devolve o índice (imutável) correspondente a `df`."""
+        with self._trava:
+            geracao = versao[0] if versao else None
+            if geracao != self._geracao or len(df) < self.indice.n:
+                self.indice = IndiceGeo(df)
+                self._geracao = geracao
+            elif len(df) > self.indice.n:
+                self.indice = self.indice.acrescentar(df.iloc[self.indice.n:])
+            return self.indice
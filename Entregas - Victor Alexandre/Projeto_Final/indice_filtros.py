@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from perfis import codificar_perfis, perfis_presentes
+
+# Dias sem data válida ficam no fim da ordenação e nunca entram num intervalo
+_SEM_DATA = np.iinfo(np.int64).max
+
+
+class _ListasPosicoes:
+    """Índice invertido de uma coluna: para cada valor, as posições (na ordem por data) em que ele aparece."""
+
+    def __init__(self, valores):
+        codigos, self.valores = pd.factorize(valores, sort=True)
+        self.codigo_de = {v: i for i, v in enumerate(self.valores)}
+        # Ordenação estável: dentro de cada valor as posições continuam crescentes
+        self.posicoes = np.argsort(codigos, kind='stable').astype(np.int64)
+        self.limites = np.concatenate([[0], np.cumsum(np.bincount(codigos[codigos >= 0], minlength=len(self.valores)))])
+
+    def bitmap(self, selecionados, inicio, fim):
+        """Bitmap (bool) da janela [inicio, fim) com as linhas de qualquer valor selecionado.
+
+        Devolve None quando todos os valores existentes estão selecionados (não filtra nada).
+        """
+        codigos = {self.codigo_de[v] for v in selecionados if v in self.codigo_de}
+        total = len(self.valores)
+        if len(codigos) == total:
+            return None
+        # Com mais da metade selecionada, é mais barato marcar os não selecionados e inverter
+        complemento = len(codigos) > total / 2
+        if complemento:
+            codigos = set(range(total)) - codigos
+        bitmap = np.zeros(fim - inicio, dtype=bool)
+        for codigo in codigos:
+            lista = self.posicoes[self.limites[codigo]:self.limites[codigo + 1]]
+            a, b = np.searchsorted(lista, [inicio, fim])
+            bitmap[lista[a:b] - inicio] = True
+        return ~bitmap if complemento else bitmap
+
+
+class IndiceFiltros:
+    """Índice dos filtros da barra lateral, construído uma vez por versão dos dados.
+
+    - datas em ordem crescente, para recortar o período por busca binária;
+    - listas de posições por estado, cidade e funcionário, combinadas como bitmaps;
+    - bits de perfil (`perfil_flags`, ver perfis.py) para o filtro de perfil.
+
+    `posicoes()` devolve as posições (em ordem de data) das linhas que passam nos filtros.
+    """
+
+    def __init__(self, df):
+        self.n = len(df)
+        dias = df['data_visita'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]')
+        dias_int = np.where(np.isnat(dias), _SEM_DATA, dias.astype(np.int64))
+        self.ordem = np.argsort(dias_int, kind='stable')
+        self.dias = dias_int[self.ordem]
+
+        def na_ordem(col):
+            return df[col].to_numpy(dtype=object)[self.ordem]
+
+        estados = na_ordem('estado')
+        cidades = na_ordem('cidade')
+        self.indice_estado = _ListasPosicoes(estados)
+        self.indice_cidade = _ListasPosicoes(cidades)
+        self.indice_funcionario = _ListasPosicoes(na_ordem('nome_funcionario'))
+
+        self.perfil_flags = df['perfil_flags'].to_numpy(dtype=np.uint8)[self.ordem]
+        self.perfis = perfis_presentes(self.perfil_flags)
+
+        # Listas de opções da barra lateral
+        self.estados = list(self.indice_estado.valores)
+        pares = pd.DataFrame({'estado': estados, 'cidade': cidades}).drop_duplicates()
+        self.cidades_por_estado = pares.groupby('estado')['cidade'].apply(list).to_dict()
+        self.funcionarios = list(self.indice_funcionario.valores)
+        validos = self.dias[self.dias != _SEM_DATA]
+        self.data_min = pd.Timestamp(int(validos[0]), unit='D').date() if len(validos) else None
+        self.data_max = pd.Timestamp(int(validos[-1]), unit='D').date() if len(validos) else None
+
+    def cidades_dos_estados(self, estados):
+        """Cidades disponíveis (ordenadas) para os estados selecionados."""
+        return sorted({c for e in estados for c in self.cidades_por_estado.get(e, [])})
+
+    def janela(self, data_inicio=None, data_fim=None):
+        """Intervalo [inicio, fim) da ordem por data que cobre o período (inclusivo nos dois lados)."""
+        inicio = 0 if data_inicio is None else np.searchsorted(self.dias, np.datetime64(data_inicio, 'D').astype(np.int64), 'left')
+        if data_fim is None:
+            fim = np.searchsorted(self.dias, _SEM_DATA, 'left')
+        else:
+            fim = np.searchsorted(self.dias, np.datetime64(data_fim, 'D').astype(np.int64), 'right')
+        return int(inicio), int(max(fim, inicio))
+
+    def posicoes(self, data_inicio=None, data_fim=None, estados=None, cidades=None, funcionarios=None, perfis=None):
+        """Posições das linhas que passam em todos os filtros. Listas vazias ou None não filtram."""
+        inicio, fim = self.janela(data_inicio, data_fim) if (data_inicio or data_fim) else (0, self.n)
+        mascara = None
+        for indice, selecionados in ((self.indice_estado, estados), (self.indice_cidade, cidades), (self.indice_funcionario, funcionarios)):
+            if selecionados:
+                bitmap = indice.bitmap(selecionados, inicio, fim)
+                if bitmap is not None:
+                    mascara = bitmap if mascara is None else mascara & bitmap
+        if perfis:
+            bitmap = (self.perfil_flags[inicio:fim] & np.uint8(codificar_perfis(perfis))) != 0
+            mascara = bitmap if mascara is None else mascara & bitmap
+        if mascara is None:
+            return self.ordem[inicio:fim]
+        return self.ordem[inicio + np.flatnonzero(mascara)]
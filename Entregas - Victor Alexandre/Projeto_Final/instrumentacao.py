@@ -0,0 +1,239 @@
+"""Medição do tempo de cada etapa do dashboard, a cada execução do script.
+
+- `iniciar_execucao()` no começo do script e `finalizar_execucao()` no fim delimitam uma
+  execução (cada interação com um widget reexecuta o script inteiro);
+- `etapa("nome")` (gerenciador de contexto) e `@medido("nome")` (decorador) medem trechos;
+  etapas dentro de etapas aparecem aninhadas. `with etapa("filtros") as medida:` permite
+  informar as linhas processadas depois de conhecê-las (`medida.linhas = n`);
+- `contar("nome", n)` soma contadores: acertos e falhas de cache, linhas lidas etc.
+  Os módulos de dados chamam `contar` sempre; fora de uma execução, só os totais do
+  processo são atualizados.
+
+As últimas execuções ficam em memória (percentis p50/p95 por etapa). Com a variável de
+ambiente `METRICAS_PAINEL=<diretório>`, cada execução vira uma linha em
+`metricas_painel.jsonl` e os percentis são gravados no formato texto do Prometheus em
+`metricas_painel.prom` (para o node_exporter/textfile collector ou outro coletor).
+
+Resumo de um arquivo JSONL (ex.: de produção):
+    python instrumentacao.py metricas_painel.jsonl
+"""
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+NOME_ARQUIVO_JSONL = 'metricas_painel.jsonl'
+NOME_ARQUIVO_PROMETHEUS = 'metricas_painel.prom'
+MAX_EXECUCOES_MEMORIA = 1000
+INTERVALO_PROMETHEUS_S = 10.0
+
+_local = threading.local()  # o Streamlit roda cada execução do script numa thread
+
+
+class Execucao:
+    """Uma execução do script: etapas (na ordem em que começaram) e contadores."""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.inicio = time.perf_counter()
+        self.momento = datetime.now()
+        self.etapas = []  # (nome, ms, linhas, nível de aninhamento); None enquanto a etapa não termina
+        self.contadores = Counter()
+        self.total_ms = None
+        self._nivel = 0
+
+    def tabela(self):
+        """Etapas terminadas como DataFrame (etapa, ms, linhas, % do total); as aninhadas vêm recuadas."""
+        etapas = [e for e in self.etapas if e is not None]
+        tabela = pd.DataFrame(etapas, columns=['etapa', 'ms', 'linhas', 'nivel'])
+        tabela['etapa'] = ['\u2003' * nivel + nome for nome, nivel in zip(tabela['etapa'], tabela['nivel'])]
+        total = self.total_ms or (time.perf_counter() - self.inicio) * 1000
+        tabela['% do total'] = tabela['ms'] / total * 100
+        return tabela[['etapa', 'ms', 'linhas', '% do total']]
+
+    def como_registro(self):
+        """Dicionário serializável em JSON; etapas com o mesmo nome (ex.: num laço) são somadas."""
+        etapas, linhas = Counter(), Counter()
+        for nome, ms, qtd, _ in filter(None, self.etapas):
+            etapas[nome] += ms
+            if qtd is not None:
+                linhas[nome] += int(qtd)
+        return {
+            'momento': self.momento.isoformat(timespec='milliseconds'), 'rotulo': self.rotulo, 'total_ms': self.total_ms,
+            'etapas': dict(etapas), 'linhas': dict(linhas), 'contadores': dict(self.contadores),
+        }
+
+
+class Medida:
+    """Devolvida por `etapa`: `linhas` pode ser preenchido dentro do `with`."""
+    __slots__ = ('linhas',)
+
+    def __init__(self, linhas=None):
+        self.linhas = linhas
+
+
+# --- EXECUÇÃO ATUAL ---
+def iniciar_execucao(rotulo='painel'):
+    _local.execucao = Execucao(rotulo)
+    return _local.execucao
+
+
+def execucao_atual():
+    return getattr(_local, 'execucao', None)
+
+
+def finalizar_execucao():
+    """Fecha a execução atual, guarda no histórico e grava os arquivos de métricas (se configurados)."""
+    execucao = execucao_atual()
+    if execucao is None:
+        return None
+    _local.execucao = None
+    execucao.total_ms = (time.perf_counter() - execucao.inicio) * 1000
+    REGISTRO.registrar(execucao)
+    return execucao
+
+
+@contextmanager
+def etapa(nome, linhas=None):
+    """Mede o trecho dentro do `with`. Sem execução em andamento, não faz nada."""
+    medida = Medida(linhas)
+    execucao = execucao_atual()
+    if execucao is None:
+        yield medida
+        return
+    # Reserva a posição já na entrada: a etapa de fora aparece antes das de dentro
+    indice, nivel = len(execucao.etapas), execucao._nivel
+    execucao.etapas.append(None)
+    execucao._nivel += 1
+    inicio = time.perf_counter()
+    try:
+        yield medida
+    finally:
+        execucao._nivel -= 1
+        execucao.etapas[indice] = (nome, (time.perf_counter() - inicio) * 1000, medida.linhas, nivel)
+
+
+def medido(nome=None):
+    """Decorador: cada chamada da função é uma etapa (nome padrão: o da função)."""
+    def decorar(funcao):
+        @wraps(funcao)
+        def medir(*args, **kwargs):
+            with etapa(nome or funcao.__name__):
+                return funcao(*args, **kwargs)
+        return medir
+    return decorar
+
+
+def contar(nome, valor=1):
+    """Soma `valor` ao contador na execução atual (se houver) e nos totais do processo."""
+    execucao = execucao_atual()
+    if execucao is not None:
+        execucao.contadores[nome] += valor
+    REGISTRO.contar(nome, valor)
+
+
+# --- HISTÓRICO E EXPORTAÇÃO ---
+def _percentis(valores):
+    valores = np.asarray(valores, dtype=np.float64)
+    return {'n': len(valores), 'p50': float(np.percentile(valores, 50)), 'p95': float(np.percentile(valores, 95)), 'max': float(valores.max())}
+
+
+def _rotulo_prometheus(texto):
+    return str(texto).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+class RegistroMetricas:
+    """Últimas execuções do processo (todas as sessões) e totais dos contadores."""
+
+    def __init__(self, diretorio=None, max_execucoes=MAX_EXECUCOES_MEMORIA):
+        self.diretorio = diretorio
+        self._trava = threading.Lock()
+        self._execucoes = deque(maxlen=max_execucoes)
+        self._totais = Counter()
+        self._ultimo_prometheus = 0.0
+
+    def contar(self, nome, valor=1):
+        with self._trava:
+            self._totais[nome] += valor
+
+    def registrar(self, execucao):
+        with self._trava:
+            self._execucoes.append(execucao)
+        if self.diretorio:
+            os.makedirs(self.diretorio, exist_ok=True)
+            linha = json.dumps(execucao.como_registro(), ensure_ascii=False)
+            with self._trava, open(os.path.join(self.diretorio, NOME_ARQUIVO_JSONL), 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha + '\n')
+            if time.monotonic() - self._ultimo_prometheus >= INTERVALO_PROMETHEUS_S:
+                self._ultimo_prometheus = time.monotonic()
+                self.gravar_prometheus(os.path.join(self.diretorio, NOME_ARQUIVO_PROMETHEUS))
+
+    def percentis(self):
+        """p50, p95 e máximo (ms) do total das execuções e de cada etapa, nas últimas execuções."""
+        with self._trava:
+            execucoes = list(self._execucoes)
+        return percentis_execucoes([e.como_registro() for e in execucoes])
+
+    def totais(self):
+        with self._trava:
+            return dict(self._totais)
+
+    def prometheus(self):
+        """Percentis e contadores no formato texto do Prometheus."""
+        tabela = self.percentis()
+        linhas = [
+            "# HELP painel_execucao_ms Duração das execuções do script do dashboard (últimas execuções).",
+            "# TYPE painel_execucao_ms summary",
+        ]
+        for _, r in tabela.iterrows():
+            rotulo_etapa = '' if r['etapa'] == 'total' else f'etapa="{_rotulo_prometheus(r["etapa"])}"'
+            for quantil, coluna in (('0.5', 'p50'), ('0.95', 'p95')):
+                rotulos = ','.join(filter(None, [rotulo_etapa, f'quantile="{quantil}"']))
+                linhas.append(f'painel_execucao_ms{{{rotulos}}} {r[coluna]:.3f}')
+            linhas.append(f'painel_execucao_ms_count{{{rotulo_etapa}}} {int(r["n"])}' if rotulo_etapa else f'painel_execucao_ms_count {int(r["n"])}')
+        linhas += ["# HELP painel_contador_total Contadores do processo (cache, linhas lidas etc.).", "# TYPE painel_contador_total counter"]
+        for nome, valor in sorted(self.totais().items()):
+            linhas.append(f'painel_contador_total{{nome="{_rotulo_prometheus(nome)}"}} {valor}')
+        return '\n'.join(linhas) + '\n'
+
+    def gravar_prometheus(self, caminho):
+        temporario = caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(self.prometheus())
+        os.replace(temporario, caminho)  # o coletor nunca lê um arquivo pela metade
+
+
+def percentis_execucoes(registros):
+    """Tabela etapa -> n, p50, p95, max (ms) a partir de registros (`Execucao.como_registro` ou linhas do JSONL)."""
+    por_etapa = {'total': [r['total_ms'] for r in registros if r.get('total_ms') is not None]}
+    for registro in registros:
+        for nome, ms in registro['etapas'].items():
+            por_etapa.setdefault(nome, []).append(ms)
+    linhas = [{'etapa': nome, **_percentis(valores)} for nome, valores in por_etapa.items() if valores]
+    return pd.DataFrame(linhas, columns=['etapa', 'n', 'p50', 'p95', 'max'])
+
+
+REGISTRO = RegistroMetricas(os.environ.get('METRICAS_PAINEL') or None)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Percentis das execuções gravadas em metricas_painel.jsonl.")
+    parser.add_argument('arquivo', nargs='?', default=NOME_ARQUIVO_JSONL)
+    parser.add_argument('--ultimas', type=int, default=None, help="considera só as últimas N execuções")
+    args = parser.parse_args()
+
+    with open(args.arquivo, encoding='utf-8') as arquivo:
+        registros = [json.loads(linha) for linha in arquivo if linha.strip()]
+    if args.ultimas:
+        registros = registros[-args.ultimas:]
+    print(f"{len(registros)} execuções ({registros[0]['momento']} a {registros[-1]['momento']})." if registros else "Nenhuma execução.")
+    print(percentis_execucoes(registros).sort_values('p95', ascending=False).to_string(index=False, float_format='%.1f'))
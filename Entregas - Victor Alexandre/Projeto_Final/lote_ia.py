@@ -0,0 +1,203 @@
+"""Análises do Orientador IA em lote: uma por estado, cidade e funcionário.
+
+Os resumos de todos os segmentos saem das células do cubo (ver cubo.py) com um único
+groupby por estado/cidade/funcionário; os prompts (os mesmos do dashboard, ver
+orientador_ia.py) são enviados em paralelo, com limite de chamadas por minuto e novas
+tentativas com espera exponencial. O resultado fica em `analises_lote.sqlite`, que o
+dashboard lê direto na aba do Orientador IA.
+
+Uso pela linha de comando (por exemplo, agendado no cron uma vez por dia):
+    python lote_ia.py --modelo gemini --simultaneas 4 --por-minuto 30
+    python lote_ia.py --modelo falso   # modelo simulado, para medir o tempo sem rede
+"""
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pandas as pd
+
+from orientador_ia import montar_prompt, montar_resumo_dados, nome_do_modelo
+
+NOME_ARQUIVO_LOTE_IA = 'analises_lote.sqlite'
+SEGMENTOS = {'estado': 'Estado', 'cidade': 'Cidade', 'nome_funcionario': 'Funcionário'}
+
+
+# --- RESUMOS POR SEGMENTO ---
+def _com_media(agregado):
+    return agregado.assign(media=agregado['soma'] / agregado['visitas'])
+
+
+def resumos_por_segmento(celulas, tipos=tuple(SEGMENTOS)):
+    """Um resumo (texto do prompt) por segmento de cada tipo em `tipos`.
+
+    Devolve um DataFrame com `tipo`, `segmento` e `resumo_dados`.
+    """
+    celulas = celulas.dropna(subset=['dia'])
+    if celulas.empty:
+        return pd.DataFrame({'tipo': [], 'segmento': [], 'resumo_dados': []})
+    periodo = (celulas['dia'].min().date(), celulas['dia'].max().date())
+    # Único groupby sobre as células; os agregados por segmento saem desta base (bem menor)
+    base = celulas.groupby(['estado', 'cidade', 'nome_funcionario'], sort=False, as_index=False)[['visitas', 'soma']].sum()
+    linhas = []
+    for tipo in tipos:
+        por_segmento = base.groupby(tipo, sort=True)
+        totais_segmento = _com_media(por_segmento[['visitas', 'soma']].sum())
+        estados_segmento = por_segmento['estado'].unique()
+        cidades_segmento = por_segmento['cidade'].unique()
+        cidades = {
+            s: g.set_index('cidade')
+            for s, g in _com_media(base.groupby([tipo, 'cidade'], as_index=False)[['visitas', 'soma']].sum()).groupby(tipo)
+        }
+        funcionarios = {
+            s: g.set_index('nome_funcionario')
+            for s, g in base.groupby([tipo, 'nome_funcionario'], as_index=False)[['visitas', 'soma']].sum().groupby(tipo)
+        }
+        for segmento, total in totais_segmento.iterrows():
+            resumo = montar_resumo_dados(
+                periodo, sorted(estados_segmento[segmento]), sorted(cidades_segmento[segmento]),
+                {'visitas': int(total['visitas']), 'media': total['media']}, cidades[segmento], funcionarios[segmento],
+                funcionarios=[segmento] if tipo == 'nome_funcionario' else None,
+            )
+            linhas.append({'tipo': tipo, 'segmento': segmento, 'resumo_dados': resumo})
+    return pd.DataFrame(linhas)
+
+
+# --- EXECUÇÃO ---
+class LimitadorTaxa:
+    """Espaça as chamadas para no máximo `por_minuto` chamadas por minuto (entre todas as threads)."""
+
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self._trava = threading.Lock()
+        self._proxima = 0.0
+
+    def aguardar(self):
+        with self._trava:
+            agora = time.monotonic()
+            vez = max(agora, self._proxima)
+            self._proxima = vez + self.intervalo
+        if vez > agora:
+            time.sleep(vez - agora)
+
+
+class ExecutorLote:
+    """Envia os prompts ao `cliente` (qualquer objeto com `generate_content`, como o Gemini ou `ModeloFalso`)."""
+
+    def __init__(self, cliente, max_simultaneas=4, por_minuto=60, tentativas=3, espera_inicial_s=1.0):
+        self.cliente = cliente
+        self.max_simultaneas = max_simultaneas
+        self.limitador = LimitadorTaxa(por_minuto)
+        self.tentativas = tentativas
+        self.espera_inicial_s = espera_inicial_s
+
+    def _gerar(self, resumo_dados):
+        inicio = time.perf_counter()
+        for tentativa in range(1, self.tentativas + 1):
+            self.limitador.aguardar()
+            try:
+                texto = self.cliente.generate_content(montar_prompt(resumo_dados)).text
+                return {'texto': texto, 'erro': None, 'tentativas': tentativa, 'segundos': time.perf_counter() - inicio}
+            except Exception as e:
+                if tentativa == self.tentativas:
+                    return {'texto': None, 'erro': str(e), 'tentativas': tentativa, 'segundos': time.perf_counter() - inicio}
+                # Espera exponencial com variação aleatória, para as threads não voltarem juntas
+                time.sleep(self.espera_inicial_s * 2 ** (tentativa - 1) * random.uniform(0.5, 1.5))
+
+    def executar(self, resumos):
+        """Gera as análises de todos os resumos; devolve `resumos` com texto, erro, tentativas e segundos."""
+        with ThreadPoolExecutor(max_workers=self.max_simultaneas, thread_name_prefix='lote-ia') as executor:
+            resultados = list(executor.map(self._gerar, resumos['resumo_dados']))
+        return pd.concat([resumos.reset_index(drop=True), pd.DataFrame(resultados)], axis=1)
+
+
+# --- ARMAZENAMENTO ---
+class ArmazemAnalises:
+    """Última análise gerada em lote para cada (tipo, segmento, modelo)."""
+
+    def __init__(self, caminho=NOME_ARQUIVO_LOTE_IA):
+        self.caminho = caminho
+        with self._conectar() as conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS analises (tipo TEXT, segmento TEXT, modelo TEXT, resumo_dados TEXT, "
+                "texto TEXT, gerado_em REAL, PRIMARY KEY (tipo, segmento, modelo))"
+            )
+
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conexao:
+                yield conexao
+        finally:
+            conexao.close()
+
+    def gravar(self, resultados, modelo):
+        """Grava as análises sem erro (as que falharam mantêm a versão anterior)."""
+        ok = resultados[resultados['erro'].isna()]
+        agora = time.time()
+        with self._conectar() as conexao:
+            conexao.executemany(
+                "INSERT OR REPLACE INTO analises VALUES (?, ?, ?, ?, ?, ?)",
+                [(t, str(s), modelo, r, x, agora) for t, s, r, x in ok[['tipo', 'segmento', 'resumo_dados', 'texto']].itertuples(index=False)],
+            )
+        return len(ok)
+
+    def listar(self):
+        """Tipo, segmento e data das análises gravadas, mais recentes primeiro (sem os textos; ver `obter`)."""
+        with self._conectar() as conexao:
+            return pd.read_sql_query("SELECT tipo, segmento, gerado_em FROM analises ORDER BY gerado_em DESC", conexao)
+
+    def obter(self, tipo, segmento):
+        """Análise mais recente de um segmento (entre os modelos), ou None."""
+        with self._conectar() as conexao:
+            analise = pd.read_sql_query(
+                "SELECT tipo, segmento, modelo, texto, gerado_em FROM analises WHERE tipo = ? AND segmento = ? "
+                "ORDER BY gerado_em DESC LIMIT 1", conexao, params=(tipo, str(segmento)),
+            )
+        return None if analise.empty else analise.iloc[0]
+
+
+def executar_lote(celulas, cliente, armazem=None, tipos=tuple(SEGMENTOS), **opcoes):
+    """Resumos por segmento -> análises do modelo -> armazém. Devolve os resultados de cada segmento."""
+    resumos = resumos_por_segmento(celulas, tipos)
+    resultados = ExecutorLote(cliente, **opcoes).executar(resumos)
+    (armazem or ArmazemAnalises()).gravar(resultados, nome_do_modelo(cliente))
+    return resultados
+
+
+if __name__ == '__main__':
+    import argparse
+    import os
+    from camada_dados import CacheVisitas
+    from cubo import agregar_linhas
+    from orientador_ia import ModeloFalso
+
+    parser = argparse.ArgumentParser(description="Gera as análises do Orientador IA para todos os segmentos.")
+    parser.add_argument('--modelo', choices=['gemini', 'falso'], default='gemini')
+    parser.add_argument('--por', nargs='+', choices=list(SEGMENTOS), default=list(SEGMENTOS))
+    parser.add_argument('--simultaneas', type=int, default=4)
+    parser.add_argument('--por-minuto', type=float, default=60)
+    parser.add_argument('--tentativas', type=int, default=3)
+    parser.add_argument('--saida', default=NOME_ARQUIVO_LOTE_IA)
+    args = parser.parse_args()
+
+    if args.modelo == 'gemini':
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
+        cliente = genai.GenerativeModel('gemini-2.5-flash')
+    else:
+        cliente = ModeloFalso()
+
+    inicio = time.perf_counter()
+    df, _ = CacheVisitas().obter()
+    resultados = executar_lote(
+        agregar_linhas(df), cliente, ArmazemAnalises(args.saida), tuple(args.por),
+        max_simultaneas=args.simultaneas, por_minuto=args.por_minuto, tentativas=args.tentativas,
+    )
+    duracao = time.perf_counter() - inicio
+    falhas = int(resultados['erro'].notna().sum())
+    print(f"{len(resultados) - falhas} análises gravadas em '{args.saida}', {falhas} falhas.")
+    print(f"Tempo: {duracao:.2f}s ({len(resultados) / duracao:.1f} segmentos/s)")
@@ -0,0 +1,95 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Nomes de mês aceitos no campo "Período" (o padrão do formulário usa strftime("%B"), em inglês)
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'abril': 4, 'maio': 5, 'junho': 6, 'julho': 7,
+    'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+    'january': 1, 'february': 2, 'march': 3, 'april': 4, 'may': 5, 'june': 6, 'july': 7,
+    'august': 8, 'september': 9, 'october': 10, 'november': 11, 'december': 12,
+}
+MESES.update({nome[:3]: numero for nome, numero in list(MESES.items())})
+
+METRICA_VISITAS = 'Nº de Visitas'
+METRICA_TICKET = 'Ticket Médio (R$)'
+
+
+# --- PERÍODOS ---
+def interpretar_periodo(texto):
+    """Converte o texto do período em (início, fim), ambos inclusivos.
+
+    Aceita "Junho/2025", "June/2025", "jun-2025", "06/2025", "2025-06" e "2025" (ano inteiro).
+    Devolve (NaT, NaT) quando o texto não é reconhecido.
+    """
+    normalizado = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').strip().lower()
+    mes = ano = None
+    if m := re.fullmatch(r'([a-z]+)\s*[/\-\s]\s*(\d{4})', normalizado):
+        mes, ano = MESES.get(m.group(1)), int(m.group(2))
+    elif m := re.fullmatch(r'(\d{1,2})\s*[/\-]\s*(\d{4})', normalizado):
+        mes, ano = int(m.group(1)), int(m.group(2))
+    elif m := re.fullmatch(r'(\d{4})\s*[/\-]\s*(\d{1,2})', normalizado):
+        ano, mes = int(m.group(1)), int(m.group(2))
+    elif m := re.fullmatch(r'(\d{4})', normalizado):
+        ano = int(m.group(1))
+        return pd.Timestamp(ano, 1, 1), pd.Timestamp(ano, 12, 31)
+    if mes is None or ano is None or not 1 <= mes <= 12:
+        return pd.NaT, pd.NaT
+    inicio = pd.Timestamp(ano, mes, 1)
+    return inicio, inicio + pd.offsets.MonthEnd(0)
+
+
+def interpretar_periodos(periodos):
+    """Versão em coluna: interpreta só os textos distintos e espalha o resultado pelas linhas."""
+    codigos, distintos = pd.factorize(pd.Series(periodos).astype(str))
+    limites = [interpretar_periodo(p) for p in distintos]
+    inicios = pd.DatetimeIndex([i for i, _ in limites] + [pd.NaT])
+    fins = pd.DatetimeIndex([f for _, f in limites] + [pd.NaT])
+    return inicios[codigos], fins[codigos]
+
+
+# --- PROGRESSO ---
+def calcular_progresso(df_metas, celulas):
+    """Progresso de todas as metas de uma vez, a partir das células do cubo (ver cubo.py).
+
+    As células são reduzidas a funcionário x dia com somas acumuladas; cada meta vira duas
+    buscas binárias (início e fim do período) e a diferença das somas acumuladas.
+    """
+    metas = df_metas.reset_index(drop=True).copy()
+    inicios, fins = interpretar_periodos(metas['periodo'])
+    metas['inicio'], metas['fim'] = inicios, fins
+    metas['valor_meta'] = pd.to_numeric(metas['valor_meta'], errors='coerce').fillna(0)
+
+    diario = (
+        celulas.dropna(subset=['dia'])
+        .groupby(['nome_funcionario', 'dia'], as_index=False)[['visitas', 'soma']].sum()
+    )
+    funcionarios = {f: i for i, f in enumerate(diario['nome_funcionario'].unique())}
+    escala = np.int64(1 << 32)  # chave = código do funcionário (bits altos) + dia (bits baixos)
+    dias = diario['dia'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    chaves = diario['nome_funcionario'].map(funcionarios).to_numpy(dtype=np.int64) * escala + dias
+    ordem = np.argsort(chaves, kind='stable')
+    chaves = chaves[ordem]
+    acum_visitas = np.concatenate([[0], np.cumsum(diario['visitas'].to_numpy()[ordem])])
+    acum_soma = np.concatenate([[0], np.cumsum(diario['soma'].to_numpy(dtype=np.float64)[ordem])])
+
+    validas = metas['inicio'].notna().to_numpy() & metas['funcionario'].isin(funcionarios).to_numpy()
+    codigo = metas['funcionario'].map(funcionarios).fillna(0).to_numpy(dtype=np.int64) * escala
+    ini = np.where(validas, metas['inicio'].to_numpy(dtype='datetime64[D]').astype(np.int64), 0)
+    fim = np.where(validas, metas['fim'].to_numpy(dtype='datetime64[D]').astype(np.int64), 0)
+    a = np.searchsorted(chaves, codigo + ini, 'left')
+    b = np.searchsorted(chaves, codigo + fim, 'right')
+    visitas = np.where(validas, acum_visitas[b] - acum_visitas[a], 0)
+    soma = np.where(validas, acum_soma[b] - acum_soma[a], 0.0)
+
+    ticket = np.divide(soma, visitas, out=np.zeros_like(soma), where=visitas > 0)
+    metas['valor_atual'] = np.where(metas['metrica'] == METRICA_TICKET, ticket, visitas.astype(np.float64))
+    metas.loc[metas['inicio'].isna(), 'valor_atual'] = np.nan
+    metas['diferenca'] = metas['valor_atual'] - metas['valor_meta']
+    metas['progresso'] = np.where(
+        metas['valor_meta'] > 0, (metas['valor_atual'] / metas['valor_meta'].where(metas['valor_meta'] > 0)).clip(upper=1.0), 0.0
+    )
+    metas['periodo_valido'] = metas['inicio'].notna()
+    return metas
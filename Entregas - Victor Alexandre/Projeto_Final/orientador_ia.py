@@ -0,0 +1,203 @@
+"""Orientador IA: prompt, cache de respostas e geração em segundo plano.
+
+- A resposta fica num cache persistente (SQLite) com chave = hash do resumo normalizado
+  + nome do modelo, com validade (TTL) e descarte dos menos usados (LRU).
+- A geração roda num executor em segundo plano e vai acumulando o texto recebido por
+  streaming; o dashboard só consulta o andamento, sem travar o script.
+- `ModeloFalso` imita o `GenerativeModel` do Gemini para testar sem rede nem chave.
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from instrumentacao import contar
+
+NOME_ARQUIVO_CACHE_IA = 'cache_respostas_ia.sqlite'
+VALIDADE_CACHE_S = 7 * 24 * 3600
+MAX_RESPOSTAS_CACHE = 500
+
+
+# --- PROMPT ---
+def montar_resumo_dados(periodo, estados, cidades, totais, resumo_cidades, resumo_funcionarios, funcionarios=None):
+    """Resumo dos dados filtrados enviado ao modelo (`totais` e resumos vêm do cubo, ver cubo.py)."""
+    filtro_funcionarios = f", Funcionários={funcionarios}" if funcionarios else ""
+    return (
+        f"Análise de dados de visitas para empresa de energia solar. Período: {periodo[0]} a {periodo[1]}. "
+        f"Filtros: Estados={estados}, Cidades={cidades}{filtro_funcionarios}. Total de visitas: {totais['visitas']}. "
+        f"Fatura média: R$ {totais['media']:.2f}. "
+        f"Top 3 cidades (fatura média): {resumo_cidades['media'].nlargest(3).to_dict()}. "
+        f"Top 3 funcionários (nº visitas): {resumo_funcionarios['visitas'].nlargest(3).to_dict()}"
+    )
+
+
+def montar_prompt(resumo_dados):
+    return (
+        f"Você é um consultor de estratégia para uma empresa de energia solar. Baseado no resumo: {resumo_dados}\n\n"
+        "Escreva uma análise em português (Markdown) com: 1. **Resumo Executivo**. "
+        "2. **Pontos de Destaque** (3 a 5 pontos). 3. **Recomendações Estratégicas** (3 ações claras)."
+    )
+
+
+def nome_do_modelo(modelo):
+    return getattr(modelo, 'model_name', type(modelo).__name__)
+
+
+def chave_resposta(resumo_dados, nome_modelo):
+    """Hash do resumo normalizado (Unicode NFC, espaços colapsados) + nome do modelo."""
+    normalizado = re.sub(r'\s+', ' ', unicodedata.normalize('NFC', str(resumo_dados))).strip()
+    return hashlib.sha256(f"{nome_modelo}\0{normalizado}".encode('utf-8')).hexdigest()
+
+
+# --- CACHE PERSISTENTE ---
+class CacheRespostas:
+    """Respostas já geradas, num arquivo SQLite compartilhado pelas sessões."""
+
+    def __init__(self, caminho=NOME_ARQUIVO_CACHE_IA, validade_s=VALIDADE_CACHE_S, max_itens=MAX_RESPOSTAS_CACHE):
+        self.caminho = caminho
+        self.validade_s = validade_s
+        self.max_itens = max_itens
+        self._trava = threading.Lock()
+        with self._conectar() as conexao:
+            conexao.execute(
+                "CREATE TABLE IF NOT EXISTS respostas (chave TEXT PRIMARY KEY, modelo TEXT, texto TEXT, "
+                "criado_em REAL, usado_em REAL)"
+            )
+
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conexao:  # commit ao sair sem erro
+                yield conexao
+        finally:
+            conexao.close()
+
+    def obter(self, chave):
+        """Texto guardado para a chave, ou None se não existe ou venceu."""
+        agora = time.time()
+        with self._trava, self._conectar() as conexao:
+            linha = conexao.execute("SELECT texto, criado_em FROM respostas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                contar('cache_ia_falha')
+                return None
+            if agora - linha[1] > self.validade_s:
+                conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                contar('cache_ia_falha')
+                return None
+            conexao.execute("UPDATE respostas SET usado_em = ? WHERE chave = ?", (agora, chave))
+            contar('cache_ia_acerto')
+            return linha[0]
+
+    def guardar(self, chave, modelo, texto):
+        agora = time.time()
+        with self._trava, self._conectar() as conexao:
+            conexao.execute("INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?)", (chave, modelo, texto, agora, agora))
+            conexao.execute("DELETE FROM respostas WHERE criado_em < ?", (agora - self.validade_s,))
+            conexao.execute(
+                "DELETE FROM respostas WHERE chave NOT IN (SELECT chave FROM respostas ORDER BY usado_em DESC LIMIT ?)",
+                (self.max_itens,),
+            )
+
+
+# --- MODELO FALSO (TESTES SEM REDE) ---
+class _Parte:
+    def __init__(self, text):
+        self.text = text
+
+
+class ModeloFalso:
+    """Imita `genai.GenerativeModel.generate_content` (com e sem `stream=True`)."""
+
+    def __init__(self, model_name='modelo-falso', atraso_s=0.05, falhas=0):
+        self.model_name = model_name
+        self.atraso_s = atraso_s
+        self.falhas = falhas  # nº de chamadas iniciais que levantam erro (para testar novas tentativas)
+        self.chamadas = 0
+        self._trava = threading.Lock()
+
+    def _texto(self, prompt):
+        assinatura = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return (
+            f"### Resumo Executivo\nAnálise simulada ({assinatura}) para o resumo enviado.\n\n"
+            "### Pontos de Destaque\n- Ponto 1\n- Ponto 2\n- Ponto 3\n\n"
+            "### Recomendações Estratégicas\n1. Ação 1\n2. Ação 2\n3. Ação 3\n"
+        )
+
+    def generate_content(self, prompt, stream=False):
+        with self._trava:
+            self.chamadas += 1
+            falhar = self.chamadas <= self.falhas
+        if falhar:
+            time.sleep(self.atraso_s)
+            raise RuntimeError("Falha simulada do modelo")
+        partes = [_Parte(p) for p in re.split(r'(?<=\n)', self._texto(prompt)) if p]
+        if not stream:
+            time.sleep(self.atraso_s * len(partes))
+            return _Parte(''.join(p.text for p in partes))
+
+        def gerar():
+            for parte in partes:
+                time.sleep(self.atraso_s)
+                yield parte
+        return gerar()
+
+
+# --- GERAÇÃO EM SEGUNDO PLANO ---
+class TarefaAnalise:
+    """Uma geração em andamento: o texto parcial cresce conforme as partes chegam."""
+
+    def __init__(self, chave):
+        self.chave = chave
+        self.partes = []
+        self.concluida = False
+        self.erro = None
+
+    @property
+    def texto(self):
+        return ''.join(self.partes)
+
+
+class GeradorAnalises:
+    """Executor compartilhado: uma tarefa por chave (pedidos iguais simultâneos reaproveitam a mesma)."""
+
+    def __init__(self, cache, max_simultaneas=2):
+        self.cache = cache
+        self._executor = ThreadPoolExecutor(max_workers=max_simultaneas, thread_name_prefix='orientador-ia')
+        self._trava = threading.Lock()
+        self._tarefas = {}
+
+    def iniciar(self, modelo, resumo_dados):
+        """Devolve a tarefa do resumo: já concluída se estava no cache, senão disparada em segundo plano."""
+        chave = chave_resposta(resumo_dados, nome_do_modelo(modelo))
+        with self._trava:
+            tarefa = self._tarefas.get(chave)
+            if tarefa is not None and not tarefa.erro:
+                return tarefa
+            tarefa = TarefaAnalise(chave)
+            guardado = self.cache.obter(chave)
+            if guardado is not None:
+                tarefa.partes.append(guardado)
+                tarefa.concluida = True
+                return tarefa
+            self._tarefas[chave] = tarefa
+        self._executor.submit(self._gerar, modelo, montar_prompt(resumo_dados), tarefa)
+        return tarefa
+
+    def _gerar(self, modelo, prompt, tarefa):
+        try:
+            for parte in modelo.generate_content(prompt, stream=True):
+                tarefa.partes.append(parte.text)
+            self.cache.guardar(tarefa.chave, nome_do_modelo(modelo), tarefa.texto)
+        except Exception as e:
+            tarefa.erro = e
+        finally:
+            tarefa.concluida = True
+            with self._trava:
+                # Concluída com sucesso, passa a ser servida pelo cache
+                if not tarefa.erro and self._tarefas.get(tarefa.chave) is tarefa:
+                    del self._tarefas[tarefa.chave]
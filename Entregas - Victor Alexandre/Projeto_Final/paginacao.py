@@ -0,0 +1,91 @@
+"""Tabelas paginadas: busca, ordenação e navegação sem mandar a tabela inteira ao navegador.
+
+A busca e a ordenação trabalham sobre posições (arrays de inteiros) e a página visível é
+a única parte materializada. `ServicoDados.pagina` e `ArmazemPlanos.pagina_acoes` fazem
+isso direto na fonte de dados; `paginar_frame` faz o mesmo para um frame já em memória.
+`tabela_paginada` desenha os controles no Streamlit e pede à consulta só a página visível.
+"""
+import numpy as np
+import pandas as pd
+
+TAMANHO_PAGINA = 50
+
+
+# --- BUSCA E ORDENAÇÃO ---
+def _eh_texto(serie):
+    return isinstance(serie.dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(serie.dtype) or serie.dtype == object
+
+
+def _contem(serie, texto):
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        # Compara só as categorias (poucas) e espalha pelos códigos; código -1 (nulo) cai no último False
+        categorias = serie.cat.categories.astype(str).str.contains(texto, case=False, regex=False).to_numpy(dtype=bool)
+        return np.append(categorias, False)[serie.cat.codes.to_numpy()]
+    return serie.astype(str).str.contains(texto, case=False, regex=False).fillna(False).to_numpy(dtype=bool)
+
+
+def mascara_busca(df, texto, colunas=None, posicoes=None):
+    """Linhas de `df` (ou só das `posicoes`) em que alguma coluna de texto contém `texto`, sem diferenciar maiúsculas.
+
+    Só as colunas de texto (entre `colunas`, se dadas) são lidas; as demais nem são copiadas.
+    """
+    colunas = [c for c in (colunas or df.columns) if c in df.columns and _eh_texto(df[c])]
+    mascara = np.zeros(len(df) if posicoes is None else len(posicoes), dtype=bool)
+    for coluna in colunas:
+        mascara |= _contem(df[coluna] if posicoes is None else df[coluna].take(posicoes), texto)
+    return mascara
+
+
+def ordem_estavel(serie, decrescente=False):
+    """Posições (0..n-1) que ordenam `serie`, com empates na ordem original e nulos no fim."""
+    return serie.reset_index(drop=True).sort_values(ascending=not decrescente, kind='stable', na_position='last').index.to_numpy()
+
+
+def paginar_frame(df, inicio=0, tamanho=TAMANHO_PAGINA, ordenar_por=None, decrescente=False, busca=None):
+    """Mesma consulta da fonte de dados para um frame em memória: (total, linhas da página)."""
+    if busca:
+        df = df[mascara_busca(df, busca)]
+    if ordenar_por:
+        df = df.take(ordem_estavel(df[ordenar_por], decrescente))
+    return len(df), df.iloc[inicio:inicio + tamanho]
+
+
+# --- COMPONENTE ---
+def tabela_paginada(consultar, colunas, chave, contexto=None, tamanho=TAMANHO_PAGINA, exibir=None):
+    """Desenha busca, ordenação e navegação; só a página visível é pedida a `consultar`.
+
+    `consultar(inicio, tamanho, ordenar_por, decrescente, busca)` devolve (total, linhas da página).
+    `contexto` (ex.: os filtros da barra lateral) volta a tabela à primeira página quando muda.
+    `exibir(linhas)` desenha a página (padrão: `st.dataframe`); o que ele devolver é devolvido.
+    """
+    import streamlit as st
+
+    # persist_state: o valor sobrevive enquanto a tabela não é desenhada (ex.: aba fechada, ver abas.py)
+    col_busca, col_ordem, col_sentido = st.columns([3, 2, 1])
+    busca = col_busca.text_input("Buscar", key=f"{chave}_busca", placeholder="Texto em qualquer coluna", persist_state="page").strip()
+    ordenar_por = col_ordem.selectbox(
+        "Ordenar por", options=[None] + list(colunas), key=f"{chave}_ordem",
+        format_func=lambda c: "(ordem padrão)" if c is None else c, persist_state="page",
+    )
+    decrescente = col_sentido.toggle("Decrescente", key=f"{chave}_decrescente", disabled=ordenar_por is None, persist_state="page")
+
+    chave_pagina = f"{chave}_pagina"
+    assinatura = repr((contexto, busca, ordenar_por, decrescente))
+    if st.session_state.get(f"{chave}_assinatura") != assinatura:
+        st.session_state[f"{chave}_assinatura"] = assinatura
+        st.session_state[chave_pagina] = 1
+    pagina = int(st.session_state.get(chave_pagina, 1))
+
+    total, linhas = consultar((pagina - 1) * tamanho, tamanho, ordenar_por, decrescente, busca or None)
+    ultima = max(1, -(-total // tamanho))
+    if pagina > ultima:
+        # A consulta encolheu (ex.: outro filtro); volta para a última página que existe
+        pagina = st.session_state[chave_pagina] = ultima
+        total, linhas = consultar((pagina - 1) * tamanho, tamanho, ordenar_por, decrescente, busca or None)
+
+    resultado = exibir(linhas) if exibir else st.dataframe(linhas, use_container_width=True, hide_index=True)
+    col_pagina, col_info = st.columns([1, 3])
+    col_pagina.number_input("Página", min_value=1, max_value=ultima, step=1, key=chave_pagina, persist_state="page")
+    primeira_linha = (pagina - 1) * tamanho + 1 if total else 0
+    col_info.caption(f"Linhas {primeira_linha:,}–{min(pagina * tamanho, total):,} de {total:,}".replace(",", "."))
+    return resultado
@@ -0,0 +1,67 @@
+"""Codificação dos perfis de cliente como bits de um inteiro (multi-hot).
+
+Cada perfil de PERFIS_CLIENTE ocupa um bit de `perfil_flags`. O filtro por perfil vira
+`flags & mascara != 0` e a comparação é exata (sem casar pedaços de outros nomes).
+
+Uso pela linha de comando (migração dos dados já gravados):
+    python perfis.py migrar
+"""
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+PERFIS_CLIENTE = ["Residencial", "Comercial", "Industrial", "Agronegócio", "Condomínio"]
+
+
+def _normalizar(nome):
+    """Compara nomes sem acento e sem diferença de maiúsculas ("Condominio" == "Condomínio")."""
+    sem_acento = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return sem_acento.strip().lower()
+
+
+BIT_PERFIL = {_normalizar(p): 1 << i for i, p in enumerate(PERFIS_CLIENTE)}
+
+
+# --- CODIFICAÇÃO ---
+def codificar_perfis(perfis):
+    """Lista de perfis (ou string separada por vírgulas) -> inteiro com um bit por perfil."""
+    if isinstance(perfis, str):
+        perfis = perfis.split(',')
+    flags = 0
+    for p in perfis:
+        flags |= BIT_PERFIL.get(_normalizar(p), 0)
+    return flags
+
+
+def codificar_serie(serie):
+    """Codifica uma coluna `perfil_cliente` inteira; o split só roda nas combinações distintas."""
+    codigos, combinacoes = pd.factorize(serie)
+    flags_combinacoes = np.array([codificar_perfis(c) for c in combinacoes] + [0], dtype=np.uint8)
+    return flags_combinacoes[codigos]  # código -1 (nulo) cai no último item, sem perfil
+
+
+def decodificar_perfis(flags):
+    """Inteiro -> lista de perfis, na ordem de PERFIS_CLIENTE."""
+    return [p for i, p in enumerate(PERFIS_CLIENTE) if int(flags) & (1 << i)]
+
+
+def perfis_presentes(flags):
+    """Perfis que aparecem em pelo menos uma linha."""
+    presentes = int(np.bitwise_or.reduce(np.asarray(flags, dtype=np.uint8))) if len(flags) else 0
+    return decodificar_perfis(presentes)
+
+
+if __name__ == '__main__':
+    import argparse
+    from armazenamento import NOME_ARQUIVO_DADOS, DIRETORIO_COLUNAR, armazenamento_colunar_ativo, migrar_csv
+
+    parser = argparse.ArgumentParser(description="Migra os dados gravados para incluir a coluna perfil_flags.")
+    parser.add_argument('comando', choices=['migrar'])
+    args = parser.parse_args()
+
+    if armazenamento_colunar_ativo():
+        from armazenamento_colunar import migrar_segmentos
+        print(f"{migrar_segmentos(DIRETORIO_COLUNAR)} segmentos migrados em '{DIRETORIO_COLUNAR}'.")
+    else:
+        print(f"{migrar_csv(NOME_ARQUIVO_DADOS)} visitas migradas em '{NOME_ARQUIVO_DADOS}'.")
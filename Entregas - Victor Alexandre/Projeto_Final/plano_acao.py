@@ -0,0 +1,159 @@
+"""Plano de ação: análises da IA guardadas uma vez só e ações que apontam para elas.
+
+- `analises`: texto de cada análise, com id = hash do conteúdo (a mesma análise usada
+  em várias ações é gravada uma única vez);
+- `acoes`: uma linha por ação com `id_analise`, sem repetir o texto; a mudança de status
+  é um UPDATE na linha da ação.
+
+Na primeira vez que o arquivo é criado, as ações do CSV antigo (`planos_de_acao.csv`,
+com o texto completo em `recomendacao_ia`) são importadas.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import unicodedata
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+NOME_ARQUIVO_PLANOS = 'planos_de_acao.sqlite'
+NOME_ARQUIVO_ACOES_CSV = 'planos_de_acao.csv'
+STATUS_ACAO = ["A Fazer", "Em Andamento", "Concluído"]
+COLUNAS_ACOES = ['id_acao', 'id_analise', 'acao_especifica', 'responsavel', 'prazo', 'status', 'data_criacao']
+
+
+def id_da_analise(texto):
+    """Id pelo conteúdo: hash do texto normalizado (quebras de linha e espaços nas pontas)."""
+    normalizado = unicodedata.normalize('NFC', str(texto)).replace('\r\n', '\n').strip()
+    normalizado = re.sub(r'[ \t]+\n', '\n', normalizado)
+    return hashlib.sha256(normalizado.encode('utf-8')).hexdigest()[:16]
+
+
+def novo_id_acao(momento=None):
+    """Id único mesmo com várias ações no mesmo segundo (o sufixo aleatório evita colisões)."""
+    momento = momento or datetime.now()
+    return f"ACAO-{int(momento.timestamp())}-{uuid.uuid4().hex[:8]}"
+
+
+class ArmazemPlanos:
+    def __init__(self, caminho=NOME_ARQUIVO_PLANOS, csv_legado=NOME_ARQUIVO_ACOES_CSV):
+        self.caminho = caminho
+        novo = not os.path.exists(caminho)
+        with self._conectar() as conexao:
+            conexao.executescript(
+                "CREATE TABLE IF NOT EXISTS analises (id_analise TEXT PRIMARY KEY, texto TEXT NOT NULL, criado_em TEXT);"
+                "CREATE TABLE IF NOT EXISTS acoes (id_acao TEXT PRIMARY KEY, id_analise TEXT REFERENCES analises, "
+                "acao_especifica TEXT, responsavel TEXT, prazo TEXT, status TEXT, data_criacao TEXT);"
+                "CREATE INDEX IF NOT EXISTS acoes_por_analise ON acoes (id_analise);"
+                "CREATE INDEX IF NOT EXISTS acoes_por_data ON acoes (data_criacao);"
+            )
+        if novo and csv_legado and os.path.exists(csv_legado):
+            self.importar_csv(csv_legado)
+
+    @contextmanager
+    def _conectar(self):
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        try:
+            with conexao:  # uma transação por operação
+                yield conexao
+        finally:
+            conexao.close()
+
+    @staticmethod
+    def _gravar_analise(conexao, texto):
+        id_analise = id_da_analise(texto)
+        conexao.execute(
+            "INSERT OR IGNORE INTO analises VALUES (?, ?, ?)", (id_analise, texto, datetime.now().isoformat(sep=' '))
+        )
+        return id_analise
+
+    # --- ESCRITA ---
+    def criar_acao(self, texto_analise, acao_especifica, responsavel, prazo, status=STATUS_ACAO[0]):
+        """Grava a ação (e a análise, se ainda não existe). Devolve o `id_acao`."""
+        agora = datetime.now()
+        id_acao = novo_id_acao(agora)
+        with self._conectar() as conexao:
+            id_analise = self._gravar_analise(conexao, texto_analise)
+            conexao.execute(
+                "INSERT INTO acoes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (id_acao, id_analise, acao_especifica, responsavel, str(pd.Timestamp(prazo).date()), status, agora.isoformat(sep=' ')),
+            )
+        return id_acao
+
+    def atualizar_status(self, alteracoes):
+        """Muda o status das ações: `alteracoes` mapeia id_acao -> novo status. Devolve quantas mudaram."""
+        with self._conectar() as conexao:
+            cursor = conexao.executemany(
+                "UPDATE acoes SET status = ? WHERE id_acao = ?", [(status, id_acao) for id_acao, status in alteracoes.items()]
+            )
+            return cursor.rowcount
+
+    def importar_csv(self, caminho):
+        """Importa o CSV antigo, gravando cada texto de `recomendacao_ia` uma vez só."""
+        try:
+            legado = pd.read_csv(caminho, encoding='utf-8', dtype=str)
+        except UnicodeDecodeError:
+            legado = pd.read_csv(caminho, encoding='latin1', dtype=str)
+        except pd.errors.EmptyDataError:
+            return 0
+        with self._conectar() as conexao:
+            for linha in legado.fillna('').itertuples(index=False):
+                id_analise = self._gravar_analise(conexao, linha.recomendacao_ia)
+                conexao.execute(
+                    "INSERT OR IGNORE INTO acoes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (linha.id_acao, id_analise, linha.acao_especifica, linha.responsavel, linha.prazo, linha.status, linha.data_criacao),
+                )
+        return len(legado)
+
+    # --- LEITURA ---
+    @staticmethod
+    def _converter_datas(acoes):
+        acoes['prazo'] = pd.to_datetime(acoes['prazo'], errors='coerce')
+        acoes['data_criacao'] = pd.to_datetime(acoes['data_criacao'], errors='coerce', format='ISO8601')
+        return acoes
+
+    def listar_acoes(self):
+        """Tabela de ações, sem os textos das análises (só o `id_analise`)."""
+        with self._conectar() as conexao:
+            acoes = pd.read_sql_query(f"SELECT {', '.join(COLUNAS_ACOES)} FROM acoes ORDER BY data_criacao", conexao)
+        return self._converter_datas(acoes)
+
+    def opcoes_filtro(self):
+        """Responsáveis e status que aparecem nas ações (opções dos filtros da aba)."""
+        with self._conectar() as conexao:
+            responsaveis = [r for (r,) in conexao.execute("SELECT DISTINCT responsavel FROM acoes ORDER BY responsavel")]
+            status = [s for (s,) in conexao.execute("SELECT DISTINCT status FROM acoes ORDER BY status")]
+        return responsaveis, status
+
+    def pagina_acoes(self, responsaveis=None, status=None, inicio=0, tamanho=50, ordenar_por=None, decrescente=False, busca=None):
+        """Uma página das ações: (total, linhas de `inicio` a `inicio + tamanho`).
+
+        Filtros, busca (LIKE em todas as colunas) e ordenação rodam no SQLite; só a página é lida.
+        """
+        condicoes, parametros = [], []
+        for coluna, valores in (('responsavel', responsaveis), ('status', status)):
+            if valores:
+                condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})")
+                parametros.extend(valores)
+        if busca:
+            padrao = '%' + re.sub(r'([\\%_])', r'\\\1', busca) + '%'
+            condicoes.append('(' + ' OR '.join(f"{c} LIKE ? ESCAPE '\\'" for c in COLUNAS_ACOES) + ')')
+            parametros.extend([padrao] * len(COLUNAS_ACOES))
+        onde = f" WHERE {' AND '.join(condicoes)}" if condicoes else ""
+        ordem = ordenar_por if ordenar_por in COLUNAS_ACOES else 'data_criacao'
+        with self._conectar() as conexao:
+            total = conexao.execute(f"SELECT COUNT(*) FROM acoes{onde}", parametros).fetchone()[0]
+            acoes = pd.read_sql_query(
+                f"SELECT {', '.join(COLUNAS_ACOES)} FROM acoes{onde} "
+                f"ORDER BY {ordem} {'DESC' if decrescente else 'ASC'}, rowid LIMIT ? OFFSET ?",
+                conexao, params=parametros + [tamanho, inicio],
+            )
+        return total, self._converter_datas(acoes)
+
+    def obter_analise(self, id_analise):
+        with self._conectar() as conexao:
+            linha = conexao.execute("SELECT texto FROM analises WHERE id_analise = ?", (id_analise,)).fetchone()
+        return linha[0] if linha else None
@@ -0,0 +1,515 @@
+"""Serviço de dados das visitas: um dono só para a tabela preparada, os índices e o cubo.
+
+`ServicoDados` guarda o frame do `CacheVisitas`, o índice dos filtros, o cubo, o índice
+espacial e o índice por fatura, e responde às consultas dos apps (filtrar, agregar,
+acrescentar). Pode rodar dentro do próprio processo do Streamlit (padrão) ou como um
+processo separado, compartilhado por todos os apps e sessões:
+
+    python servico_dados.py --endereco 127.0.0.1:8765
+
+Com a variável de ambiente `SERVICO_DADOS=127.0.0.1:8765`, os apps usam o `ClienteDados`,
+que faz as mesmas chamadas por socket local. A conexão exige uma chave secreta:
+`SERVICO_DADOS_CHAVE`, ou a gerada pelo serviço no arquivo `.servico_dados.chave` (só o
+dono lê), ao lado dos dados. Só os métodos de `METODOS_REMOTOS` são atendidos. As linhas (`linhas()`) não trafegam pelo
+socket: o serviço grava a tabela num arquivo Arrow (formato de fluxo), que o cliente mapeia
+em memória (mmap) e de onde tira só as linhas pedidas, sem copiar a tabela para cada
+processo. Visitas novas são acrescentadas ao fim do arquivo como lotes; a tabela inteira
+só é regravada quando os dados são relidos do zero ou os lotes acumulados passam de
+`MAX_LOTES_ARROW`. Os arquivos ficam em `.tabelas_servico/`, ao lado dos dados.
+"""
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import NOME_ARQUIVO_DADOS, registrar_visita
+from camada_dados import CacheVisitas
+from cubo import CuboVisitas, filtrar_celulas
+from foco import IndiceValorIncremental
+from geo import IndiceGeoIncremental
+from indice_filtros import IndiceFiltros
+from instrumentacao import contar
+from metas import calcular_progresso
+from paginacao import mascara_busca, ordem_estavel
+
+ENDERECO_PADRAO = '127.0.0.1:8765'
+MAX_CONSULTAS_MEMORIZADAS = 32
+NOME_ARQUIVO_CHAVE = '.servico_dados.chave'
+NOME_DIRETORIO_TABELAS = '.tabelas_servico'
+MAX_LOTES_ARROW = 256            # lotes acrescentados antes de regravar a tabela inteira num arquivo novo
+PRAZO_REMOCAO_TABELA_S = 120.0   # um arquivo substituído fica esse tempo no disco para clientes que já o receberam
+# Únicos métodos que um cliente pode chamar (as mensagens são objetos pickle: nada além disso é despachado)
+METODOS_REMOTOS = frozenset({
+    'atualizar', 'versao', 'opcoes', 'posicoes', 'contar', 'linhas', 'pagina', 'celulas', 'progresso_metas',
+    'mapa', 'linhas_da_celula', 'centro', 'oportunidades_proximas', 'maiores', 'maiores_por_segmento',
+    'anexar', 'tabela_compartilhada',
+})
+
+
+def _caminho_chave(caminho_csv):
+    return os.path.join(os.path.dirname(os.path.abspath(caminho_csv)), NOME_ARQUIVO_CHAVE)
+
+
+def _chave_autenticacao(caminho_csv, criar=False):
+    """Chave da conexão: `SERVICO_DADOS_CHAVE` ou o arquivo de chave ao lado dos dados.
+
+    Com `criar` (o serviço), gera uma chave aleatória no arquivo, legível só pelo dono, se
+    ainda não existir. Sem chave, o cliente não conecta: sem ela, qualquer usuário da máquina
+    poderia mandar mensagens ao serviço.
+    """
+    chave = os.environ.get('SERVICO_DADOS_CHAVE')
+    if chave:
+        return chave.encode('utf-8')
+    caminho = _caminho_chave(caminho_csv)
+    if criar and not os.path.exists(caminho):
+        try:
+            descritor = os.open(caminho, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass  # outro processo acabou de criar
+        else:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as arquivo:
+                arquivo.write(secrets.token_hex(32))
+    try:
+        with open(caminho, encoding='utf-8') as arquivo:
+            chave = arquivo.read().strip()
+    except FileNotFoundError:
+        chave = ''
+    if not chave:
+        raise RuntimeError(
+            f"Sem chave do serviço de dados: defina SERVICO_DADOS_CHAVE ou inicie o serviço (que grava {caminho})."
+        )
+    return chave.encode('utf-8')
+
+
+def _endereco(texto):
+    host, porta = texto.rsplit(':', 1)
+    return host, int(porta)
+
+
+def _chave_filtros(filtros):
+    return repr(sorted((filtros or {}).items()))
+
+
+def _linhas_de_frame(df, posicoes, colunas):
+    linhas = df.take(posicoes)
+    return linhas if colunas is None else linhas[[c for c in colunas if c in linhas.columns]]
+
+
+class _Estado:
+    """Tudo o que uma consulta usa, de uma mesma versão (substituído inteiro a cada atualização)."""
+
+    def __init__(self, df, versao, indice_filtros, celulas, indice_geo, indice_valor):
+        self.df = df
+        self.versao = versao
+        self.indice_filtros = indice_filtros
+        self.celulas = celulas
+        self.indice_geo = indice_geo
+        self.indice_valor = indice_valor
+
+
+class _TabelaArrow:
+    """Arquivo Arrow (formato de fluxo) de uma geração dos dados, aberto para acrescentar lotes."""
+
+    def __init__(self, diretorio, df, geracao):
+        import pyarrow as pa
+        self.caminho = os.path.join(diretorio, f"visitas-{os.getpid()}-{secrets.token_hex(8)}.arrows")
+        self.geracao = geracao
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        self.schema = tabela.schema
+        self._arquivo = pa.OSFile(self.caminho, 'wb')
+        self._escritor = pa.ipc.new_stream(self._arquivo, self.schema)
+        self.linhas, self.lotes = 0, 0
+        self._gravar(tabela)
+
+    def _gravar(self, tabela):
+        self._escritor.write_table(tabela)
+        self._arquivo.flush()  # os clientes só leem até `linhas`, que já estão no arquivo
+        self.linhas += tabela.num_rows
+        self.lotes += 1
+
+    def acrescentar(self, novas):
+        """Acrescenta as linhas novas; False se os tipos não cabem no esquema (aí a tabela é regravada)."""
+        import pyarrow as pa
+        try:
+            tabela = pa.Table.from_pandas(novas, schema=self.schema, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, ValueError, TypeError):
+            return False
+        self._gravar(tabela)
+        return True
+
+    def fechar(self):
+        self._escritor.close()
+        self._arquivo.close()
+
+
+class ServicoDados:
+    """Tabela de visitas, índices e cubo de um processo, compartilhados por todas as sessões."""
+
+    def __init__(self, colunas=None, caminho_csv=NOME_ARQUIVO_DADOS):
+        self.caminho_csv = caminho_csv
+        self._cache = CacheVisitas(colunas, caminho_csv=caminho_csv)
+        self._caches_extras = {}
+        self._cubo = CuboVisitas()
+        self._geo = IndiceGeoIncremental()
+        self._valor = IndiceValorIncremental()
+        self._trava = threading.Lock()
+        self._estado = None
+        self._posicoes_recentes = OrderedDict()
+        self._ordens_recentes = OrderedDict()
+        self._tabela_arrow = None      # `_TabelaArrow` atual
+        self._tabelas_antigas = []     # (momento da troca, caminho) ainda no prazo de remoção
+
+    # --- Atualização ---
+    def atualizar(self):
+        """Incorpora as visitas novas do arquivo e devolve a versão dos dados."""
+        df, versao = self._cache.obter()
+        with self._trava:
+            if self._estado is None or self._estado.versao != versao:
+                self._estado = _Estado(
+                    df, versao, IndiceFiltros(df),
+                    self._cubo.atualizar(df, versao), self._geo.atualizar(df, versao), self._valor.atualizar(df, versao),
+                )
+            return self._estado.versao
+
+    def _atual(self):
+        if self._estado is None:
+            self.atualizar()
+        return self._estado
+
+    def versao(self):
+        return self._atual().versao
+
+    # --- Filtros ---
+    def opcoes(self):
+        """Opções da barra lateral: estados, cidades por estado, funcionários, perfis e datas."""
+        estado = self._atual()
+        indice = estado.indice_filtros
+        return {
+            'linhas': len(estado.df), 'estados': indice.estados, 'cidades_por_estado': indice.cidades_por_estado,
+            'funcionarios': indice.funcionarios, 'perfis': indice.perfis,
+            'data_min': indice.data_min, 'data_max': indice.data_max,
+        }
+
+    def _memorizar(self, recentes, chave, calcular):
+        """Resultado de `calcular()` guardado pela `chave` (que inclui a versão), descartando os mais antigos."""
+        with self._trava:
+            if chave in recentes:
+                recentes.move_to_end(chave)
+                contar('consultas_memorizadas_acerto')
+                return recentes[chave]
+        contar('consultas_memorizadas_falha')
+        resultado = calcular()
+        with self._trava:
+            recentes[chave] = resultado
+            while len(recentes) > MAX_CONSULTAS_MEMORIZADAS:
+                recentes.popitem(last=False)
+        return resultado
+
+    def _posicoes(self, estado, filtros):
+        return self._memorizar(
+            self._posicoes_recentes, (estado.versao, _chave_filtros(filtros)),
+            lambda: estado.indice_filtros.posicoes(**filtros) if filtros else np.arange(len(estado.df)),
+        )
+
+    def posicoes(self, filtros=None):
+        """Posições (em ordem de data) das visitas que passam nos filtros (ver `IndiceFiltros.posicoes`)."""
+        return self._posicoes(self._atual(), filtros)
+
+    def contar(self, filtros=None):
+        """Nº de visitas que passam nos filtros (sem materializar as linhas)."""
+        return len(self.posicoes(filtros))
+
+    def linhas(self, filtros=None, colunas=None, posicoes=None):
+        """Visitas filtradas (ou nas `posicoes` dadas); o índice do frame são as posições."""
+        estado = self._atual()
+        posicoes = self._posicoes(estado, filtros) if posicoes is None else np.asarray(posicoes, dtype=np.int64)
+        return self._linhas(estado, posicoes, colunas)
+
+    def _linhas(self, estado, posicoes, colunas):
+        faltando = [c for c in (colunas or []) if c not in estado.df.columns]
+        linhas = _linhas_de_frame(estado.df, posicoes, colunas)
+        contar('linhas_materializadas', len(linhas))
+        if faltando:
+            extras = self._extras(faltando)
+            linhas = linhas.join(extras.reindex(linhas.index))[[c for c in colunas if c in linhas.columns or c in extras.columns]]
+        return linhas
+
+    def _extras(self, colunas):
+        """Colunas fora do conjunto carregado (ex.: texto livre), de um cache à parte; índice = posição."""
+        chave = tuple(colunas)
+        if chave not in self._caches_extras:
+            self._caches_extras[chave] = CacheVisitas(colunas, preparar=False, caminho_csv=self.caminho_csv)
+        return self._caches_extras[chave].obter()[0]
+
+    # --- Páginas ---
+    def _ordem(self, estado, filtros, geohash, ordenar_por, decrescente, busca, colunas_busca):
+        def calcular():
+            posicoes = self._posicoes(estado, filtros)
+            if geohash is not None:
+                posicoes = estado.indice_geo.linhas_da_celula(geohash, posicoes)
+            if busca:
+                mascara = mascara_busca(estado.df, busca, colunas_busca, posicoes)
+                faltando = [c for c in (colunas_busca or []) if c not in estado.df.columns]
+                if faltando:
+                    mascara |= mascara_busca(self._extras(faltando).reindex(posicoes), busca, faltando)
+                posicoes = posicoes[mascara]
+            if ordenar_por in estado.df.columns:
+                posicoes = posicoes[ordem_estavel(estado.df[ordenar_por].take(posicoes), decrescente)]
+            return posicoes
+        if geohash is None and not busca and ordenar_por is None:
+            return self._posicoes(estado, filtros)
+        chave = (estado.versao, _chave_filtros(filtros), geohash, ordenar_por, decrescente, busca, tuple(colunas_busca or ()))
+        return self._memorizar(self._ordens_recentes, chave, calcular)
+
+    def pagina(self, filtros=None, colunas=None, inicio=0, tamanho=50, ordenar_por=None, decrescente=False, busca=None, geohash=None):
+        """Uma página do recorte: (total, linhas de `inicio` a `inicio + tamanho`).
+
+        Busca (texto em qualquer coluna de texto pedida) e ordenação são resolvidas sobre as posições e
+        memorizadas por versão; só as linhas da página são materializadas. `geohash` restringe o
+        recorte a uma célula do mapa.
+        """
+        estado = self._atual()
+        posicoes = self._ordem(estado, filtros, geohash, ordenar_por, decrescente, busca, colunas)
+        return len(posicoes), self._linhas(estado, posicoes[inicio:inicio + tamanho], colunas)
+
+    # --- Agregados ---
+    def celulas(self, filtros=None):
+        """Células do cubo (ver cubo.py), já filtradas."""
+        celulas = self._atual().celulas
+        return filtrar_celulas(celulas, **filtros) if filtros else celulas
+
+    def progresso_metas(self, df_metas):
+        return calcular_progresso(df_metas, self._atual().celulas)
+
+    # --- Mapa e proximidade ---
+    def mapa(self, filtros, max_marcadores, colunas):
+        """Visitas com coordenadas: as linhas, se couberem em `max_marcadores`, senão a grade de geohash."""
+        estado = self._atual()
+        geo = estado.indice_geo
+        posicoes = geo.com_coordenadas(self._posicoes(estado, filtros))
+        if len(posicoes) <= max_marcadores:
+            return {'total': len(posicoes), 'pontos': _linhas_de_frame(estado.df, posicoes, colunas), 'celulas': None, 'precisao': None}
+        precisao = geo.escolher_precisao(posicoes, max_marcadores)
+        return {'total': len(posicoes), 'pontos': None, 'celulas': geo.agregar(posicoes, precisao), 'precisao': precisao}
+
+    def linhas_da_celula(self, filtros, geohash, colunas=None):
+        estado = self._atual()
+        posicoes = estado.indice_geo.linhas_da_celula(geohash, self._posicoes(estado, filtros))
+        return _linhas_de_frame(estado.df, posicoes, colunas)
+
+    def centro(self, filtros):
+        """Centro (média das coordenadas) das visitas filtradas, ou None se nenhuma tem coordenada."""
+        estado = self._atual()
+        posicoes = estado.indice_geo.com_coordenadas(self._posicoes(estado, filtros))
+        if not len(posicoes):
+            return None
+        return float(estado.indice_geo.lat[posicoes].mean()), float(estado.indice_geo.lon[posicoes].mean())
+
+    def oportunidades_proximas(self, filtros, lat, lon, raio_km, pesos_perfil=None, valor_minimo=0, n=None):
+        """Visitas no raio por potencial (ver `IndiceGeo.oportunidades_proximas`), com `distancia_km`."""
+        estado = self._atual()
+        oportunidades = estado.indice_geo.oportunidades_proximas(
+            lat, lon, raio_km, self._posicoes(estado, filtros), pesos_perfil, valor_minimo, n
+        )
+        return estado.df.take(oportunidades['posicao']).assign(distancia_km=oportunidades['distancia_km'].to_numpy())
+
+    # --- Foco semanal ---
+    def maiores(self, filtros, n, valor_minimo=0):
+        """As `n` visitas de maior fatura do recorte (ver `IndiceValor.maiores`)."""
+        estado = self._atual()
+        return estado.df.take(estado.indice_valor.maiores(n, self._posicoes(estado, filtros), valor_minimo))
+
+    def maiores_por_segmento(self, filtros, n, coluna, valor_minimo=0):
+        """Top `n` de cada valor de `coluna`, com a coluna `segmento` (ver `IndiceValor.maiores_por_segmento`)."""
+        estado = self._atual()
+        posicoes, segmentos = estado.indice_valor.maiores_por_segmento(
+            n, estado.df[coluna].to_numpy(dtype=object), self._posicoes(estado, filtros), valor_minimo
+        )
+        return estado.df.take(posicoes).assign(segmento=segmentos)
+
+    # --- Escrita ---
+    def anexar(self, registro):
+        """Grava uma visita nova (ver `registrar_visita`) e já a incorpora aos índices."""
+        registrar_visita(registro, self.caminho_csv)
+        return self.atualizar()
+
+    # --- Tabela compartilhada (modo serviço) ---
+    def _diretorio_tabelas(self):
+        diretorio = os.path.join(os.path.dirname(os.path.abspath(self.caminho_csv)), NOME_DIRETORIO_TABELAS)
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+        os.chmod(diretorio, 0o700)  # `mode` não vale se o diretório já existia
+        return diretorio
+
+    def tabela_compartilhada(self, filtros=None, com_posicoes=True):
+        """Atualiza o arquivo Arrow que os clientes mapeiam e devolve (caminho, nº de linhas, posições dos filtros).
+
+        Dentro de uma geração dos dados o frame só cresce no fim (ver `CacheVisitas`), então
+        só as linhas novas são gravadas, como um lote a mais. As posições são da mesma versão
+        e ficam abaixo do nº de linhas; sem `com_posicoes`, vêm None.
+        """
+        self._atual()
+        with self._trava:
+            estado, tabela = self._estado, self._tabela_arrow
+            geracao = estado.versao[0]
+            if tabela is None or tabela.geracao != geracao or tabela.lotes >= MAX_LOTES_ARROW:
+                self._trocar_tabela(estado.df, geracao)
+            elif len(estado.df) > tabela.linhas and not tabela.acrescentar(estado.df.iloc[tabela.linhas:]):
+                self._trocar_tabela(estado.df, geracao)
+            caminho, linhas = self._tabela_arrow.caminho, self._tabela_arrow.linhas
+        return caminho, linhas, self._posicoes(estado, filtros) if com_posicoes else None
+
+    def _trocar_tabela(self, df, geracao):
+        """Regrava a tabela inteira num arquivo novo; o anterior só é apagado depois do prazo."""
+        anterior = self._tabela_arrow
+        self._tabela_arrow = _TabelaArrow(self._diretorio_tabelas(), df, geracao)
+        agora = time.monotonic()
+        if anterior is not None:
+            anterior.fechar()
+            self._tabelas_antigas.append((agora, anterior.caminho))
+        while self._tabelas_antigas and agora - self._tabelas_antigas[0][0] >= PRAZO_REMOCAO_TABELA_S:
+            try:
+                os.remove(self._tabelas_antigas.pop(0)[1])  # clientes que já mapearam o arquivo continuam lendo
+            except OSError:
+                pass
+
+    def _limpar_tabelas_orfas(self):
+        """Apaga arquivos de tabela deixados por serviços que já terminaram (o pid está no nome)."""
+        diretorio = self._diretorio_tabelas()
+        for nome in os.listdir(diretorio):
+            try:
+                pid = int(nome.split('-')[1])
+                os.kill(pid, 0)
+            except (IndexError, ValueError):
+                continue
+            except ProcessLookupError:
+                try:
+                    os.remove(os.path.join(diretorio, nome))
+                except OSError:
+                    pass
+            except PermissionError:
+                continue
+
+    # --- Servidor ---
+    def servir(self, endereco=ENDERECO_PADRAO):
+        """Atende clientes (`ClienteDados`) no endereço local até o processo ser interrompido."""
+        chave = _chave_autenticacao(self.caminho_csv, criar=True)
+        self._limpar_tabelas_orfas()
+        with Listener(_endereco(endereco), authkey=chave) as ouvinte:
+            print(f"Serviço de dados ouvindo em {endereco}")
+            while True:
+                conexao = ouvinte.accept()
+                threading.Thread(target=self._atender, args=(conexao,), daemon=True).start()
+
+    def _atender(self, conexao):
+        with conexao:
+            while True:
+                try:
+                    metodo, args, kwargs = conexao.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    if metodo not in METODOS_REMOTOS:
+                        raise AttributeError(metodo)
+                    conexao.send((True, getattr(self, metodo)(*args, **kwargs)))
+                except Exception as e:
+                    conexao.send((False, e))
+
+
+class ClienteDados:
+    """Mesmas chamadas do `ServicoDados`, atendidas pelo processo do serviço."""
+
+    def __init__(self, endereco=ENDERECO_PADRAO, caminho_csv=NOME_ARQUIVO_DADOS):
+        self.endereco = endereco
+        self._chave = _chave_autenticacao(caminho_csv)  # falha já aqui, e não na primeira consulta
+        self._trava = threading.Lock()
+        self._conexao = None
+        self._tabelas = OrderedDict()  # caminho -> tabela Arrow mapeada (as linhas lidas até agora)
+
+    def _chamar(self, metodo, *args, **kwargs):
+        contar('chamadas_servico')
+        with self._trava:
+            for tentativa in range(2):
+                try:
+                    if self._conexao is None:
+                        self._conexao = Client(_endereco(self.endereco), authkey=self._chave)
+                    self._conexao.send((metodo, args, kwargs))
+                    ok, resultado = self._conexao.recv()
+                    break
+                except (EOFError, OSError):
+                    # Serviço reiniciado: reconecta uma vez
+                    self._conexao = None
+                    if tentativa:
+                        raise
+        if not ok:
+            raise resultado
+        return resultado
+
+    def __getattr__(self, metodo):
+        if metodo not in METODOS_REMOTOS:
+            raise AttributeError(metodo)
+        return lambda *args, **kwargs: self._chamar(metodo, *args, **kwargs)
+
+    def _mapear(self, caminho, linhas):
+        """Tabela com ao menos `linhas` linhas, lidas do arquivo mapeado (sem copiar os dados)."""
+        import pyarrow as pa
+        tabela = self._tabelas.get(caminho)
+        if tabela is None or tabela.num_rows < linhas:
+            # O serviço pode estar acrescentando um lote no fim: lê só os lotes das linhas já confirmadas
+            leitor = pa.ipc.open_stream(pa.memory_map(caminho, 'r'))
+            lotes, total = [], 0
+            while total < linhas:
+                lote = leitor.read_next_batch()
+                lotes.append(lote)
+                total += lote.num_rows
+            tabela = self._tabelas[caminho] = pa.Table.from_batches(lotes, schema=leitor.schema)
+        self._tabelas.move_to_end(caminho)
+        while len(self._tabelas) > 2:
+            self._tabelas.popitem(last=False)
+        return tabela
+
+    def linhas(self, filtros=None, colunas=None, posicoes=None):
+        """Só as linhas pedidas saem da tabela mapeada; o resto nunca é copiado para este processo."""
+        for tentativa in range(2):
+            caminho, total, posicoes_filtro = self._chamar('tabela_compartilhada', filtros, com_posicoes=posicoes is None)
+            try:
+                tabela = self._mapear(caminho, total)
+                break
+            except FileNotFoundError:
+                # Arquivo substituído e já apagado (cliente parado por mais que o prazo): pede o atual
+                if tentativa:
+                    raise
+        posicoes = posicoes_filtro if posicoes is None else np.asarray(posicoes, dtype=np.int64)
+        faltando = [c for c in (colunas or []) if c not in tabela.column_names]
+        if colunas is not None:
+            tabela = tabela.select([c for c in colunas if c in tabela.column_names])
+        linhas = tabela.take(posicoes).to_pandas()
+        linhas.index = pd.Index(posicoes)
+        if faltando:
+            # Colunas fora da tabela compartilhada (ex.: texto livre) vêm pelo socket, só destas linhas
+            extras = self._chamar('linhas', colunas=faltando, posicoes=posicoes)
+            linhas = linhas.join(extras)[[c for c in colunas if c in linhas.columns or c in extras.columns]]
+        return linhas
+
+
+def conectar(colunas=None):
+    """`ClienteDados` se `SERVICO_DADOS` estiver definida, senão um `ServicoDados` no próprio processo."""
+    endereco = os.environ.get('SERVICO_DADOS')
+    return ClienteDados(endereco) if endereco else ServicoDados(colunas)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serviço de dados compartilhado pelos apps.")
+    parser.add_argument('--endereco', default=ENDERECO_PADRAO)
+    parser.add_argument('--csv', default=NOME_ARQUIVO_DADOS)
+    args = parser.parse_args()
+
+    servico = ServicoDados(caminho_csv=args.csv)
+    print(f"{len(servico.linhas(colunas=['data_visita']))} visitas carregadas (versão {servico.atualizar()}).")
+    servico.servir(args.endereco)
@@ -1,7 +1,546 @@
-from ultralytics import YOLO
+"""CPU video detection pipeline for the construction-site safety model.
 
-# Load a COCO-pretrained YOLO12n model
-model = YOLO("model/best100.pt")
+Frames are decoded in a background thread, optionally skipped (stride) and downscaled,
+grouped into batches for the model and the detections are streamed to JSONL or Parquet
+(one row per box, coordinates in the original video resolution). Nothing is rendered.
 
-# Run inference on the source
-results = model(source="test1.mp4", show=True, conf=0.5, save=True)
+    python detection.py test1.mp4
+    python detection.py videos/*.mp4 --workers 4 --batch 8 --stride 2 --max-side 960 \
+        --export openvino --format parquet --out detections/
+
+Several videos are processed in parallel, one process per video; each process gets an
+equal share of the CPU threads so the workers do not fight over the cores.
+
+Raw detections are cached per video segment and model (see detection_cache.py): running
+again with another --conf or --classes, or with --annotate, reads the cache instead of
+running the model, and a video that grew only has its new segments inferred.
+
+    python detection.py test1.mp4 --conf 0.3 --classes 0 2 --annotate
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from detection_cache import (
+    DEFAULT_CACHE_DIR, RAW_CONF, RAW_MAX_DET, DetectionCache, hash_segments, model_key, new_segment_hash,
+    segment_frames_for, update_frame_hash,
+)
+
+DEFAULT_WEIGHTS = "model/best100.pt"
+DEFAULT_BATCH = 8
+DEFAULT_IMGSZ = 640
+QUEUE_BATCHES = 4            # decoded batches buffered ahead of the model
+PARQUET_ROWS_PER_GROUP = 50_000
+PROGRESS_EVERY_S = 10.0
+OUTPUT_FORMATS = {"jsonl": ".jsonl", "parquet": ".parquet"}
+DETECTION_COLUMNS = ["video", "frame", "time_s", "class_id", "class_name", "confidence", "x1", "y1", "x2", "y2"]
+
+
+# Model
+def export_model(weights, fmt, imgsz=DEFAULT_IMGSZ):
+    """Export the PyTorch weights to an optimized CPU runtime ("onnx" or "openvino") and return its path.
+
+    The export is reused while it is newer than the weights. Dynamic input shapes allow batching.
+    """
+    from ultralytics import YOLO
+
+    stem, _ = os.path.splitext(weights)
+    exported = {"onnx": stem + ".onnx", "openvino": stem + "_openvino_model"}[fmt]
+    if os.path.exists(exported) and os.path.getmtime(exported) >= os.path.getmtime(weights):
+        return exported
+    return YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=True, device="cpu")
+
+
+def load_model(weights, threads=None):
+    """YOLO model for CPU inference; `threads` caps the intra-op threads of this process."""
+    if threads:
+        os.environ["OMP_NUM_THREADS"] = str(threads)  # ONNX Runtime / OpenVINO read it on load
+        import torch
+        torch.set_num_threads(threads)
+    from ultralytics import YOLO
+    return YOLO(weights, task="detect")
+
+
+# Decoding
+class FrameReader(threading.Thread):
+    """Decodes a video in the background and queues (frame index, time in s, scale, image).
+
+    Only every `stride`-th frame is decoded (the others are just grabbed) and frames are
+    downscaled so the longest side is at most `max_side` pixels. The queue is bounded, so
+    decoding never runs far ahead of inference.
+
+    Seeking to `start_frame` is not frame-exact with every codec; `exact_seek` grabs the
+    frames from the beginning instead. If decoding stops before `end_frame`, the frames read
+    so far are still queued and `batches` then raises; without `end_frame`, `truncated`
+    tells whether the video ended before its declared frame count.
+    """
+
+    END = None
+
+    def __init__(self, path, stride=1, max_side=None, start_frame=0, end_frame=None, maxsize=QUEUE_BATCHES * DEFAULT_BATCH,
+                 exact_seek=False):
+        super().__init__(daemon=True)
+        import cv2
+        self.path = path
+        self.stride = max(1, stride)
+        self.max_side = max_side
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.exact_seek = exact_seek
+        self.decoded = 0             # one past the last frame read or grabbed
+        self.frames = queue.Queue(maxsize=maxsize)
+        self.error = None
+        self.stopped = threading.Event()
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise OSError(f"Could not open video '{path}'")
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.capture = capture
+
+    def run(self):
+        import cv2
+        try:
+            longest = max(self.width, self.height)
+            scale = self.max_side / longest if self.max_side and longest > self.max_side else 1.0
+            index = 0 if self.exact_seek else self.start_frame
+            if index:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, index)
+            while not self.stopped.is_set() and (self.end_frame is None or index < self.end_frame):
+                if index < self.start_frame or (index - self.start_frame) % self.stride:
+                    if not self.capture.grab():
+                        break
+                else:
+                    ok, frame = self.capture.read()
+                    if not ok:
+                        break
+                    if scale != 1.0:
+                        frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                    self._put((index, index / self.fps, scale, frame))
+                index += 1
+                self.decoded = index
+            if self.end_frame is not None and index < self.end_frame and not self.stopped.is_set():
+                raise OSError(f"Decoding '{self.path}' stopped at frame {index}, before frame {self.end_frame}")
+        except Exception as e:
+            self.error = e
+        finally:
+            self.capture.release()
+            self._put(self.END)
+
+    def _put(self, item):
+        while not self.stopped.is_set():
+            try:
+                self.frames.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def batches(self, size):
+        """Yield lists of up to `size` queued frames until the video ends."""
+        batch = []
+        while True:
+            item = self.frames.get()
+            if item is self.END:
+                break
+            batch.append(item)
+            if len(batch) == size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def truncated(self):
+        return self.decoded < self.frame_count
+
+    def stop(self):
+        self.stopped.set()
+
+
+def detections_from_result(result, video, frame, time_s, scale):
+    """Rows (dicts) for the boxes of one ultralytics result, mapped back to the original resolution."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return []
+    xyxy = (boxes.xyxy.cpu().numpy() / scale).round(1)
+    confidences = boxes.conf.cpu().numpy()
+    classes = boxes.cls.cpu().numpy().astype(int)
+    return [
+        {
+            "video": video, "frame": frame, "time_s": round(time_s, 3), "class_id": int(c),
+            "class_name": result.names[int(c)], "confidence": round(float(p), 4),
+            "x1": float(b[0]), "y1": float(b[1]), "x2": float(b[2]), "y2": float(b[3]),
+        }
+        for b, p, c in zip(xyxy, confidences, classes)
+    ]
+
+
+# Output
+class JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, "w", encoding="utf-8")
+
+    def write(self, rows):
+        for row in rows:
+            self.file.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetWriter:
+    """Buffers rows and writes one Parquet row group every `rows_per_group` rows."""
+
+    def __init__(self, path, rows_per_group=PARQUET_ROWS_PER_GROUP):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self.schema = pa.schema([
+            ("video", pa.string()), ("frame", pa.int64()), ("time_s", pa.float64()), ("class_id", pa.int32()),
+            ("class_name", pa.string()), ("confidence", pa.float32()),
+            ("x1", pa.float32()), ("y1", pa.float32()), ("x2", pa.float32()), ("y2", pa.float32()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+        self.rows_per_group = rows_per_group
+        self.rows = []
+
+    def write(self, rows):
+        self.rows.extend(rows)
+        if len(self.rows) >= self.rows_per_group:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+
+    def close(self):
+        self._flush()
+        self.writer.close()
+
+
+def open_writer(path, fmt):
+    return ParquetWriter(path) if fmt == "parquet" else JsonlWriter(path)
+
+
+# Pipeline
+class LazyModel:
+    """Loads the model on first use, so runs served entirely from the cache never load it."""
+
+    def __init__(self, weights, threads=None):
+        self.weights = weights
+        self.threads = threads
+        self.model = None
+
+    def predict(self, *args, **kwargs):
+        if self.model is None:
+            self.model = load_model(self.weights, self.threads)
+        return self.model.predict(*args, **kwargs)
+
+
+def infer_frames(reader, model, batch, imgsz, conf, classes=None, max_det=300):
+    """Yield (frame index, time in s, scale, image, ultralytics result) for every frame queued by `reader`."""
+    for frames in reader.batches(batch):
+        results = model.predict([f[3] for f in frames], imgsz=imgsz, conf=conf, classes=classes, max_det=max_det,
+                                device="cpu", verbose=False)
+        for (frame, time_s, scale, image), result in zip(frames, results):
+            yield frame, time_s, scale, image, result
+
+
+def _stream_to(output, fmt, produce):
+    """Write the row batches yielded by `produce()` under a temporary name; returns the number of rows."""
+    partial = output + ".partial"
+    writer = open_writer(partial, fmt)
+    count = 0
+    try:
+        for rows in produce():
+            writer.write(rows)
+            count += len(rows)
+        writer.close()
+        os.replace(partial, output)
+    except BaseException:
+        writer.close()
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    return count
+
+
+def _runs(segments, segment_frames):
+    """Group segments that follow each other, so each group is decoded in a single pass.
+
+    Segments are compared by their start: `end` is one past the last inferred frame, which
+    with a stride falls short of the next segment's start.
+    """
+    runs = []
+    for segment in segments:
+        if runs and runs[-1][-1][0] + segment_frames == segment[0]:
+            runs[-1].append(segment)
+        else:
+            runs.append([segment])
+    return runs
+
+
+class _SegmentMismatch(Exception):
+    """The frames decoded for a segment do not hash like the manifest says (inexact seek)."""
+
+
+def _infer_run(path, model, cache, key, run, batch, stride, max_side, imgsz, exact_seek, progress):
+    """Infer the consecutive segments of `run`, saving each one once all of its frames were seen and hash as expected."""
+    video = os.path.basename(path)
+    reader = FrameReader(path, stride=stride, max_side=max_side, start_frame=run[0][0], end_frame=run[-1][1],
+                         maxsize=QUEUE_BATCHES * batch, exact_seek=exact_seek)
+    reader.start()
+    pending = iter(run)
+    segment_start, segment_end, segment_hash = next(pending)
+    digest, rows = new_segment_hash(), []
+    try:
+        for frame, time_s, scale, image, result in infer_frames(reader, model, batch, imgsz, RAW_CONF, max_det=RAW_MAX_DET):
+            update_frame_hash(digest, image)
+            rows.extend(
+                dict(row, offset=frame - segment_start)
+                for row in detections_from_result(result, video, frame, time_s, scale)
+            )
+            progress(reader, frame)
+            if frame + 1 == segment_end:
+                # Each segment is saved as soon as it is complete: an interrupted run keeps what it did
+                if digest.hexdigest() != segment_hash:
+                    raise _SegmentMismatch(f"{video}: frames {segment_start}-{segment_end} do not match the manifest")
+                cache.save(key, segment_hash, rows)
+                segment_start, segment_end, segment_hash = next(pending, (None, None, None))
+                digest, rows = new_segment_hash(), []
+    except BaseException:
+        reader.stop()
+        raise
+
+
+def update_cache(path, model, cache, key, batch=DEFAULT_BATCH, stride=1, max_side=None, imgsz=DEFAULT_IMGSZ, log=print):
+    """Infer the segments of `path` that are not in the cache. Returns (manifest, inferred segments, inferred frames)."""
+    manifest = cache.manifest(path, key)
+    if manifest is None:
+        # New or changed file: hash the frames the model would see, segment by segment (decoding only)
+        info = os.stat(path)
+        reader = FrameReader(path, stride=stride, max_side=max_side)
+        reader.start()
+        segments = hash_segments(reader, segment_frames_for(stride))
+        manifest = cache.new_manifest(path, reader.fps, reader.frame_count, segments, info)
+        if reader.truncated:
+            # Not recorded: the next run decodes the file again instead of trusting a partial read
+            if log:
+                log(f"{os.path.basename(path)}: decoding stopped at frame {reader.decoded} of {reader.frame_count}")
+        else:
+            cache.save_manifest(path, key, manifest)
+    missing = [s for s in manifest["segments"] if not cache.has(key, s[2])]
+    video = os.path.basename(path)
+    counts = {"inferred": 0}
+    start = last_log = time.perf_counter()
+
+    def progress(reader, frame):
+        nonlocal last_log
+        counts["inferred"] += 1
+        if log and time.perf_counter() - last_log >= PROGRESS_EVERY_S:
+            last_log = time.perf_counter()
+            log(f"{video}: frame {frame + 1}/{reader.frame_count} ({counts['inferred'] / (last_log - start):.1f} FPS inferred)")
+
+    exact_seek = False
+    for run in _runs(missing, segment_frames_for(stride)):
+        try:
+            _infer_run(path, model, cache, key, run, batch, stride, max_side, imgsz, exact_seek, progress)
+        except _SegmentMismatch as e:
+            if exact_seek:
+                raise RuntimeError(f"{e}; the video changed or does not decode deterministically") from None
+            # The seek landed on another frame: this file is not seekable exactly, so this run (once, from
+            # its first uncached segment) and the following ones grab forward from the beginning of the file
+            exact_seek = True
+            rest = [s for s in run if not cache.has(key, s[2])]
+            try:
+                _infer_run(path, model, cache, key, rest, batch, stride, max_side, imgsz, True, progress)
+            except _SegmentMismatch as e:
+                raise RuntimeError(f"{e}; the video changed or does not decode deterministically") from None
+    return manifest, missing, counts["inferred"]
+
+
+def cached_detections(path, cache, key, manifest, conf=0.5, classes=None):
+    """Yield the detection rows of each segment, thresholded and filtered from the cache."""
+    video = os.path.basename(path)
+    for segment_start, _, segment_hash in manifest["segments"]:
+        rows = cache.load(key, segment_hash, conf, classes).to_pylist()
+        for row in rows:
+            frame = segment_start + row.pop("offset")
+            # Stored as float32: round back to the precision of `detections_from_result`
+            row.update(video=video, frame=frame, time_s=round(frame / manifest["fps"], 3),
+                       confidence=round(row["confidence"], 4), **{c: round(row[c], 1) for c in ("x1", "y1", "x2", "y2")})
+        yield [{column: row[column] for column in DETECTION_COLUMNS} for row in rows]
+
+
+def annotate_video(path, detections, output, stride=1):
+    """Draw `detections` (rows with `frame`) on the video. Frames skipped by the stride keep the last boxes."""
+    import cv2
+
+    by_frame = {}
+    for row in detections:
+        by_frame.setdefault(row["frame"], []).append(row)
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    size = (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    partial = output + ".partial.mp4"
+    writer = cv2.VideoWriter(partial, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    boxes, index = [], 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if index % max(1, stride) == 0:
+                boxes = by_frame.get(index, [])
+            for box in boxes:
+                p1, p2 = (int(box["x1"]), int(box["y1"])), (int(box["x2"]), int(box["y2"]))
+                cv2.rectangle(frame, p1, p2, (0, 200, 255), 2)
+                cv2.putText(frame, f"{box['class_name']} {box['confidence']:.2f}", (p1[0], max(12, p1[1] - 4)),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 200, 255), 1)
+            writer.write(frame)
+            index += 1
+    finally:
+        capture.release()
+        writer.release()
+    os.replace(partial, output)
+    return index
+
+
+def process_video(path, model, output, fmt="jsonl", batch=DEFAULT_BATCH, stride=1, max_side=None,
+                  imgsz=DEFAULT_IMGSZ, conf=0.5, classes=None, log=print, cache=None, key=None, annotate=None):
+    """Detect over one video and stream the rows to `output`. Returns the run statistics.
+
+    With a `DetectionCache` (and the `model_key`), only segments missing from the cache are
+    inferred; the output is then written from the cache with `conf` and `classes` applied, and
+    `annotate` (a path) gets the annotated video without running the model again.
+    The output file is written under a temporary name and only appears once complete.
+    """
+    start = time.perf_counter()
+    if cache is not None:
+        manifest, missing, inferred = update_cache(path, model, cache, key, batch, stride, max_side, imgsz, log)
+        detections = _stream_to(output, fmt, lambda: cached_detections(path, cache, key, manifest, conf, classes))
+        frames, fps = manifest["frames"], manifest["fps"]
+        covered = sum(end - begin for begin, end, _ in missing)
+        if annotate:
+            annotate_video(path, (row for rows in cached_detections(path, cache, key, manifest, conf, classes) for row in rows),
+                           annotate, stride)
+        extra = {"segments": len(manifest["segments"]), "segments_inferred": len(missing)}
+    else:
+        reader = FrameReader(path, stride=stride, max_side=max_side, maxsize=QUEUE_BATCHES * batch)
+        reader.start()
+        video = os.path.basename(path)
+        counts = {"inferred": 0, "covered": 0}
+
+        def produce():
+            last_log = time.perf_counter()
+            try:
+                for frame, time_s, scale, _, result in infer_frames(reader, model, batch, imgsz, conf, classes):
+                    counts["inferred"] += 1
+                    counts["covered"] = frame + 1
+                    if log and time.perf_counter() - last_log >= PROGRESS_EVERY_S:
+                        last_log = time.perf_counter()
+                        log(f"{video}: frame {frame + 1}/{reader.frame_count} ({counts['inferred'] / (last_log - start):.1f} FPS inferred)")
+                    yield detections_from_result(result, video, frame, time_s, scale)
+            except BaseException:
+                reader.stop()
+                raise
+
+        detections = _stream_to(output, fmt, produce)
+        if log and reader.truncated:
+            log(f"{video}: decoding stopped at frame {reader.decoded} of {reader.frame_count}")
+        frames, fps, inferred, covered = reader.frame_count, reader.fps, counts["inferred"], counts["covered"]
+        extra = {}
+    elapsed = time.perf_counter() - start
+    return {
+        "video": path, "output": output, "frames": frames, "inferred_frames": inferred,
+        "detections": detections, "seconds": round(elapsed, 2), **extra,
+        "inferred_fps": round(inferred / elapsed, 2) if elapsed else None,
+        # Source frames covered per second: with a stride, this is what compares to real time
+        "video_fps": round(covered / elapsed, 2) if elapsed else None,
+        "realtime_factor": round(covered / elapsed / fps, 2) if elapsed else None,
+    }
+
+
+def output_path(video, out_dir, suffix):
+    stem = os.path.splitext(os.path.basename(video))[0]
+    return os.path.join(out_dir, stem + suffix)
+
+
+def _worker(video, weights, threads, cache_dir, options):
+    # One model per process, loaded only if some segment is missing from the cache
+    cache = DetectionCache(cache_dir) if cache_dir else None
+    return process_video(video, LazyModel(weights, threads), cache=cache, **options)
+
+
+def process_videos(videos, weights=DEFAULT_WEIGHTS, out_dir="detections", fmt="jsonl", workers=1,
+                   cache_dir=DEFAULT_CACHE_DIR, annotate=False, **options):
+    """Process several videos, `workers` at a time in separate processes. Yields each video's statistics.
+
+    `cache_dir=None` disables the detection cache (see detection_cache.py).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = max(1, min(workers, len(videos)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    key = model_key(weights, options.get("imgsz", DEFAULT_IMGSZ), options.get("stride", 1), options.get("max_side")) if cache_dir else None
+    jobs = [
+        (video, dict(options, output=output_path(video, out_dir, OUTPUT_FORMATS[fmt]), fmt=fmt, key=key,
+                     annotate=output_path(video, out_dir, "_annotated.mp4") if annotate else None))
+        for video in videos
+    ]
+    if workers == 1:
+        model = LazyModel(weights, threads)
+        cache = DetectionCache(cache_dir) if cache_dir else None
+        for video, job in jobs:
+            yield process_video(video, model, cache=cache, **job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_worker, video, weights, threads, cache_dir, dict(job, log=None)) for video, job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batched CPU detection over one or more videos.")
+    parser.add_argument("videos", nargs="*", default=["test1.mp4"])
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS)
+    parser.add_argument("--export", choices=["onnx", "openvino"], default=None,
+                        help="export the weights to this runtime (once) and run the exported model")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--stride", type=int, default=1, help="run the model on every N-th frame")
+    parser.add_argument("--max-side", type=int, default=None, help="downscale frames so the longest side is at most this")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--classes", type=int, nargs="*", default=None, help="keep only these class ids")
+    parser.add_argument("--format", choices=list(OUTPUT_FORMATS), default="jsonl")
+    parser.add_argument("--out", default="detections", help="output directory (one file per video)")
+    parser.add_argument("--workers", type=int, default=1, help="videos processed in parallel")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_DIR, help="directory of the raw detection cache")
+    parser.add_argument("--no-cache", action="store_true", help="always infer every frame, without the cache")
+    parser.add_argument("--annotate", action="store_true", help="also write <video>_annotated.mp4 (needs the cache)")
+    args = parser.parse_args()
+    if args.annotate and args.no_cache:
+        parser.error("--annotate draws the boxes from the cache; it cannot be used with --no-cache")
+    if args.conf < RAW_CONF and not args.no_cache:
+        parser.error(f"the cache keeps boxes with confidence >= {RAW_CONF}; use --no-cache for a lower --conf")
+
+    weights = export_model(args.weights, args.export, args.imgsz) if args.export else args.weights
+    start = time.perf_counter()
+    total_frames = 0
+    for stats in process_videos(
+        args.videos, weights, args.out, args.format, args.workers, cache_dir=None if args.no_cache else args.cache,
+        annotate=args.annotate, batch=args.batch, stride=args.stride, max_side=args.max_side, imgsz=args.imgsz,
+        conf=args.conf, classes=args.classes,
+    ):
+        total_frames += stats["inferred_frames"]
+        print(json.dumps(stats))
+    elapsed = time.perf_counter() - start
+    print(f"{len(args.videos)} video(s), {total_frames} frames inferred in {elapsed:.1f}s: {total_frames / elapsed:.1f} FPS overall")
@@ -0,0 +1,172 @@
+"""Cache of raw detections per video segment, so only new or modified footage is inferred.
+
+A video is split into fixed segments of frames. Each segment is identified by a hash of
+the frames the model actually sees (after stride and downscale), and its detections are
+stored with only a low floor (confidence >= RAW_CONF, at most RAW_MAX_DET boxes per frame)
+in one Parquet file per (segment hash, model key). The model key covers the weights file contents and the
+inference settings. Confidence threshold and class filters are applied when reading, so
+changing them, or re-annotating a video, never runs the model again.
+
+A manifest per video keeps the file size/mtime and the segment hashes: an unchanged file
+is not even decoded. When a video grows, the existing segments hash the same and only the
+new (and the previously incomplete last) segments are inferred. Frames are hashed again
+while they are inferred, so a segment is only stored once all of its frames were seen and
+match the hash (decoders do not always seek to the exact frame).
+
+The floor keeps the cache small: every cached box becomes one row (a Python dict while
+the segment is inferred), so RAW_CONF=0.001 with the ultralytics default of 300 boxes
+would mean up to 300 rows per frame, nearly all noise. Thresholds below RAW_CONF need
+--no-cache.
+"""
+import hashlib
+import json
+import os
+import uuid
+
+DEFAULT_CACHE_DIR = ".detection_cache"
+SEGMENT_FRAMES = 300         # 10 s at 30 FPS
+RAW_CONF = 0.05              # lowest --conf served from the cache
+RAW_MAX_DET = 100            # boxes kept per frame (ultralytics defaults to 300)
+
+
+def _atomic_write(path, write):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{uuid.uuid4().hex[:8]}.partial"
+    try:
+        write(partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def file_hash(path):
+    """SHA-256 of a file, or of every file inside a directory (e.g. an OpenVINO export)."""
+    digest = hashlib.sha256()
+    paths = [path] if os.path.isfile(path) else sorted(
+        os.path.join(root, name) for root, _, names in os.walk(path) for name in names
+    )
+    for name in paths:
+        digest.update(os.path.relpath(name, path).encode() if name != path else b"")
+        with open(name, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def model_key(weights, imgsz, stride, max_side, segment_frames=SEGMENT_FRAMES):
+    """Identifies the weights contents and every setting that changes the raw detections."""
+    settings = {
+        "weights": file_hash(weights), "imgsz": imgsz, "stride": stride, "max_side": max_side,
+        "segment_frames": segment_frames, "raw_conf": RAW_CONF, "raw_max_det": RAW_MAX_DET,
+    }
+    return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def segment_frames_for(stride, segment_frames=SEGMENT_FRAMES):
+    """Segment length rounded up to a multiple of the stride, so every segment starts on an inferred frame."""
+    stride = max(1, stride)
+    return -(-segment_frames // stride) * stride
+
+
+def update_frame_hash(digest, frame):
+    """Feed one decoded frame (as queued by `FrameReader`) to a segment digest."""
+    digest.update(frame.data if frame.flags.c_contiguous else frame.tobytes())
+
+
+def new_segment_hash():
+    return hashlib.blake2b(digest_size=16)
+
+
+def hash_segments(reader, segment_frames):
+    """[(start, end, hash)] for the frames queued by a running `FrameReader` (see detection.py).
+
+    `end` is one past the last frame the model would see; the last segment may be incomplete.
+    """
+    segments, current, digest, last = [], None, None, None
+    for frames in reader.batches(64):
+        for index, _, _, frame in frames:
+            start = index // segment_frames * segment_frames
+            if start != current:
+                if current is not None:
+                    segments.append((current, last + 1, digest.hexdigest()))
+                current, digest = start, new_segment_hash()
+            update_frame_hash(digest, frame)
+            last = index
+    if current is not None:
+        segments.append((current, last + 1, digest.hexdigest()))
+    return segments
+
+
+class DetectionCache:
+    """Segment detections and video manifests stored under `root`."""
+
+    SCHEMA_FIELDS = [
+        ("offset", "int32"), ("class_id", "int32"), ("class_name", "string"), ("confidence", "float32"),
+        ("x1", "float32"), ("y1", "float32"), ("x2", "float32"), ("y2", "float32"),
+    ]
+
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+
+    @property
+    def schema(self):
+        import pyarrow as pa
+        return pa.schema([(name, pa.type_for_alias(kind)) for name, kind in self.SCHEMA_FIELDS])
+
+    # Segments
+    def _segment_path(self, key, segment_hash):
+        return os.path.join(self.root, key, segment_hash[:2], segment_hash + ".parquet")
+
+    def has(self, key, segment_hash):
+        return os.path.exists(self._segment_path(key, segment_hash))
+
+    def save(self, key, segment_hash, rows):
+        """Store the raw rows of one segment (`offset` = frame index minus the segment start)."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pylist(rows, schema=self.schema)
+        _atomic_write(self._segment_path(key, segment_hash), lambda path: pq.write_table(table, path, compression="zstd"))
+
+    def load(self, key, segment_hash, conf=0.0, classes=None):
+        """Arrow table of one segment, keeping boxes with confidence >= `conf` and, if given, only `classes`."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+        table = pq.read_table(self._segment_path(key, segment_hash))
+        mask = pc.greater_equal(table["confidence"], conf)
+        if classes is not None:
+            mask = pc.and_(mask, pc.is_in(table["class_id"], value_set=pa.array(classes, pa.int32())))
+        return table.filter(mask)
+
+    # Manifests
+    def _manifest_path(self, video, key):
+        name = hashlib.sha256(f"{os.path.abspath(video)}|{key}".encode()).hexdigest()[:24]
+        return os.path.join(self.root, "manifests", name + ".json")
+
+    def manifest(self, video, key):
+        """Segments recorded for this video file, if it has not changed since (same size and mtime)."""
+        try:
+            with open(self._manifest_path(video, key), encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            return None
+        info = os.stat(video)
+        if manifest["size"] != info.st_size or manifest["mtime_ns"] != info.st_mtime_ns:
+            return None
+        return manifest
+
+    @staticmethod
+    def new_manifest(video, fps, frame_count, segments, info):
+        """Manifest of a hashed video; `info` is the `os.stat` taken before hashing, in case the file grew meanwhile."""
+        return {"video": os.path.abspath(video), "size": info.st_size, "mtime_ns": info.st_mtime_ns,
+                "fps": fps, "frames": frame_count, "segments": [list(s) for s in segments]}
+
+    def save_manifest(self, video, key, manifest):
+        """Record the manifest, so the unchanged file is not hashed again."""
+
+        def write(path):
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(manifest, file)
+        _atomic_write(self._manifest_path(video, key), write)
+        return manifest